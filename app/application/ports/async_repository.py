@@ -0,0 +1,187 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor
+
+
+# Variantes asíncronas de PatientRepository y DoctorRepository para los
+# servicios que se esperan desde el bucle de eventos. Mismos métodos y
+# semántica que los puertos síncronos (incluidos los que allí tienen una
+# implementación por defecto), pero todos abstractos: un adaptador
+# asíncrono decide dónde se ejecuta cada uno.
+
+
+class AlmacenamientoSaturado(Exception):
+    """Hay demasiadas operaciones esperando al almacenamiento; conviene reintentar más tarde"""
+
+
+class TiempoAgotado(Exception):
+    """El almacenamiento no respondió a tiempo"""
+
+
+class AsyncPatientRepository(ABC):
+
+
+    @abstractmethod
+    async def guardar(self, patient: paciente) -> paciente:
+
+        pass
+
+    @abstractmethod
+    async def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
+
+        pass
+
+    @abstractmethod
+    async def buscar_todos(self) -> List[paciente]:
+
+        pass
+
+    @abstractmethod
+    async def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+        """Devuelve hasta `limit` registros posteriores a `cursor` y el cursor siguiente"""
+        pass
+
+    @abstractmethod
+    async def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+        """Busca por palabras o prefijos de nombre y email, de más a menos relevante
+
+        Devuelve `limite` coincidencias, o todas si hay menos. Con varios
+        términos frecuentes el orden entre muchas coincidencias es aproximado.
+        """
+        pass
+
+    @abstractmethod
+    async def actualizar(self, patient: paciente) -> paciente:
+        pass
+
+    @abstractmethod
+    async def comparar_y_actualizar(self, esperado: paciente, nuevo: paciente) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`"""
+        pass
+
+    @abstractmethod
+    async def actualizar_si_version(self, patient: paciente, version: int) -> Optional[paciente]:
+        """Actualiza solo si la versión guardada es `version`; None si no existe, ConflictoDeVersion si cambió"""
+        pass
+
+    @abstractmethod
+    async def version_de(self, patient_id: str) -> int:
+        """Versión del registro, 0 si no existe"""
+        pass
+
+    @abstractmethod
+    async def estadisticas(self) -> Dict[str, int]:
+        """Medidas para las métricas: "registros" y el tamaño de los índices que haya"""
+        pass
+
+    @abstractmethod
+    async def cambios_coleccion(self) -> Tuple[int, float]:
+        """Contador de escrituras de la colección y hora (epoch) de la última"""
+        pass
+
+    @abstractmethod
+    async def borrar(self, patient_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+        """Guarda varios registros en una sola operación"""
+        pass
+
+    @abstractmethod
+    async def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+        """Actualiza varios registros; None en la posición de los que no existen"""
+        pass
+
+    @abstractmethod
+    async def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+        """Borra varios registros; indica por posición si existía"""
+        pass
+
+
+class AsyncDoctorRepository(ABC):
+
+
+    @abstractmethod
+    async def guardar(self, doctor: Doctor) -> Doctor:
+
+        pass
+
+    @abstractmethod
+    async def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
+
+        pass
+
+    @abstractmethod
+    async def buscar_todos(self) -> List[Doctor]:
+
+        pass
+
+    @abstractmethod
+    async def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+        """Devuelve hasta `limit` registros posteriores a `cursor` y el cursor siguiente"""
+        pass
+
+    @abstractmethod
+    async def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        pass
+
+    @abstractmethod
+    async def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+        """Busca por palabras o prefijos de nombre y email, de más a menos relevante
+
+        Devuelve `limite` coincidencias, o todas si hay menos. Con varios
+        términos frecuentes el orden entre muchas coincidencias es aproximado.
+        """
+        pass
+
+    @abstractmethod
+    async def actualizar(self, doctor: Doctor) -> Doctor:
+
+        pass
+
+    @abstractmethod
+    async def comparar_y_actualizar(self, esperado: Doctor, nuevo: Doctor) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`"""
+        pass
+
+    @abstractmethod
+    async def actualizar_si_version(self, doctor: Doctor, version: int) -> Optional[Doctor]:
+        """Actualiza solo si la versión guardada es `version`; None si no existe, ConflictoDeVersion si cambió"""
+        pass
+
+    @abstractmethod
+    async def version_de(self, doctor_id: str) -> int:
+        """Versión del registro, 0 si no existe"""
+        pass
+
+    @abstractmethod
+    async def estadisticas(self) -> Dict[str, int]:
+        """Medidas para las métricas: "registros" y el tamaño de los índices que haya"""
+        pass
+
+    @abstractmethod
+    async def cambios_coleccion(self) -> Tuple[int, float]:
+        """Contador de escrituras de la colección y hora (epoch) de la última"""
+        pass
+
+    @abstractmethod
+    async def borrar(self, doctor_id: str) -> bool:
+
+        pass
+
+    @abstractmethod
+    async def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+        """Guarda varios registros en una sola operación"""
+        pass
+
+    @abstractmethod
+    async def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+        """Actualiza varios registros; None en la posición de los que no existen"""
+        pass
+
+    @abstractmethod
+    async def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+        """Borra varios registros; indica por posición si existía"""
+        pass
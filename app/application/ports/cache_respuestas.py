@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+
+# Una respuesta cacheada: cuerpo ya serializado y cabeceras propias
+Entrada = Tuple[bytes, Dict[str, str]]
+
+
+class CacheRespuestas(ABC):
+    """Respuestas ya serializadas de una colección, invalidadas por etiquetas
+
+    Cada entrada lleva las etiquetas de los datos de los que depende. La
+    caché sigue el contador de cambios de la colección: si avanza sin que
+    la escritura pase por invalidar() (otro proceso), se vacía entera.
+    """
+
+    @abstractmethod
+    def obtener(self, clave: Hashable, contador: int) -> Optional[Entrada]:
+        """Entrada de `clave`, o None; `contador` es el de la colección al leer"""
+        pass
+
+    @abstractmethod
+    def guardar(self, clave: Hashable, entrada: Entrada, etiquetas: Iterable[str], contador: int) -> None:
+        """Guarda una entrada construida con los datos vistos en `contador`"""
+        pass
+
+    @abstractmethod
+    def invalidar(self, etiquetas: Iterable[str], antes: int, despues: int, escrituras: int) -> None:
+        """Descarta las entradas con alguna de `etiquetas` tras una escritura
+
+        `antes` y `despues` son el contador de la colección alrededor de la
+        escritura y `escrituras` lo que esta debía sumarle; si no cuadra hubo
+        escrituras ajenas y se descarta todo.
+        """
+        pass
+
+    @abstractmethod
+    def estadisticas(self) -> Dict[str, int]:
+        """Aciertos, fallos, desalojos, invalidaciones, entradas y bytes ocupados"""
+        pass
@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.domain.core.models import Cita
+
+
+class CitaRepository(ABC):
+
+
+    @abstractmethod
+    def guardar(self, cita: Cita) -> Cita:
+        """Guarda una cita nueva; lanza CitaSolapada si el doctor ya tiene otra en ese horario"""
+        pass
+
+    @abstractmethod
+    def buscar_por_id(self, cita_id: str) -> Optional[Cita]:
+
+        pass
+
+    @abstractmethod
+    def buscar_por_doctor(self, doctor_id: str, desde: datetime, hasta: datetime) -> List[Cita]:
+        """Citas del doctor que se cruzan con [desde, hasta), por hora de inicio"""
+        pass
+
+    @abstractmethod
+    def buscar_por_paciente(self, paciente_id: str) -> List[Cita]:
+        """Citas del paciente por hora de inicio"""
+        pass
+
+    @abstractmethod
+    def actualizar(self, cita: Cita) -> Optional[Cita]:
+        """Sustituye la cita (puede cambiar de horario); None si no existe
+
+        Lanza CitaSolapada si el nuevo horario se cruza con otra cita del
+        doctor; entonces la cita guardada no cambia.
+        """
+        pass
+
+    @abstractmethod
+    def borrar(self, cita_id: str) -> bool:
+
+        pass
+
+    @abstractmethod
+    def cambios_coleccion(self) -> Tuple[int, float]:
+        """Contador de escrituras de la colección y hora (epoch) de la última"""
+        pass
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Medidas para las métricas; por defecto ninguna"""
+        return {}
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from app.domain.core.models import Doctor
+from typing import Dict, List, Optional, Tuple
+from app.domain.core.models import Doctor, ConflictoDeVersion
 
 
 class DoctorRepository(ABC):
@@ -21,17 +21,98 @@ class DoctorRepository(ABC):
         
         pass
 
+    @abstractmethod
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+        """Devuelve hasta `limit` registros posteriores a `cursor` y el cursor siguiente"""
+        pass
+
     @abstractmethod
     def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
         
         pass
 
+    @abstractmethod
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+        """Busca por palabras o prefijos de nombre y email, de más a menos relevante
+
+        Devuelve `limite` coincidencias, o todas si hay menos. Con varios
+        términos frecuentes el orden entre muchas coincidencias es aproximado.
+        """
+        pass
+
     @abstractmethod
     def actualizar(self, doctor: Doctor) -> Doctor:
         
         pass
 
+    def comparar_y_actualizar(self, esperado: Doctor, nuevo: Doctor) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`
+
+        La implementación por defecto no es atómica; los repositorios que
+        admiten escrituras concurrentes la redefinen.
+        """
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        if self.buscar_por_id(esperado.id) != esperado:
+            return False
+        return self.actualizar(nuevo) is not None
+
+    def actualizar_si_version(self, doctor: Doctor, version: int) -> Optional[Doctor]:
+        """Actualiza solo si la versión guardada es `version`; None si no existe
+
+        Lanza ConflictoDeVersion si otra escritura se adelantó. Por defecto se
+        apoya en comparar_y_actualizar, sin bloquear al resto de escrituras.
+        """
+        actual = self.buscar_por_id(doctor.id)
+        if actual is None:
+            return None
+        if actual.version != version:
+            raise ConflictoDeVersion(actual.version)
+        if self.comparar_y_actualizar(actual, doctor):
+            return doctor
+        actual = self.buscar_por_id(doctor.id)
+        if actual is None:
+            return None
+        raise ConflictoDeVersion(actual.version)
+
+    def version_de(self, doctor_id: str) -> int:
+        """Versión del registro, 0 si no existe"""
+        doctor = self.buscar_por_id(doctor_id)
+        return doctor.version if doctor else 0
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Medidas para las métricas: "registros" y el tamaño de los índices que haya
+
+        Por defecto solo cuenta los registros, recorriéndolos todos; los
+        repositorios las redefinen con lo que saben contar sin recorrer.
+        """
+        return {"registros": len(self.buscar_todos())}
+
+    @abstractmethod
+    def cambios_coleccion(self) -> Tuple[int, float]:
+        """Contador de escrituras de la colección y hora (epoch) de la última
+
+        Cada llamada que escribe algo lo sube exactamente en uno, también las
+        de lote, y no repite valores tras un reinicio.
+        """
+        pass
+
     @abstractmethod
     def borrar(self, doctor_id: str) -> bool:
         
         pass
+
+    @abstractmethod
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+        """Guarda varios registros en una sola operación"""
+        pass
+
+    @abstractmethod
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+        """Actualiza varios registros; None en la posición de los que no existen"""
+        pass
+
+    @abstractmethod
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+        """Borra varios registros; indica por posición si existía"""
+        pass
@@ -0,0 +1,159 @@
+from dataclasses import replace
+from datetime import date, datetime, time, timedelta
+from heapq import heappop, heapreplace
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.domain.core.models import Cita, ConflictoDeVersion, Doctor
+from app.application.ports.async_repository import AsyncDoctorRepository, AsyncPatientRepository
+from app.application.ports.cita_repository import CitaRepository
+
+
+# Jornada por defecto para buscar huecos libres
+APERTURA = time(8, 0)
+CIERRE = time(20, 0)
+# Días hacia delante en los que se buscan huecos por especialidad
+DIAS_BUSQUEDA = 30
+
+
+class CitaService:
+    """Casos de uso de la agenda de citas
+
+    Las citas están en memoria y se consultan directamente; pacientes y
+    doctores se leen con los mismos repositorios asíncronos que usan sus
+    servicios, así que con un almacenamiento con E/S esas lecturas no
+    detienen el bucle de eventos.
+    """
+
+    def __init__(self, cita_repository: CitaRepository, patient_repository: AsyncPatientRepository,
+                 doctor_repository: AsyncDoctorRepository):
+        self.cita_repository = cita_repository
+        self.patient_repository = patient_repository
+        self.doctor_repository = doctor_repository
+
+    async def agendar_cita(self, doctor_id: str, paciente_id: str, inicio: datetime, fin: datetime,
+                     motivo: str = "") -> Cita:
+        """Lanza ValueError si faltan datos o el doctor o el paciente no existen, CitaSolapada si hay choque"""
+        cita = Cita(doctor_id=doctor_id, paciente_id=paciente_id, inicio=inicio, fin=fin, motivo=motivo)
+        if await self.doctor_repository.buscar_por_id(doctor_id) is None:
+            raise ValueError("El doctor de la cita no existe")
+        if await self.patient_repository.buscar_por_id(paciente_id) is None:
+            raise ValueError("El paciente de la cita no existe")
+        return self.cita_repository.guardar(cita)
+
+    def obtener_cita(self, cita_id: str) -> Optional[Cita]:
+
+        return self.cita_repository.buscar_por_id(cita_id)
+
+    def cambios_citas(self) -> Tuple[int, float]:
+        """Contador de escrituras de la colección y hora de la última"""
+        return self.cita_repository.cambios_coleccion()
+
+    def estadisticas_citas(self) -> Dict[str, int]:
+
+        return self.cita_repository.estadisticas()
+
+    def citas_doctor(self, doctor_id: str, desde: datetime, hasta: datetime) -> List[Cita]:
+        """Citas del doctor que se cruzan con [desde, hasta)"""
+        return self.cita_repository.buscar_por_doctor(doctor_id, desde, hasta)
+
+    def citas_paciente(self, paciente_id: str) -> List[Cita]:
+
+        return self.cita_repository.buscar_por_paciente(paciente_id)
+
+    def huecos_libres(self, doctor_id: str, dia: date, duracion: timedelta = timedelta(0),
+                      apertura: time = APERTURA, cierre: time = CIERRE) -> List[Tuple[datetime, datetime]]:
+        """Tramos sin citas del doctor entre `apertura` y `cierre` de `dia` que duran al menos `duracion`"""
+        desde, hasta = datetime.combine(dia, apertura), datetime.combine(dia, cierre)
+        if hasta <= desde:
+            raise ValueError("El cierre debe ser posterior a la apertura")
+        return [(inicio, fin) for inicio, fin in self._tramos_libres(doctor_id, desde, hasta) if fin - inicio >= duracion]
+
+    def _tramos_libres(self, doctor_id: str, desde: datetime, hasta: datetime) -> Iterator[Tuple[datetime, datetime]]:
+        libre = desde
+        for cita in self.cita_repository.buscar_por_doctor(doctor_id, desde, hasta):
+            if cita.inicio > libre:
+                yield libre, cita.inicio
+            libre = max(libre, cita.fin)
+        if libre < hasta:
+            yield libre, hasta
+
+    @staticmethod
+    def _primer_inicio(desde: datetime, duracion: timedelta, apertura: time, cierre: time,
+                       dias: int) -> Optional[datetime]:
+        # Primera hora desde `desde` en la que cabe una franja dentro de la
+        # jornada: ningún doctor puede tener un hueco antes
+        for numero in range(dias):
+            dia = desde.date() + timedelta(days=numero)
+            inicio = max(datetime.combine(dia, apertura), desde)
+            if inicio + duracion <= datetime.combine(dia, cierre):
+                return inicio
+        return None
+
+    def _franjas(self, doctor_id: str, desde: datetime, duracion: timedelta, apertura: time, cierre: time,
+                 dias: int) -> Iterator[Tuple[datetime, datetime]]:
+        # Franjas de `duracion` seguidas desde el principio de cada tramo libre,
+        # día a día: solo se consulta la agenda del día siguiente si hace falta
+        for numero in range(dias):
+            dia = desde.date() + timedelta(days=numero)
+            inicio, fin = max(datetime.combine(dia, apertura), desde), datetime.combine(dia, cierre)
+            if inicio + duracion > fin:
+                continue
+            for libre, ocupado in self._tramos_libres(doctor_id, inicio, fin):
+                while libre + duracion <= ocupado:
+                    yield libre, libre + duracion
+                    libre += duracion
+
+    async def proximos_huecos(self, especialidad: str, desde: datetime, cantidad: int,
+                        duracion: timedelta, apertura: time = APERTURA, cierre: time = CIERRE,
+                        dias: int = DIAS_BUSQUEDA) -> List[Tuple[Doctor, datetime, datetime]]:
+        """Las `cantidad` primeras franjas libres de `duracion` desde `desde` entre todos los doctores de la especialidad
+
+        Mezcla de k vías con un montón sobre las franjas de cada doctor, en
+        orden de inicio (a igual hora, por el orden de buscar_por_especialidad).
+        La agenda de un doctor no se consulta hasta que su cota (la primera
+        hora con jornada por delante desde `desde`) llega a la cima del
+        montón, así que con huecos de sobra el coste depende de `cantidad` y
+        no de cuántos doctores tenga la especialidad, también si `desde` cae
+        fuera de la jornada.
+        """
+        if duracion <= timedelta(0):
+            raise ValueError("La duración debe ser positiva")
+        if datetime.combine(desde.date(), cierre) <= datetime.combine(desde.date(), apertura):
+            raise ValueError("El cierre debe ser posterior a la apertura")
+        cota = self._primer_inicio(desde, duracion, apertura, cierre, dias)
+        if cota is None:
+            return []
+        doctores = await self.doctor_repository.buscar_por_especialidad(especialidad)
+        # (inicio, pendiente, orden, fin, doctor, franjas). Con pendiente=1 el
+        # inicio es solo una cota y las franjas aún no se han abierto; a igual
+        # hora va detrás de las ya conocidas. Todas las claves empiezan
+        # iguales y con orden creciente: la lista ya es un montón.
+        monton = [(cota, 1, orden, None, doctor, None) for orden, doctor in enumerate(doctores)]
+        resultado = []
+        while monton and len(resultado) < cantidad:
+            inicio, pendiente, orden, fin, doctor, franjas = monton[0]
+            if pendiente:
+                franjas = self._franjas(doctor.id, desde, duracion, apertura, cierre, dias)
+            else:
+                resultado.append((doctor, inicio, fin))
+            siguiente = next(franjas, None)
+            if siguiente is None:
+                heappop(monton)
+            else:
+                heapreplace(monton, (siguiente[0], 0, orden, siguiente[1], doctor, franjas))
+        return resultado
+
+    def reprogramar_cita(self, cita_id: str, inicio: Optional[datetime] = None, fin: Optional[datetime] = None,
+                         motivo: Optional[str] = None, version: Optional[int] = None) -> Optional[Cita]:
+        """Cambia horario o motivo; con `version` solo si la cita sigue en ella, si no ConflictoDeVersion"""
+        actual = self.cita_repository.buscar_por_id(cita_id)
+        if actual is None:
+            return None
+        if version is not None and actual.version != version:
+            raise ConflictoDeVersion(actual.version)
+        cita = replace(actual, inicio=inicio or actual.inicio, fin=fin or actual.fin,
+                       motivo=actual.motivo if motivo is None else motivo)
+        return self.cita_repository.actualizar(cita)
+
+    def cancelar_cita(self, cita_id: str) -> bool:
+
+        return self.cita_repository.borrar(cita_id)
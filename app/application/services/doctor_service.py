@@ -1,48 +1,187 @@
-from typing import List, Optional
-from app.domain.core.models import Doctor
-from app.application.ports.doctor_repository import DoctorRepository
+from dataclasses import replace
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, Union
+from app.domain.core.models import Doctor, ConflictoDeVersion
+from app.application.ports.async_repository import AsyncDoctorRepository
+from app.application.ports.cache_respuestas import CacheRespuestas
 
 
-class DoctorService:
-    
+# Etiquetas de las respuestas cacheadas: los listados dependen de todos los
+# doctores; una búsqueda por especialidad, solo de los de esa especialidad
+ETIQUETA_LISTADO = "listado"
 
-    def __init__(self, doctor_repository: DoctorRepository):
+
+def etiqueta_especialidad(especialidad: str) -> str:
+    return "especialidad:" + especialidad.casefold()
+
+
+def _etiquetas(doctors: Iterable[Optional[Doctor]]) -> Set[str]:
+    etiquetas = set()
+    for doctor in doctors:
+        if doctor is not None:
+            etiquetas.add(ETIQUETA_LISTADO)
+            etiquetas.add(etiqueta_especialidad(doctor.especialidad))
+    return etiquetas
+
+
+def _doctores_validos(datos: List[dict]) -> Tuple[List[Union[Doctor, ValueError]], List[Doctor]]:
+    resultados = []
+    validos = []
+    for item in datos:
+        try:
+            doctor = Doctor(nombre=item.get("nombre", ""), especialidad=item.get("especialidad", ""),
+                            email=item.get("email"))
+        except ValueError as e:
+            resultados.append(e)
+            continue
+        resultados.append(doctor)
+        validos.append(doctor)
+    return resultados, validos
+
+
+def _aplicar_cambio(doctor: Doctor, cambio: dict) -> Doctor:
+    """Copia de `doctor` con el cambio aplicado"""
+    return replace(doctor, nombre=cambio.get("nombre") or doctor.nombre,
+                   especialidad=cambio.get("especialidad") or doctor.especialidad,
+                   email=cambio.get("email") or doctor.email)
+
+
+class AsyncDoctorService:
+    """Casos de uso de doctores para el bucle de eventos: espera a un AsyncDoctorRepository
+
+    Los repositorios síncronos se adaptan con ExecutorDoctorRepository. La
+    caché de respuestas es local y no bloquea: se consulta sin esperar.
+    """
+
+    def __init__(self, doctor_repository: AsyncDoctorRepository, cache: Optional[CacheRespuestas] = None):
         self.doctor_repository = doctor_repository
+        self.cache = cache
+
+    async def _contador(self) -> int:
+        return (await self.doctor_repository.cambios_coleccion())[0] if self.cache is not None else 0
+
+    async def _invalidar(self, antes: int, doctors: Iterable[Optional[Doctor]]) -> None:
+        # `doctors`: estado anterior y nuevo de lo que se escribió; vacío si no se escribió nada
+        # Cada llamada al repositorio que escribe, también las de lote, sube el contador en uno
+        if self.cache is None:
+            return
+        etiquetas = _etiquetas(doctors)
+        self.cache.invalidar(etiquetas, antes, await self._contador(), 1 if etiquetas else 0)
+
+    async def registrar_doctor(self, nombre: str, especialidad: str,
+                               email: Optional[str] = None) -> Doctor:
 
-    def registrar_doctor(self, nombre: str, especialidad: str, 
-                        email: Optional[str] = None) -> Doctor:
-        
         doctor = Doctor(nombre=nombre, especialidad=especialidad, email=email)
-        return self.doctor_repository.guardar(doctor)
-
-    def obtener_doctor(self, doctor_id: str) -> Optional[Doctor]:
-       
-        return self.doctor_repository.buscar_por_id(doctor_id)
-
-    def listar_doctores(self) -> List[Doctor]:
-        
-        return self.doctor_repository.buscar_todos()
-
-    def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
-        
-        return self.doctor_repository.buscar_por_especialidad(especialidad)
-
-    def actualizar_doctor(self, doctor_id: str, nombre: Optional[str] = None, 
-                         especialidad: Optional[str] = None, email: Optional[str] = None) -> Optional[Doctor]:
-
-        doctor = self.doctor_repository.buscar_por_id(doctor_id)
-        if not doctor:
-            return None
-
-        if nombre:
-            doctor.nombre = nombre
-        if especialidad:
-            doctor.especialidad = especialidad
-        if email:
-            doctor.email = email
-        
-        return self.doctor_repository.actualizar(doctor)
-
-    def eliminar_doctor(self, doctor_id: str) -> bool:
-    
-        return self.doctor_repository.borrar(doctor_id)
+        antes = await self._contador()
+        await self.doctor_repository.guardar(doctor)
+        await self._invalidar(antes, [doctor])
+        return doctor
+
+    async def obtener_doctor(self, doctor_id: str) -> Optional[Doctor]:
+
+        return await self.doctor_repository.buscar_por_id(doctor_id)
+
+    async def version_doctor(self, doctor_id: str) -> int:
+        """Versión del doctor sin leerlo entero; 0 si no existe"""
+        return await self.doctor_repository.version_de(doctor_id)
+
+    async def cambios_doctores(self) -> Tuple[int, float]:
+        """Contador de escrituras de la colección y hora de la última"""
+        return await self.doctor_repository.cambios_coleccion()
+
+    async def estadisticas_doctores(self) -> Dict[str, int]:
+        """Registros de la colección y tamaño de sus índices"""
+        return await self.doctor_repository.estadisticas()
+
+    async def listar_doctores(self) -> List[Doctor]:
+
+        return await self.doctor_repository.buscar_todos()
+
+    async def listar_doctores_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+
+        return await self.doctor_repository.buscar_pagina(cursor, limit)
+
+    async def exportar_doctores(self, tamano_lote: int = 1000) -> AsyncIterator[List[Doctor]]:
+        """Recorre todos los doctores por lotes sin copiar la colección completa"""
+        cursor = None
+        while True:
+            lote, cursor = await self.doctor_repository.buscar_pagina(cursor, tamano_lote)
+            if lote:
+                yield lote
+            if cursor is None:
+                return
+
+    async def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        return await self.doctor_repository.buscar_por_especialidad(especialidad)
+
+    async def buscar_doctores(self, texto: str, limite: int) -> List[Doctor]:
+
+        return await self.doctor_repository.buscar_texto(texto, limite)
+
+    async def actualizar_doctor(self, doctor_id: str, nombre: Optional[str] = None,
+                                especialidad: Optional[str] = None, email: Optional[str] = None,
+                                version: Optional[int] = None) -> Optional[Doctor]:
+        """Con `version` solo se aplica si el doctor sigue en ella; si no, ConflictoDeVersion"""
+        antes = await self._contador()
+        # Se modifica una copia y se reintenta si otro la cambió entretanto
+        while True:
+            actual = await self.doctor_repository.buscar_por_id(doctor_id)
+            if not actual:
+                return None
+            if version is not None and actual.version != version:
+                raise ConflictoDeVersion(actual.version)
+            doctor = replace(actual, nombre=nombre or actual.nombre,
+                             especialidad=especialidad or actual.especialidad, email=email or actual.email)
+            if version is not None:
+                resultado = await self.doctor_repository.actualizar_si_version(doctor, version)
+                await self._invalidar(antes, [actual, resultado] if resultado else [])
+                return resultado
+            if await self.doctor_repository.comparar_y_actualizar(actual, doctor):
+                await self._invalidar(antes, [actual, doctor])
+                return doctor
+
+    async def eliminar_doctor(self, doctor_id: str) -> bool:
+
+        antes = await self._contador()
+        doctor = await self.doctor_repository.buscar_por_id(doctor_id) if self.cache is not None else None
+        borrado = await self.doctor_repository.borrar(doctor_id)
+        await self._invalidar(antes, [doctor] if borrado else [])
+        return borrado
+
+    async def registrar_doctores(self, datos: List[dict]) -> List[Union[Doctor, ValueError]]:
+        """Registra varios doctores; por posición devuelve el doctor o su error"""
+        resultados, validos = _doctores_validos(datos)
+        antes = await self._contador()
+        await self.doctor_repository.guardar_lote(validos)
+        await self._invalidar(antes, validos)
+        return resultados
+
+    async def actualizar_doctores(self, cambios: List[dict]) -> List[Optional[Doctor]]:
+        """Aplica varios cambios; None en la posición de los doctores inexistentes"""
+        copias: Dict[str, Doctor] = {}
+        anteriores = []
+        antes = await self._contador()
+        for cambio in cambios:
+            doctor_id = cambio["doctor_id"]
+            # Los cambios van sobre copias: el registro guardado solo cambia
+            # cuando actualizar_lote lo reemplaza, con los candados del repositorio
+            doctor = copias.get(doctor_id)
+            if doctor is None:
+                doctor = await self.doctor_repository.buscar_por_id(doctor_id)
+                if not doctor:
+                    continue
+                anteriores.append(doctor)
+            copias[doctor_id] = _aplicar_cambio(doctor, cambio)
+        actualizados = await self.doctor_repository.actualizar_lote(list(copias.values()))
+        await self._invalidar(antes, anteriores + actualizados if any(actualizados) else [])
+        vigentes = {doctor.id: doctor for doctor in actualizados if doctor is not None}
+        return [vigentes.get(cambio["doctor_id"]) for cambio in cambios]
+
+    async def eliminar_doctores(self, doctor_ids: List[str]) -> List[bool]:
+
+        antes = await self._contador()
+        doctors = [await self.doctor_repository.buscar_por_id(doctor_id) for doctor_id in doctor_ids] \
+            if self.cache is not None else []
+        borrados = await self.doctor_repository.borrar_lote(doctor_ids)
+        await self._invalidar(antes, [doctor for doctor, borrado in zip(doctors, borrados) if borrado])
+        return borrados
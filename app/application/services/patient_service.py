@@ -1,39 +1,114 @@
-from typing import List, Optional
-from app.domain.core.models import paciente
-from app.application.ports.patient_repository import PatientRepository
+from dataclasses import replace
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from app.domain.core.models import paciente, ConflictoDeVersion
+from app.application.ports.async_repository import AsyncPatientRepository
 
 
-class PatientService:
-   
+def _pacientes_validos(datos: List[dict]) -> Tuple[List[Union[paciente, ValueError]], List[paciente]]:
+    resultados = []
+    validos = []
+    for item in datos:
+        try:
+            patient = paciente(nombre=item.get("nombre", ""), email=item.get("email", ""))
+        except ValueError as e:
+            resultados.append(e)
+            continue
+        resultados.append(patient)
+        validos.append(patient)
+    return resultados, validos
 
-    def __init__(self, patient_repository: PatientRepository):
+
+class AsyncPatientService:
+    """Casos de uso de pacientes para el bucle de eventos: espera a un AsyncPatientRepository
+
+    Los repositorios síncronos se adaptan con ExecutorPatientRepository.
+    """
+
+    def __init__(self, patient_repository: AsyncPatientRepository):
         self.patient_repository = patient_repository
 
-    def registrar_paciente(self, nombre: str, email: str) -> paciente:
-       
+    async def registrar_paciente(self, nombre: str, email: str) -> paciente:
+
         patient = paciente(nombre=nombre, email=email)
-        return self.patient_repository.guardar(patient)
-
-    def obtener_paciente(self, patient_id: str) -> Optional[paciente]:
-      
-        return self.patient_repository.buscar_por_id(patient_id)
-
-    def listar_pacientes(self) -> List[paciente]:
-      
-        return self.patient_repository.buscar_todos()
-
-    def actualizar_paciente(self, patient_id: str, nombre: Optional[str] = None, 
-                           email: Optional[str] = None) -> Optional[paciente]:
-        
-        patient = self.patient_repository.buscar_por_id(patient_id)
-        if not patient:
-            return None
-
-        if nombre:
-            patient.nombre = nombre
-        if email:
-            patient.email = email
-        return self.patient_repository.actualizar(patient)
-
-    def eliminar_paciente(self, patient_id: str) -> bool:
-        return self.patient_repository.borrar(patient_id)
+        return await self.patient_repository.guardar(patient)
+
+    async def obtener_paciente(self, patient_id: str) -> Optional[paciente]:
+
+        return await self.patient_repository.buscar_por_id(patient_id)
+
+    async def version_paciente(self, patient_id: str) -> int:
+        """Versión del paciente sin leerlo entero; 0 si no existe"""
+        return await self.patient_repository.version_de(patient_id)
+
+    async def cambios_pacientes(self) -> Tuple[int, float]:
+        """Contador de escrituras de la colección y hora de la última"""
+        return await self.patient_repository.cambios_coleccion()
+
+    async def estadisticas_pacientes(self) -> Dict[str, int]:
+        """Registros de la colección y tamaño de sus índices"""
+        return await self.patient_repository.estadisticas()
+
+    async def listar_pacientes(self) -> List[paciente]:
+
+        return await self.patient_repository.buscar_todos()
+
+    async def listar_pacientes_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+
+        return await self.patient_repository.buscar_pagina(cursor, limit)
+
+    async def buscar_pacientes(self, texto: str, limite: int) -> List[paciente]:
+
+        return await self.patient_repository.buscar_texto(texto, limite)
+
+    async def exportar_pacientes(self, tamano_lote: int = 1000) -> AsyncIterator[List[paciente]]:
+        """Recorre todos los pacientes por lotes sin copiar la colección completa"""
+        cursor = None
+        while True:
+            lote, cursor = await self.patient_repository.buscar_pagina(cursor, tamano_lote)
+            if lote:
+                yield lote
+            if cursor is None:
+                return
+
+    async def actualizar_paciente(self, patient_id: str, nombre: Optional[str] = None,
+                                  email: Optional[str] = None, version: Optional[int] = None) -> Optional[paciente]:
+        """Con `version` solo se aplica si el paciente sigue en ella; si no, ConflictoDeVersion"""
+        # Se modifica una copia y se reintenta si otro la cambió entretanto
+        while True:
+            actual = await self.patient_repository.buscar_por_id(patient_id)
+            if not actual:
+                return None
+            if version is not None and actual.version != version:
+                raise ConflictoDeVersion(actual.version)
+            patient = replace(actual, nombre=nombre or actual.nombre, email=email or actual.email)
+            if version is not None:
+                return await self.patient_repository.actualizar_si_version(patient, version)
+            if await self.patient_repository.comparar_y_actualizar(actual, patient):
+                return patient
+
+    async def eliminar_paciente(self, patient_id: str) -> bool:
+        return await self.patient_repository.borrar(patient_id)
+
+    async def registrar_pacientes(self, datos: List[dict]) -> List[Union[paciente, ValueError]]:
+        """Registra varios pacientes; por posición devuelve el paciente o su error"""
+        resultados, validos = _pacientes_validos(datos)
+        await self.patient_repository.guardar_lote(validos)
+        return resultados
+
+    async def actualizar_pacientes(self, cambios: List[dict]) -> List[Optional[paciente]]:
+        """Aplica varios cambios; None en la posición de los pacientes inexistentes"""
+        copias: Dict[str, paciente] = {}
+        for cambio in cambios:
+            patient_id = cambio["patient_id"]
+            # Los cambios van sobre copias: el registro guardado solo cambia
+            # cuando actualizar_lote lo reemplaza, con los candados del repositorio
+            patient = copias.get(patient_id) or await self.patient_repository.buscar_por_id(patient_id)
+            if patient:
+                copias[patient_id] = replace(patient, nombre=cambio.get("nombre") or patient.nombre,
+                                             email=cambio.get("email") or patient.email)
+        actualizados = await self.patient_repository.actualizar_lote(list(copias.values()))
+        vigentes = {patient.id: patient for patient in actualizados if patient is not None}
+        return [vigentes.get(cambio["patient_id"]) for cambio in cambios]
+
+    async def eliminar_pacientes(self, patient_ids: List[str]) -> List[bool]:
+        return await self.patient_repository.borrar_lote(patient_ids)
@@ -1,15 +1,40 @@
+import sys
+import uuid
 from dataclasses import dataclass
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
-@dataclass
+_EPOCA = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
+
+def a_epoca(fecha: Optional[datetime]) -> int:
+    # Microsegundos exactos desde 1970 en la misma hora local (naive) del dominio; 0 = sin fecha
+    return (fecha - _EPOCA) // _MICROSEGUNDO if fecha else 0
+
+
+def desde_epoca(microsegundos: int) -> Optional[datetime]:
+    return _EPOCA + timedelta(microseconds=microsegundos) if microsegundos else None
+
+
+class ConflictoDeVersion(Exception):
+    """La versión guardada ya no es la que esperaba quien escribe"""
+
+    def __init__(self, version_actual: int):
+        super().__init__(f"El registro cambió; versión actual {version_actual}")
+        self.version_actual = version_actual
+
+
+@dataclass(slots=True)
 class paciente:
     
     id: Optional[str] = None
     nombre: str = ""
     email: str = ""
     fecha_creacion: Optional[datetime] = None
+    # La asigna el repositorio: 1 al crear, +1 en cada escritura
+    version: int = 0
 
     def __post_init__(self):
         if not self.nombre:
@@ -18,7 +43,7 @@ class paciente:
             raise ValueError("El email del paciente es requerido")
 
 
-@dataclass
+@dataclass(slots=True)
 class Doctor:
     """Modelo de dominio para Doctor"""
     id: Optional[str] = None
@@ -26,9 +51,80 @@ class Doctor:
     especialidad: str = ""
     email: Optional[str] = None
     fecha_creacion: Optional[datetime] = None
+    version: int = 0
 
     def __post_init__(self):
         if not self.nombre:
             raise ValueError("El nombre del doctor es requerido")
         if not self.especialidad:
             raise ValueError("La especialidad del doctor es requerida")
+
+
+class CitaSolapada(Exception):
+    """La cita se cruza con otra del mismo doctor"""
+
+    def __init__(self, cita_id: str):
+        super().__init__(f"El doctor ya tiene la cita {cita_id} en ese horario")
+        self.cita_id = cita_id
+
+
+@dataclass(slots=True)
+class Cita:
+    """Cita de un paciente con un doctor en [inicio, fin)"""
+    id: Optional[str] = None
+    doctor_id: str = ""
+    paciente_id: str = ""
+    inicio: Optional[datetime] = None
+    fin: Optional[datetime] = None
+    motivo: str = ""
+    fecha_creacion: Optional[datetime] = None
+    version: int = 0
+
+    def __post_init__(self):
+        if not self.doctor_id:
+            raise ValueError("El doctor de la cita es requerido")
+        if not self.paciente_id:
+            raise ValueError("El paciente de la cita es requerido")
+        if self.inicio is None or self.fin is None:
+            raise ValueError("El inicio y el fin de la cita son requeridos")
+        if self.fin <= self.inicio:
+            raise ValueError("La cita debe terminar después de empezar")
+
+
+@dataclass(slots=True, frozen=True)
+class PacienteCompacto:
+    """Registro inmutable de paciente para almacenamiento: id UUID como entero de 128 bits y fecha en epoch"""
+    id: int
+    nombre: str
+    email: str
+    creado: int = 0
+    version: int = 0
+
+    @classmethod
+    def desde(cls, patient: paciente) -> "PacienteCompacto":
+        return cls(uuid.UUID(patient.id).int, patient.nombre, patient.email,
+                   a_epoca(patient.fecha_creacion), patient.version)
+
+    def a_paciente(self) -> paciente:
+        return paciente(id=str(uuid.UUID(int=self.id)), nombre=self.nombre, email=self.email,
+                        fecha_creacion=desde_epoca(self.creado), version=self.version)
+
+
+@dataclass(slots=True, frozen=True)
+class DoctorCompacto:
+    """Registro inmutable de doctor para almacenamiento; la especialidad se guarda internada"""
+    id: int
+    nombre: str
+    especialidad: str
+    email: Optional[str] = None
+    creado: int = 0
+    version: int = 0
+
+    @classmethod
+    def desde(cls, doctor: Doctor) -> "DoctorCompacto":
+        return cls(uuid.UUID(doctor.id).int, doctor.nombre, sys.intern(doctor.especialidad),
+                   doctor.email, a_epoca(doctor.fecha_creacion), doctor.version)
+
+    def a_doctor(self) -> Doctor:
+        return Doctor(id=str(uuid.UUID(int=self.id)), nombre=self.nombre, especialidad=self.especialidad,
+                      email=self.email, fecha_creacion=desde_epoca(self.creado), version=self.version)
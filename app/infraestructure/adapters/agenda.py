@@ -0,0 +1,85 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+# Índice de intervalos de la agenda de un doctor. Las citas de un doctor nunca
+# se cruzan (guardar lo impide), así que ordenadas por inicio también quedan
+# ordenadas por fin: basta con listas paralelas ordenadas y bisect, como un
+# árbol de intervalos pero sin nodos ni reequilibrado.
+#  - cruces con [inicio, fin): la primera cita que termina después de
+#    `inicio` se encuentra con bisect en `fines` y desde ahí se avanza
+#    mientras empiecen antes de `fin`: O(log n + k).
+#  - insertar: la misma búsqueda decide si hay choque y dónde va; el
+#    desplazamiento de la lista es un memmove de punteros.
+# Las listas guardan los mismos datetime de las citas: sin copias ni
+# conversiones, y se comparan en C.
+
+
+class Agenda:
+    """Citas de un doctor como intervalos [inicio, fin) sin cruces"""
+    __slots__ = ("inicios", "fines", "ids")
+
+    def __init__(self):
+        self.inicios: List[datetime] = []
+        self.fines: List[datetime] = []
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def cruces(self, inicio: datetime, fin: datetime) -> Iterator[str]:
+        """Ids de las citas que se cruzan con [inicio, fin), por hora de inicio"""
+        inicios, ids = self.inicios, self.ids
+        posicion = bisect_right(self.fines, inicio)
+        while posicion < len(ids) and inicios[posicion] < fin:
+            yield ids[posicion]
+            posicion += 1
+
+    def insertar(self, cita_id: str, inicio: datetime, fin: datetime) -> Optional[str]:
+        """Añade la cita si no choca; si choca devuelve el id de la otra y no cambia nada"""
+        posicion = bisect_right(self.fines, inicio)
+        if posicion < len(self.inicios) and self.inicios[posicion] < fin:
+            return self.ids[posicion]
+        self.inicios.insert(posicion, inicio)
+        self.fines.insert(posicion, fin)
+        self.ids.insert(posicion, cita_id)
+        return None
+
+    def quitar(self, cita_id: str, inicio: datetime) -> bool:
+        # Sin cruces no hay dos citas con el mismo inicio
+        posicion = bisect_left(self.inicios, inicio)
+        if posicion < len(self.ids) and self.ids[posicion] == cita_id:
+            del self.inicios[posicion]
+            del self.fines[posicion]
+            del self.ids[posicion]
+            return True
+        return False
+
+
+class Agendas:
+    """Una Agenda por doctor"""
+    __slots__ = ("_por_doctor",)
+
+    def __init__(self):
+        self._por_doctor: Dict[str, Agenda] = {}
+
+    def de(self, doctor_id: str) -> Optional[Agenda]:
+        return self._por_doctor.get(doctor_id)
+
+    def insertar(self, doctor_id: str, cita_id: str, inicio: datetime, fin: datetime) -> Optional[str]:
+        agenda = self._por_doctor.get(doctor_id)
+        if agenda is None:
+            agenda = self._por_doctor[doctor_id] = Agenda()
+        return agenda.insertar(cita_id, inicio, fin)
+
+    def quitar(self, doctor_id: str, cita_id: str, inicio: datetime) -> bool:
+        agenda = self._por_doctor.get(doctor_id)
+        if agenda is None or not agenda.quitar(cita_id, inicio):
+            return False
+        if not agenda:
+            del self._por_doctor[doctor_id]
+        return True
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {"agendas_doctores": len(self._por_doctor)}
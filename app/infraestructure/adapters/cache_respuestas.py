@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+from app.application.ports.cache_respuestas import CacheRespuestas, Entrada
+
+
+# Memoria estimada de una entrada además de su cuerpo: nodo del OrderedDict,
+# tupla, diccionario de cabeceras y su sitio en el índice de etiquetas
+_SOBRECOSTE_ENTRADA = 400
+BYTES_POR_DEFECTO = 64 * 1024 * 1024
+
+
+def _tamano(clave: Hashable, entrada: Entrada) -> int:
+    cuerpo, cabeceras = entrada
+    return (len(cuerpo) + len(repr(clave)) + _SOBRECOSTE_ENTRADA
+            + sum(len(nombre) + len(valor) for nombre, valor in cabeceras.items()))
+
+
+class CacheLRU(CacheRespuestas):
+    """Caché LRU de respuestas serializadas con un tope de memoria en bytes"""
+
+    def __init__(self, maximo_bytes: int = BYTES_POR_DEFECTO):
+        if maximo_bytes <= 0:
+            raise ValueError("El tope de memoria debe ser positivo")
+        self.maximo_bytes = maximo_bytes
+        self._candado = threading.Lock()
+        self._entradas: OrderedDict[Hashable, Tuple[Entrada, Tuple[str, ...], int]] = OrderedDict()
+        self._por_etiqueta: Dict[str, Set[Hashable]] = {}
+        self._contador: Optional[int] = None
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+        self.rechazadas = 0
+
+    def _quitar(self, clave: Hashable) -> None:
+        _, etiquetas, tamano = self._entradas.pop(clave)
+        self.bytes -= tamano
+        for etiqueta in etiquetas:
+            claves = self._por_etiqueta.get(etiqueta)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_etiqueta[etiqueta]
+
+    def _vaciar(self) -> None:
+        self.invalidaciones += len(self._entradas)
+        self._entradas.clear()
+        self._por_etiqueta.clear()
+        self.bytes = 0
+
+    def _sincronizar(self, contador: int) -> None:
+        # Un contador distinto del conocido es una escritura que no pasó por invalidar()
+        if contador != self._contador:
+            self._vaciar()
+            self._contador = contador
+
+    def obtener(self, clave: Hashable, contador: int) -> Optional[Entrada]:
+
+        with self._candado:
+            self._sincronizar(contador)
+            guardada = self._entradas.get(clave)
+            if guardada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return guardada[0]
+
+    def guardar(self, clave: Hashable, entrada: Entrada, etiquetas: Iterable[str], contador: int) -> None:
+
+        tamano = _tamano(clave, entrada)
+        with self._candado:
+            # Datos leídos antes de una escritura ya invalidada no deben entrar
+            if contador != self._contador:
+                return
+            if tamano > self.maximo_bytes:
+                self.rechazadas += 1
+                return
+            if clave in self._entradas:
+                self._quitar(clave)
+            etiquetas = tuple(etiquetas)
+            self._entradas[clave] = (entrada, etiquetas, tamano)
+            self.bytes += tamano
+            for etiqueta in etiquetas:
+                self._por_etiqueta.setdefault(etiqueta, set()).add(clave)
+            while self.bytes > self.maximo_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.desalojos += 1
+
+    def invalidar(self, etiquetas: Iterable[str], antes: int, despues: int, escrituras: int) -> None:
+
+        with self._candado:
+            if antes != self._contador or despues - antes != escrituras:
+                self._vaciar()
+            else:
+                for etiqueta in etiquetas:
+                    for clave in list(self._por_etiqueta.get(etiqueta, ())):
+                        self._quitar(clave)
+                        self.invalidaciones += 1
+            self._contador = despues
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        with self._candado:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "invalidaciones": self.invalidaciones,
+                "rechazadas": self.rechazadas,
+                "entradas": len(self._entradas),
+                "bytes": self.bytes,
+                "maximo_bytes": self.maximo_bytes,
+            }
@@ -0,0 +1,495 @@
+import sys
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor, a_epoca, desde_epoca
+from app.application.ports.patient_repository import PatientRepository
+from app.application.ports.doctor_repository import DoctorRepository
+from app.infraestructure.adapters.database import (
+    _insertar_ids,
+    _quitar_ids,
+    _pagina,
+    _nuevos_ids,
+    ContadorCambios
+)
+from app.infraestructure.adapters.compacto import _clave, _clave_cursor, _texto_cursor
+from app.infraestructure.adapters.busqueda import IndiceTexto
+
+
+# Almacenamiento por columnas: cada campo vive en su propio array y los
+# textos se guardan en una arena de bytes con (inicio, largo) por fila.
+# Los objetos del dominio solo se construyen al leer, para las filas pedidas.
+# El índice de texto usa la clave UUID, que no cambia al compactar.
+
+_MASCARA_64 = (1 << 64) - 1
+# Se reconstruyen las columnas cuando las filas borradas superan a las vivas,
+# o cuando la basura de las arenas (textos sobrescritos o de filas borradas)
+# pasa de la mitad de su tamaño: con solo actualizaciones no hay filas
+# borradas y la arena crecería sin límite
+_MINIMO_PARA_COMPACTAR = 1024
+_MINIMO_BASURA = 64 * 1024
+_FRACCION_BASURA = 0.5
+
+
+class _ColumnaTexto:
+    """Textos UTF-8 contiguos en una arena; None se marca con largo NULO"""
+
+    NULO = 0xFFFFFFFF
+
+    def __init__(self):
+        self.arena = bytearray()
+        self.inicio = array("Q")
+        self.largo = array("I")
+        # Bytes de la arena que ya no lee ninguna fila viva
+        self.basura = 0
+
+    def agregar(self, texto: Optional[str]) -> None:
+        self.inicio.append(0)
+        self.largo.append(self.NULO)
+        self.escribir(len(self.largo) - 1, texto)
+
+    def escribir(self, fila: int, texto: Optional[str]) -> None:
+        # Las versiones anteriores quedan como basura en la arena hasta compactar
+        self.descartar(fila)
+        if texto is None:
+            self.largo[fila] = self.NULO
+            return
+        datos = texto.encode("utf-8")
+        self.inicio[fila] = len(self.arena)
+        self.largo[fila] = len(datos)
+        self.arena += datos
+
+    def descartar(self, fila: int) -> None:
+        largo = self.largo[fila]
+        if largo != self.NULO:
+            self.basura += largo
+
+    def leer(self, fila: int) -> Optional[str]:
+        largo = self.largo[fila]
+        if largo == self.NULO:
+            return None
+        inicio = self.inicio[fila]
+        return self.arena[inicio:inicio + largo].decode("utf-8")
+
+    def leer_varias(self, filas: Iterator[int]) -> Iterator[Optional[str]]:
+        """Lectura secuencial: si la arena es ASCII se decodifica una sola vez y se recorta"""
+        inicio, largo, nulo = self.inicio, self.largo, self.NULO
+        if self.arena.isascii():
+            arena = self.arena.decode("ascii")
+            for fila in filas:
+                n = largo[fila]
+                yield None if n == nulo else arena[inicio[fila]:inicio[fila] + n]
+        else:
+            for fila in filas:
+                yield self.leer(fila)
+
+
+class _Tabla:
+    """Columnas comunes (id, creado, versión, vivo y textos) más el mapa id -> fila"""
+
+    def __init__(self, columnas_texto: Tuple[str, ...]):
+        self.columnas_texto = columnas_texto
+        self._reiniciar()
+
+    def _reiniciar(self) -> None:
+        self.id_alto = array("Q")
+        self.id_bajo = array("Q")
+        self.creado = array("q")
+        self.version = array("I")
+        self.vivo = bytearray()
+        self.texto = {nombre: _ColumnaTexto() for nombre in self.columnas_texto}
+        self.fila_de: Dict[int, int] = {}
+        self.ids_ordenados: List[int] = []
+        self.borradas = 0
+
+    def __len__(self) -> int:
+        return len(self.fila_de)
+
+    def clave(self, fila: int) -> int:
+        return (self.id_alto[fila] << 64) | self.id_bajo[fila]
+
+    def agregar(self, clave: int, creado: int, version: int, textos: Dict[str, Optional[str]]) -> int:
+        fila = len(self.vivo)
+        self.id_alto.append(clave >> 64)
+        self.id_bajo.append(clave & _MASCARA_64)
+        self.creado.append(creado)
+        self.version.append(version)
+        self.vivo.append(1)
+        for nombre, columna in self.texto.items():
+            columna.agregar(textos[nombre])
+        self.fila_de[clave] = fila
+        return fila
+
+    def escribir(self, fila: int, creado: int, textos: Dict[str, Optional[str]]) -> int:
+        """Sobrescribe la fila y devuelve su nueva versión"""
+        self.creado[fila] = creado
+        self.version[fila] += 1
+        for nombre, columna in self.texto.items():
+            columna.escribir(fila, textos[nombre])
+        return self.version[fila]
+
+    def borrar(self, clave: int) -> Optional[int]:
+        fila = self.fila_de.pop(clave, None)
+        if fila is not None:
+            self.vivo[fila] = 0
+            self.borradas += 1
+            for columna in self.texto.values():
+                columna.descartar(fila)
+        return fila
+
+    @property
+    def basura(self) -> int:
+        return sum(columna.basura for columna in self.texto.values())
+
+    def debe_compactar(self) -> bool:
+        if self.borradas >= _MINIMO_PARA_COMPACTAR and self.borradas > len(self.fila_de):
+            return True
+        basura = self.basura
+        return basura >= _MINIMO_BASURA and basura > _FRACCION_BASURA * sum(
+            len(columna.arena) for columna in self.texto.values())
+
+    def filas_vivas(self) -> Iterator[int]:
+        if not self.borradas:
+            return iter(range(len(self.vivo)))
+        return (fila for fila, vivo in enumerate(self.vivo) if vivo)
+
+    def compactar(self) -> Dict[int, int]:
+        """Reescribe las columnas sin filas borradas ni basura; devuelve fila vieja -> nueva"""
+        anterior = (self.id_alto, self.id_bajo, self.creado, self.version, self.vivo, self.texto)
+        ids_ordenados = self.ids_ordenados
+        self._reiniciar()
+        self.ids_ordenados = ids_ordenados
+        id_alto, id_bajo, creado, version, vivo, texto = anterior
+        nuevas = {}
+        for fila, esta_viva in enumerate(vivo):
+            if esta_viva:
+                clave = (id_alto[fila] << 64) | id_bajo[fila]
+                nuevas[fila] = self.agregar(clave, creado[fila], version[fila],
+                                            {nombre: columna.leer(fila) for nombre, columna in texto.items()})
+        return nuevas
+
+
+class ColumnarPatientRepository(PatientRepository):
+
+
+    def __init__(self):
+        self.tabla = _Tabla(("nombre", "email"))
+        self._cambios = ContadorCambios()
+        self._texto = IndiceTexto()
+
+    def _leer(self, fila: int) -> paciente:
+        tabla = self.tabla
+        return paciente(id=_texto_cursor(tabla.clave(fila)), nombre=tabla.texto["nombre"].leer(fila),
+                        email=tabla.texto["email"].leer(fila), fecha_creacion=desde_epoca(tabla.creado[fila]),
+                        version=tabla.version[fila])
+
+    @staticmethod
+    def _textos(patient: paciente) -> Dict[str, Optional[str]]:
+        return {"nombre": patient.nombre, "email": patient.email}
+
+    def emails(self) -> Iterator[str]:
+        """Todos los emails sin construir pacientes"""
+        return self.tabla.texto["email"].leer_varias(self.tabla.filas_vivas())
+
+    def guardar(self, patient: paciente) -> paciente:
+
+        return self.guardar_lote([patient])[0]
+
+    def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
+
+        fila = self.tabla.fila_de.get(_clave(patient_id))
+        return self._leer(fila) if fila is not None else None
+
+    def buscar_todos(self) -> List[paciente]:
+
+        return [self._leer(fila) for fila in self.tabla.filas_vivas()]
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+
+        claves, siguiente = _pagina(self.tabla.ids_ordenados, _clave_cursor(cursor), limit)
+        return [self._leer(self.tabla.fila_de[clave]) for clave in claves], _texto_cursor(siguiente)
+
+    def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+
+        return [self._leer(self.tabla.fila_de[clave]) for clave in self._texto.buscar(texto, limite)]
+
+    def version_de(self, patient_id: str) -> int:
+
+        fila = self.tabla.fila_de.get(_clave(patient_id))
+        return self.tabla.version[fila] if fila is not None else 0
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return {"registros": len(self.tabla), "filas_borradas": self.tabla.borradas,
+                "bytes_basura": self.tabla.basura, **self._texto.estadisticas()}
+
+    def actualizar(self, patient: paciente) -> paciente:
+
+        return self.actualizar_lote([patient])[0]
+
+    def borrar(self, patient_id: str) -> bool:
+
+        return self.borrar_lote([patient_id])[0]
+
+    def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+
+        sin_id = [patient for patient in patients if not patient.id]
+        for patient, patient_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            patient.id = patient_id
+        ahora = datetime.now()
+        creado = a_epoca(ahora)
+        nuevos = []
+        for patient in patients:
+            clave = _clave(patient.id)
+            if clave is None:
+                raise ValueError(f"El id {patient.id!r} no es un UUID")
+            patient.fecha_creacion = ahora
+            fila = self.tabla.fila_de.get(clave)
+            if fila is None:
+                self.tabla.agregar(clave, creado, 1, self._textos(patient))
+                patient.version = 1
+                nuevos.append(clave)
+            else:
+                patient.version = self.tabla.escribir(fila, creado, self._textos(patient))
+            self._texto.indexar(clave, patient.nombre, patient.email)
+        _insertar_ids(self.tabla.ids_ordenados, nuevos)
+        if patients:
+            self._cambios.anotar()
+        if self.tabla.debe_compactar():
+            self.tabla.compactar()
+        return patients
+
+    def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+
+        resultados = []
+        for patient in patients:
+            clave = _clave(patient.id)
+            fila = self.tabla.fila_de.get(clave)
+            if fila is None:
+                resultados.append(None)
+                continue
+            patient.version = self.tabla.escribir(fila, a_epoca(patient.fecha_creacion), self._textos(patient))
+            self._texto.indexar(clave, patient.nombre, patient.email)
+            resultados.append(patient)
+        if any(resultados):
+            self._cambios.anotar()
+        if self.tabla.debe_compactar():
+            self.tabla.compactar()
+        return resultados
+
+    def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+
+        resultados = []
+        borrados = []
+        for patient_id in patient_ids:
+            clave = _clave(patient_id)
+            existia = self.tabla.borrar(clave) is not None
+            if existia:
+                borrados.append(clave)
+                self._texto.quitar(clave)
+            resultados.append(existia)
+        _quitar_ids(self.tabla.ids_ordenados, borrados)
+        if borrados:
+            self._cambios.anotar()
+        if self.tabla.debe_compactar():
+            self.tabla.compactar()
+        return resultados
+
+
+class ColumnarDoctorRepository(DoctorRepository):
+
+
+    def __init__(self):
+        self.tabla = _Tabla(("nombre", "email"))
+        self._cambios = ContadorCambios()
+        # Especialidad codificada por diccionario: un código de 16 bits por fila
+        self.codigo_especialidad = array("H")
+        self.especialidades: List[str] = []
+        self._codigo_de: Dict[str, int] = {}
+        # Código de la especialidad normalizada -> filas, en orden de alta
+        self._filas_por_clave: Dict[str, Dict[int, None]] = {}
+        self._texto = IndiceTexto()
+
+    def _codificar(self, especialidad: str) -> int:
+        codigo = self._codigo_de.get(especialidad)
+        if codigo is None:
+            codigo = len(self.especialidades)
+            if codigo > 0xFFFF:
+                raise ValueError("Demasiadas especialidades distintas para la columna de 16 bits")
+            self.especialidades.append(sys.intern(especialidad))
+            self._codigo_de[especialidad] = codigo
+        return codigo
+
+    def _indexar(self, fila: int, codigo_anterior: Optional[int]) -> None:
+        if codigo_anterior is not None:
+            clave = self.especialidades[codigo_anterior].casefold()
+            filas = self._filas_por_clave[clave]
+            del filas[fila]
+            if not filas:
+                del self._filas_por_clave[clave]
+        clave = self.especialidades[self.codigo_especialidad[fila]].casefold()
+        self._filas_por_clave.setdefault(clave, {})[fila] = None
+
+    def _leer(self, fila: int) -> Doctor:
+        tabla = self.tabla
+        return Doctor(id=_texto_cursor(tabla.clave(fila)), nombre=tabla.texto["nombre"].leer(fila),
+                      especialidad=self.especialidades[self.codigo_especialidad[fila]],
+                      email=tabla.texto["email"].leer(fila), fecha_creacion=desde_epoca(tabla.creado[fila]),
+                      version=tabla.version[fila])
+
+    @staticmethod
+    def _textos(doctor: Doctor) -> Dict[str, Optional[str]]:
+        return {"nombre": doctor.nombre, "email": doctor.email}
+
+    def contar_por_especialidad(self) -> Dict[str, int]:
+        """Número de doctores por especialidad normalizada, sin recorrer filas"""
+        return {clave: len(filas) for clave, filas in self._filas_por_clave.items()}
+
+    def emails(self) -> Iterator[Optional[str]]:
+        """Todos los emails sin construir doctores"""
+        return self.tabla.texto["email"].leer_varias(self.tabla.filas_vivas())
+
+    def guardar(self, doctor: Doctor) -> Doctor:
+
+        return self.guardar_lote([doctor])[0]
+
+    def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
+
+        fila = self.tabla.fila_de.get(_clave(doctor_id))
+        return self._leer(fila) if fila is not None else None
+
+    def buscar_todos(self) -> List[Doctor]:
+
+        return [self._leer(fila) for fila in self.tabla.filas_vivas()]
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+
+        claves, siguiente = _pagina(self.tabla.ids_ordenados, _clave_cursor(cursor), limit)
+        return [self._leer(self.tabla.fila_de[clave]) for clave in claves], _texto_cursor(siguiente)
+
+    def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        filas = self._filas_por_clave.get(especialidad.casefold(), {})
+        return [self._leer(fila) for fila in filas]
+
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+
+        return [self._leer(self.tabla.fila_de[clave]) for clave in self._texto.buscar(texto, limite)]
+
+    def version_de(self, doctor_id: str) -> int:
+
+        fila = self.tabla.fila_de.get(_clave(doctor_id))
+        return self.tabla.version[fila] if fila is not None else 0
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return {"registros": len(self.tabla), "filas_borradas": self.tabla.borradas,
+                "bytes_basura": self.tabla.basura, "indice_especialidades": len(self._filas_por_clave),
+                **self._texto.estadisticas()}
+
+    def actualizar(self, doctor: Doctor) -> Doctor:
+
+        return self.actualizar_lote([doctor])[0]
+
+    def borrar(self, doctor_id: str) -> bool:
+
+        return self.borrar_lote([doctor_id])[0]
+
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+
+        sin_id = [doctor for doctor in doctors if not doctor.id]
+        for doctor, doctor_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            doctor.id = doctor_id
+        ahora = datetime.now()
+        creado = a_epoca(ahora)
+        nuevos = []
+        for doctor in doctors:
+            clave = _clave(doctor.id)
+            if clave is None:
+                raise ValueError(f"El id {doctor.id!r} no es un UUID")
+            doctor.fecha_creacion = ahora
+            fila = self.tabla.fila_de.get(clave)
+            if fila is None:
+                fila = self.tabla.agregar(clave, creado, 1, self._textos(doctor))
+                self.codigo_especialidad.append(self._codificar(doctor.especialidad))
+                self._indexar(fila, None)
+                doctor.version = 1
+                nuevos.append(clave)
+            else:
+                doctor.version = self._escribir(fila, creado, doctor)
+            self._texto.indexar(clave, doctor.nombre, doctor.email)
+        _insertar_ids(self.tabla.ids_ordenados, nuevos)
+        if doctors:
+            self._cambios.anotar()
+        if self.tabla.debe_compactar():
+            self._compactar()
+        return doctors
+
+    def _escribir(self, fila: int, creado: int, doctor: Doctor) -> int:
+        version = self.tabla.escribir(fila, creado, self._textos(doctor))
+        codigo_anterior = self.codigo_especialidad[fila]
+        codigo = self._codificar(doctor.especialidad)
+        if codigo != codigo_anterior:
+            self.codigo_especialidad[fila] = codigo
+            self._indexar(fila, codigo_anterior)
+        return version
+
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+
+        resultados = []
+        for doctor in doctors:
+            clave = _clave(doctor.id)
+            fila = self.tabla.fila_de.get(clave)
+            if fila is None:
+                resultados.append(None)
+                continue
+            doctor.version = self._escribir(fila, a_epoca(doctor.fecha_creacion), doctor)
+            self._texto.indexar(clave, doctor.nombre, doctor.email)
+            resultados.append(doctor)
+        if any(resultados):
+            self._cambios.anotar()
+        if self.tabla.debe_compactar():
+            self._compactar()
+        return resultados
+
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+
+        resultados = []
+        borrados = []
+        for doctor_id in doctor_ids:
+            clave = _clave(doctor_id)
+            fila = self.tabla.borrar(clave)
+            if fila is not None:
+                borrados.append(clave)
+                self._texto.quitar(clave)
+                especialidad = self.especialidades[self.codigo_especialidad[fila]].casefold()
+                filas = self._filas_por_clave[especialidad]
+                del filas[fila]
+                if not filas:
+                    del self._filas_por_clave[especialidad]
+            resultados.append(fila is not None)
+        _quitar_ids(self.tabla.ids_ordenados, borrados)
+        if borrados:
+            self._cambios.anotar()
+        if self.tabla.debe_compactar():
+            self._compactar()
+        return resultados
+
+    def _compactar(self) -> None:
+        nuevas = self.tabla.compactar()
+        codigos = array("H", bytes(2 * len(nuevas)))
+        for vieja, nueva in nuevas.items():
+            codigos[nueva] = self.codigo_especialidad[vieja]
+        self.codigo_especialidad = codigos
+        self._filas_por_clave = {
+            clave: {nuevas[fila]: None for fila in filas}
+            for clave, filas in self._filas_por_clave.items()
+        }
@@ -0,0 +1,291 @@
+import sys
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor, PacienteCompacto, DoctorCompacto
+from app.application.ports.patient_repository import PatientRepository
+from app.application.ports.doctor_repository import DoctorRepository
+from app.infraestructure.adapters.database import (
+    _insertar_ids,
+    _quitar_ids,
+    _pagina,
+    _nuevos_ids,
+    _siguiente_version,
+    ContadorCambios
+)
+from app.infraestructure.adapters.busqueda import IndiceTexto
+
+
+# Variantes de los repositorios en memoria para colecciones de millones de
+# registros: guardan PacienteCompacto/DoctorCompacto con la clave UUID como
+# entero y entregan objetos del dominio recién creados en cada lectura.
+# El orden de los UUID como entero coincide con el de su texto canónico, así
+# que los cursores de paginación son los mismos que en InMemory*Repository.
+
+
+def _clave(item_id: Optional[str]) -> Optional[int]:
+    try:
+        return uuid.UUID(item_id).int
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _clave_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    clave = _clave(cursor)
+    if clave is None:
+        raise ValueError("Cursor inválido")
+    return clave
+
+
+def _texto_cursor(clave: Optional[int]) -> Optional[str]:
+    return str(uuid.UUID(int=clave)) if clave is not None else None
+
+
+class CompactPatientRepository(PatientRepository):
+
+
+    def __init__(self):
+        self.patients: dict[int, PacienteCompacto] = {}
+        self._cambios = ContadorCambios()
+        self._ids_ordenados: List[int] = []
+        self._texto = IndiceTexto()
+
+    def guardar(self, patient: paciente) -> paciente:
+
+        return self.guardar_lote([patient])[0]
+
+    def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
+
+        registro = self.patients.get(_clave(patient_id))
+        return registro.a_paciente() if registro else None
+
+    def buscar_todos(self) -> List[paciente]:
+
+        return [registro.a_paciente() for registro in self.patients.values()]
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+
+        claves, siguiente = _pagina(self._ids_ordenados, _clave_cursor(cursor), limit)
+        return [self.patients[clave].a_paciente() for clave in claves], _texto_cursor(siguiente)
+
+    def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+
+        return [self.patients[clave].a_paciente() for clave in self._texto.buscar(texto, limite)]
+
+    def version_de(self, patient_id: str) -> int:
+
+        registro = self.patients.get(_clave(patient_id))
+        return registro.version if registro else 0
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return {"registros": len(self.patients), **self._texto.estadisticas()}
+
+    def actualizar(self, patient: paciente) -> paciente:
+
+        return self.actualizar_lote([patient])[0]
+
+    def borrar(self, patient_id: str) -> bool:
+
+        return self.borrar_lote([patient_id])[0]
+
+    def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+
+        sin_id = [patient for patient in patients if not patient.id]
+        for patient, patient_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            patient.id = patient_id
+        ahora = datetime.now()
+        nuevos = []
+        for patient in patients:
+            patient.fecha_creacion = ahora
+            anterior = self.patients.get(_clave(patient.id))
+            patient.version = _siguiente_version(anterior)
+            registro = PacienteCompacto.desde(patient)
+            if anterior is None:
+                nuevos.append(registro.id)
+            self.patients[registro.id] = registro
+            self._texto.indexar(registro.id, registro.nombre, registro.email)
+        _insertar_ids(self._ids_ordenados, nuevos)
+        if patients:
+            self._cambios.anotar()
+        return patients
+
+    def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+
+        resultados = []
+        for patient in patients:
+            clave = _clave(patient.id)
+            actual = self.patients.get(clave)
+            if actual is not None:
+                patient.version = actual.version + 1
+                registro = PacienteCompacto.desde(patient)
+                self.patients[clave] = registro
+                self._texto.indexar(clave, registro.nombre, registro.email)
+                resultados.append(patient)
+            else:
+                resultados.append(None)
+        if any(resultados):
+            self._cambios.anotar()
+        return resultados
+
+    def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+
+        resultados = []
+        borrados = []
+        for patient_id in patient_ids:
+            clave = _clave(patient_id)
+            existia = self.patients.pop(clave, None) is not None
+            if existia:
+                borrados.append(clave)
+                self._texto.quitar(clave)
+            resultados.append(existia)
+        _quitar_ids(self._ids_ordenados, borrados)
+        if borrados:
+            self._cambios.anotar()
+        return resultados
+
+
+class CompactDoctorRepository(DoctorRepository):
+
+
+    def __init__(self):
+        self.doctors: dict[int, DoctorCompacto] = {}
+        self._cambios = ContadorCambios()
+        self._ids_ordenados: List[int] = []
+        self._por_especialidad: dict[str, dict[int, None]] = {}
+        self._especialidad_de: dict[int, str] = {}
+        self._texto = IndiceTexto()
+
+    def _indexar(self, registro: DoctorCompacto) -> None:
+        self._texto.indexar(registro.id, registro.nombre, registro.email)
+        clave = sys.intern(registro.especialidad.casefold())
+        anterior = self._especialidad_de.get(registro.id)
+        if anterior == clave:
+            return
+        if anterior is not None:
+            self._desindexar_especialidad(registro.id)
+        self._por_especialidad.setdefault(clave, {})[registro.id] = None
+        self._especialidad_de[registro.id] = clave
+
+    def _desindexar(self, doctor_clave: int) -> None:
+        self._texto.quitar(doctor_clave)
+        self._desindexar_especialidad(doctor_clave)
+
+    def _desindexar_especialidad(self, doctor_clave: int) -> None:
+        clave = self._especialidad_de.pop(doctor_clave, None)
+        if clave is None:
+            return
+        ids = self._por_especialidad[clave]
+        del ids[doctor_clave]
+        if not ids:
+            del self._por_especialidad[clave]
+
+    def guardar(self, doctor: Doctor) -> Doctor:
+
+        return self.guardar_lote([doctor])[0]
+
+    def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
+
+        registro = self.doctors.get(_clave(doctor_id))
+        return registro.a_doctor() if registro else None
+
+    def buscar_todos(self) -> List[Doctor]:
+
+        return [registro.a_doctor() for registro in self.doctors.values()]
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+
+        claves, siguiente = _pagina(self._ids_ordenados, _clave_cursor(cursor), limit)
+        return [self.doctors[clave].a_doctor() for clave in claves], _texto_cursor(siguiente)
+
+    def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        claves = self._por_especialidad.get(especialidad.casefold(), {})
+        return [self.doctors[clave].a_doctor() for clave in claves]
+
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+
+        return [self.doctors[clave].a_doctor() for clave in self._texto.buscar(texto, limite)]
+
+    def version_de(self, doctor_id: str) -> int:
+
+        registro = self.doctors.get(_clave(doctor_id))
+        return registro.version if registro else 0
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return {"registros": len(self.doctors), "indice_especialidades": len(self._por_especialidad),
+                **self._texto.estadisticas()}
+
+    def actualizar(self, doctor: Doctor) -> Doctor:
+
+        return self.actualizar_lote([doctor])[0]
+
+    def borrar(self, doctor_id: str) -> bool:
+
+        return self.borrar_lote([doctor_id])[0]
+
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+
+        sin_id = [doctor for doctor in doctors if not doctor.id]
+        for doctor, doctor_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            doctor.id = doctor_id
+        ahora = datetime.now()
+        nuevos = []
+        for doctor in doctors:
+            doctor.fecha_creacion = ahora
+            anterior = self.doctors.get(_clave(doctor.id))
+            doctor.version = _siguiente_version(anterior)
+            registro = DoctorCompacto.desde(doctor)
+            if anterior is None:
+                nuevos.append(registro.id)
+            self.doctors[registro.id] = registro
+            self._indexar(registro)
+        _insertar_ids(self._ids_ordenados, nuevos)
+        if doctors:
+            self._cambios.anotar()
+        return doctors
+
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+
+        resultados = []
+        for doctor in doctors:
+            clave = _clave(doctor.id)
+            actual = self.doctors.get(clave)
+            if actual is not None:
+                doctor.version = actual.version + 1
+                registro = DoctorCompacto.desde(doctor)
+                self.doctors[clave] = registro
+                self._indexar(registro)
+                resultados.append(doctor)
+            else:
+                resultados.append(None)
+        if any(resultados):
+            self._cambios.anotar()
+        return resultados
+
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+
+        resultados = []
+        borrados = []
+        for doctor_id in doctor_ids:
+            clave = _clave(doctor_id)
+            existia = self.doctors.pop(clave, None) is not None
+            if existia:
+                borrados.append(clave)
+                self._desindexar(clave)
+            resultados.append(existia)
+        _quitar_ids(self._ids_ordenados, borrados)
+        if borrados:
+            self._cambios.anotar()
+        return resultados
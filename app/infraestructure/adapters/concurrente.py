@@ -0,0 +1,314 @@
+import heapq
+import threading
+from itertools import chain, islice
+from typing import Callable, Dict, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor, ConflictoDeVersion
+from app.application.ports.patient_repository import PatientRepository
+from app.application.ports.doctor_repository import DoctorRepository
+from app.infraestructure.adapters.database import (
+    ContadorCambios,
+    InMemoryPatientRepository,
+    InMemoryDoctorRepository,
+    _nuevos_ids,
+    _pagina
+)
+
+
+# Repositorios en memoria seguros entre hilos con candados por franjas: los
+# registros se reparten por hash del id entre `franjas` repositorios en
+# memoria independientes, cada uno con su candado y sus propios índices
+# (ids ordenados, texto, especialidad). Escrituras de ids distintos solo
+# compiten si caen en la misma franja. Las lecturas por id no toman candado
+# (dict.get es atómico); las que recorren índices toman el de cada franja y
+# mezclan los resultados.
+# Con el GIL más franjas no dan más paralelismo y encarecen páginas y
+# búsquedas, que consultan todas; 4 cuesta lo mismo que un candado único
+# (bench/estres_concurrencia.py).
+
+FRANJAS = 4
+
+
+class _Franja:
+    __slots__ = ("candado", "repo")
+
+    def __init__(self, repo):
+        self.candado = threading.Lock()
+        self.repo = repo
+
+
+class _Franjas:
+    """Reparto de los registros entre franjas por hash del id"""
+
+    def __init__(self, crear: Callable[[], object], cantidad: int):
+        if cantidad < 1:
+            raise ValueError("Hace falta al menos una franja")
+        self.todas = [_Franja(crear()) for _ in range(cantidad)]
+        # Contador de la colección: una escritura sube uno aunque toque varias franjas
+        self._cambios = ContadorCambios()
+        self._candado_cambios = threading.Lock()
+
+    def de(self, item_id: str) -> _Franja:
+        return self.todas[hash(item_id) % len(self.todas)]
+
+    def repartir(self, ids: List[str]) -> Dict[int, List[int]]:
+        """Posiciones de `ids` agrupadas por índice de franja"""
+        grupos: Dict[int, List[int]] = {}
+        for posicion, item_id in enumerate(ids):
+            grupos.setdefault(hash(item_id) % len(self.todas), []).append(posicion)
+        return grupos
+
+    def por_lotes(self, ids: List[str], operacion: Callable[[object, List[int]], list]) -> list:
+        # Aplica `operacion(repo, posiciones)` en cada franja con su candado y
+        # devuelve los resultados en el orden de `ids`
+        resultados = [None] * len(ids)
+        escrito = False
+        for indice, posiciones in self.repartir(ids).items():
+            franja = self.todas[indice]
+            with franja.candado:
+                antes = franja.repo.cambios_coleccion()[0]
+                parciales = operacion(franja.repo, posiciones)
+                escrito = escrito or franja.repo.cambios_coleccion()[0] != antes
+            for posicion, resultado in zip(posiciones, parciales):
+                resultados[posicion] = resultado
+        if escrito:
+            self.anotar()
+        return resultados
+
+    def pagina(self, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+        # Cada franja aporta hasta `limit` ids tras el cursor; la página son
+        # los `limit` primeros de la mezcla, y solo se buscan sus registros
+        tramos = []
+        hay_mas = False
+        for franja in self.todas:
+            with franja.candado:
+                ids, siguiente = _pagina(franja.repo._ids(), cursor, limit)
+            tramos.append(ids)
+            hay_mas = hay_mas or siguiente is not None
+        ids = list(islice(heapq.merge(*tramos), limit + 1))
+        hay_mas = hay_mas or len(ids) > limit
+        del ids[limit:]
+        # Un id borrado entre la mezcla y la búsqueda ya no se devuelve
+        encontrados = (self.de(item_id).repo.buscar_por_id(item_id) for item_id in ids)
+        return [objeto for objeto in encontrados if objeto is not None], ids[-1] if hay_mas and ids else None
+
+    def anotar(self) -> None:
+        with self._candado_cambios:
+            self._cambios.anotar()
+
+    def cambios(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+        # Suma por franja: un término o especialidad presente en varias franjas
+        # cuenta en cada una, igual que ocupa memoria en cada una
+        total: Dict[str, int] = {}
+        for franja in self.todas:
+            with franja.candado:
+                parciales = franja.repo.estadisticas()
+            for medida, valor in parciales.items():
+                total[medida] = total.get(medida, 0) + valor
+        return total
+
+    def buscar_texto(self, texto: str, limite: int) -> list:
+        # Los `limite` mejores de cada franja contienen a los `limite` mejores globales
+        puntuados = []
+        for franja in self.todas:
+            with franja.candado:
+                encontrados = franja.repo._texto.buscar_puntuado(texto, limite)
+                puntuados.extend((-puntos, len(puntuados), franja.repo.buscar_por_id(clave))
+                                 for puntos, clave in encontrados)
+        puntuados.sort(key=lambda puntuado: puntuado[:2])
+        return [objeto for _, _, objeto in puntuados[:limite]]
+
+
+class ConcurrentPatientRepository(PatientRepository):
+    """InMemoryPatientRepository seguro entre hilos, con candados por franjas"""
+
+    def __init__(self, franjas: int = FRANJAS):
+        self._franjas = _Franjas(InMemoryPatientRepository, franjas)
+
+    def guardar(self, patient: paciente) -> paciente:
+
+        return self.guardar_lote([patient])[0]
+
+    def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
+
+        return self._franjas.de(patient_id).repo.buscar_por_id(patient_id)
+
+    def buscar_todos(self) -> List[paciente]:
+
+        return list(chain.from_iterable(franja.repo.buscar_todos() for franja in self._franjas.todas))
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+
+        return self._franjas.pagina(cursor, limit)
+
+    def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+
+        return self._franjas.buscar_texto(texto, limite)
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._franjas.cambios()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return self._franjas.estadisticas()
+
+    def actualizar(self, patient: paciente) -> paciente:
+
+        return self.actualizar_lote([patient])[0]
+
+    def comparar_y_actualizar(self, esperado: paciente, nuevo: paciente) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, de forma atómica"""
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        franja = self._franjas.de(esperado.id)
+        with franja.candado:
+            if franja.repo.buscar_por_id(esperado.id) != esperado:
+                return False
+            franja.repo.actualizar(nuevo)
+        self._franjas.anotar()
+        return True
+
+    def actualizar_si_version(self, patient: paciente, version: int) -> Optional[paciente]:
+        """Como en el puerto, pero solo bloquea la franja del registro"""
+        franja = self._franjas.de(patient.id)
+        with franja.candado:
+            actual = franja.repo.buscar_por_id(patient.id)
+            if actual is None:
+                return None
+            if actual.version != version:
+                raise ConflictoDeVersion(actual.version)
+            franja.repo.actualizar(patient)
+        self._franjas.anotar()
+        return patient
+
+    def borrar(self, patient_id: str) -> bool:
+
+        return self.borrar_lote([patient_id])[0]
+
+    def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+
+        sin_id = [patient for patient in patients if not patient.id]
+        for patient, patient_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            patient.id = patient_id
+        return self._franjas.por_lotes(
+            [patient.id for patient in patients],
+            lambda repo, posiciones: repo.guardar_lote([patients[posicion] for posicion in posiciones]),
+        )
+
+    def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+
+        return self._franjas.por_lotes(
+            [patient.id for patient in patients],
+            lambda repo, posiciones: repo.actualizar_lote([patients[posicion] for posicion in posiciones]),
+        )
+
+    def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+
+        return self._franjas.por_lotes(
+            patient_ids,
+            lambda repo, posiciones: repo.borrar_lote([patient_ids[posicion] for posicion in posiciones]),
+        )
+
+
+class ConcurrentDoctorRepository(DoctorRepository):
+    """InMemoryDoctorRepository seguro entre hilos, con candados por franjas"""
+
+    def __init__(self, franjas: int = FRANJAS):
+        self._franjas = _Franjas(InMemoryDoctorRepository, franjas)
+
+    def guardar(self, doctor: Doctor) -> Doctor:
+
+        return self.guardar_lote([doctor])[0]
+
+    def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
+
+        return self._franjas.de(doctor_id).repo.buscar_por_id(doctor_id)
+
+    def buscar_todos(self) -> List[Doctor]:
+
+        return list(chain.from_iterable(franja.repo.buscar_todos() for franja in self._franjas.todas))
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+
+        return self._franjas.pagina(cursor, limit)
+
+    def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        doctors = []
+        for franja in self._franjas.todas:
+            with franja.candado:
+                doctors.extend(franja.repo.buscar_por_especialidad(especialidad))
+        return doctors
+
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+
+        return self._franjas.buscar_texto(texto, limite)
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._franjas.cambios()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return self._franjas.estadisticas()
+
+    def actualizar(self, doctor: Doctor) -> Doctor:
+
+        return self.actualizar_lote([doctor])[0]
+
+    def comparar_y_actualizar(self, esperado: Doctor, nuevo: Doctor) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, de forma atómica"""
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        franja = self._franjas.de(esperado.id)
+        with franja.candado:
+            if franja.repo.buscar_por_id(esperado.id) != esperado:
+                return False
+            franja.repo.actualizar(nuevo)
+        self._franjas.anotar()
+        return True
+
+    def actualizar_si_version(self, doctor: Doctor, version: int) -> Optional[Doctor]:
+        """Como en el puerto, pero solo bloquea la franja del registro"""
+        franja = self._franjas.de(doctor.id)
+        with franja.candado:
+            actual = franja.repo.buscar_por_id(doctor.id)
+            if actual is None:
+                return None
+            if actual.version != version:
+                raise ConflictoDeVersion(actual.version)
+            franja.repo.actualizar(doctor)
+        self._franjas.anotar()
+        return doctor
+
+    def borrar(self, doctor_id: str) -> bool:
+
+        return self.borrar_lote([doctor_id])[0]
+
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+
+        sin_id = [doctor for doctor in doctors if not doctor.id]
+        for doctor, doctor_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            doctor.id = doctor_id
+        return self._franjas.por_lotes(
+            [doctor.id for doctor in doctors],
+            lambda repo, posiciones: repo.guardar_lote([doctors[posicion] for posicion in posiciones]),
+        )
+
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+
+        return self._franjas.por_lotes(
+            [doctor.id for doctor in doctors],
+            lambda repo, posiciones: repo.actualizar_lote([doctors[posicion] for posicion in posiciones]),
+        )
+
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+
+        return self._franjas.por_lotes(
+            doctor_ids,
+            lambda repo, posiciones: repo.borrar_lote([doctor_ids[posicion] for posicion in posiciones]),
+        )
@@ -1,9 +1,90 @@
+import os
+import time
 import uuid
-from typing import List, Optional
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from app.domain.core.models import paciente, Doctor
+from app.domain.core.models import paciente, Doctor, Cita, CitaSolapada
 from app.application.ports.patient_repository import PatientRepository
 from app.application.ports.doctor_repository import DoctorRepository
+from app.application.ports.cita_repository import CitaRepository
+from app.infraestructure.adapters.agenda import Agendas
+from app.infraestructure.adapters.busqueda import IndiceTexto
+
+
+_UMBRAL_REORDENAR = 64
+_IDS_POR_INSERCION = 4096
+_LOTE_IDS = 256
+
+
+def _insertar_ids(ids_ordenados: List[str], nuevos: List[str]) -> None:
+    # Cada insort mueve la cola de la lista (~0.23 ms con 1M ids) y la mezcla
+    # la recorre entera (~70 ms con 1M ids): mezclar compensa a partir de unos
+    # 70 ids nuevos con 10k ordenados y de unos 300 con 1M
+    if len(nuevos) < max(_UMBRAL_REORDENAR, len(ids_ordenados) // _IDS_POR_INSERCION):
+        for item_id in nuevos:
+            insort(ids_ordenados, item_id)
+        return
+    # Timsort aprovecha el tramo ya ordenado: O(n + k log k)
+    ids_ordenados.extend(nuevos)
+    ids_ordenados.sort()
+
+
+def _quitar_id(ids_ordenados: List[str], item_id: str) -> None:
+    posicion = bisect_left(ids_ordenados, item_id)
+    if posicion < len(ids_ordenados) and ids_ordenados[posicion] == item_id:
+        del ids_ordenados[posicion]
+
+
+def _quitar_ids(ids_ordenados: List[str], borrados: List[str]) -> None:
+    if len(borrados) < _UMBRAL_REORDENAR:
+        for item_id in borrados:
+            _quitar_id(ids_ordenados, item_id)
+        return
+    descartar = set(borrados)
+    ids_ordenados[:] = [item_id for item_id in ids_ordenados if item_id not in descartar]
+
+
+def _nuevos_ids(cantidad: int) -> List[str]:
+    # Equivalente a uuid4() pero con una sola lectura de os.urandom por lote
+    aleatorio = os.urandom(16 * cantidad)
+    return [str(uuid.UUID(bytes=aleatorio[i:i + 16], version=4))
+            for i in range(0, 16 * cantidad, 16)]
+
+
+def _siguiente_version(anterior) -> int:
+    # Versión de un registro que se guarda: 1 si es nuevo, si no la siguiente
+    return anterior.version + 1 if anterior is not None else 1
+
+
+class ContadorCambios:
+    """Contador de escrituras de una colección y hora de la última
+
+    Arranca en el reloj en nanosegundos: tras un reinicio nunca repite un
+    valor ya entregado como ETag (con menos de una escritura por ns).
+    """
+    __slots__ = ("valor", "modificado")
+
+    def __init__(self):
+        self.modificado = time.time()
+        self.valor = time.time_ns()
+
+    def anotar(self) -> None:
+        self.valor += 1
+        self.modificado = time.time()
+
+    def leer(self) -> Tuple[int, float]:
+        return self.valor, self.modificado
+
+
+def _pagina(ids_ordenados: List[str], cursor: Optional[str],
+            limit: int) -> Tuple[List[str], Optional[str]]:
+    # El cursor es el último id entregado; sigue siendo válido aunque se borre
+    inicio = bisect_right(ids_ordenados, cursor) if cursor else 0
+    fin = inicio + limit
+    ids = ids_ordenados[inicio:fin]
+    siguiente = ids[-1] if ids and fin < len(ids_ordenados) else None
+    return ids, siguiente
 
 
 class InMemoryPatientRepository(PatientRepository):
@@ -11,13 +92,31 @@ class InMemoryPatientRepository(PatientRepository):
 
     def __init__(self):
         self.patients: dict[str, paciente] = {}
+        self._cambios = ContadorCambios()
+        self._ids_ordenados: List[str] = []
+        # Altas aún sin colocar en _ids_ordenados: se mezclan en la siguiente
+        # página, como los términos pendientes de IndiceTexto
+        self._ids_nuevos: List[str] = []
+        self._texto = IndiceTexto()
+
+    def _ids(self) -> List[str]:
+        if self._ids_nuevos:
+            _insertar_ids(self._ids_ordenados, self._ids_nuevos)
+            self._ids_nuevos = []
+        return self._ids_ordenados
 
     def guardar(self, patient: paciente) -> paciente:
         
         if not patient.id:
             patient.id = str(uuid.uuid4())
         patient.fecha_creacion = datetime.now()
+        anterior = self.patients.get(patient.id)
+        if anterior is None:
+            self._ids_nuevos.append(patient.id)
+        patient.version = _siguiente_version(anterior)
         self.patients[patient.id] = patient
+        self._texto.indexar(patient.id, patient.nombre, patient.email)
+        self._cambios.anotar()
         return patient
 
     def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
@@ -28,32 +127,146 @@ class InMemoryPatientRepository(PatientRepository):
        
         return list(self.patients.values())
 
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+
+        ids, siguiente = _pagina(self._ids(), cursor, limit)
+        return [self.patients[patient_id] for patient_id in ids], siguiente
+
+    def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+
+        return [self.patients[patient_id] for patient_id in self._texto.buscar(texto, limite)]
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return {"registros": len(self.patients), **self._texto.estadisticas()}
+
+    def _reemplazar(self, patient: paciente) -> Optional[paciente]:
+        actual = self.patients.get(patient.id) if patient.id else None
+        if actual is None:
+            return None
+        patient.version = actual.version + 1
+        self.patients[patient.id] = patient
+        self._texto.indexar(patient.id, patient.nombre, patient.email)
+        return patient
+
     def actualizar(self, patient: paciente) -> paciente:
        
-        if patient.id and patient.id in self.patients:
-            self.patients[patient.id] = patient
-            return patient
-        return None
+        if self._reemplazar(patient) is None:
+            return None
+        self._cambios.anotar()
+        return patient
 
     def borrar(self, patient_id: str) -> bool:
         if patient_id in self.patients:
             del self.patients[patient_id]
+            _quitar_id(self._ids(), patient_id)
+            self._texto.quitar(patient_id)
+            self._cambios.anotar()
             return True
         return False
 
+    def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+
+        sin_id = [patient for patient in patients if not patient.id]
+        for patient, patient_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            patient.id = patient_id
+        ahora = datetime.now()
+        nuevos = []
+        for patient in patients:
+            patient.fecha_creacion = ahora
+            anterior = self.patients.get(patient.id)
+            if anterior is None:
+                nuevos.append(patient.id)
+            patient.version = _siguiente_version(anterior)
+            self.patients[patient.id] = patient
+            self._texto.indexar(patient.id, patient.nombre, patient.email)
+        self._ids_nuevos.extend(nuevos)
+        if patients:
+            self._cambios.anotar()
+        return patients
+
+    def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+        # Un lote cuenta como una escritura, igual que guardar_lote y borrar_lote
+        resultados = [self._reemplazar(patient) for patient in patients]
+        if any(resultado is not None for resultado in resultados):
+            self._cambios.anotar()
+        return resultados
+
+    def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+
+        resultados = []
+        borrados = []
+        for patient_id in patient_ids:
+            existia = self.patients.pop(patient_id, None) is not None
+            if existia:
+                borrados.append(patient_id)
+                self._texto.quitar(patient_id)
+            resultados.append(existia)
+        if borrados:
+            _quitar_ids(self._ids(), borrados)
+            self._cambios.anotar()
+        return resultados
+
 
 class InMemoryDoctorRepository(DoctorRepository):
     
 
     def __init__(self):
         self.doctors: dict[str, Doctor] = {}
+        self._cambios = ContadorCambios()
+        self._ids_ordenados: List[str] = []
+        self._ids_nuevos: List[str] = []
+        # especialidad normalizada -> ids (dict como conjunto ordenado)
+        self._por_especialidad: dict[str, dict[str, None]] = {}
+        self._especialidad_de: dict[str, str] = {}
+        self._texto = IndiceTexto()
+
+    def _ids(self) -> List[str]:
+        if self._ids_nuevos:
+            _insertar_ids(self._ids_ordenados, self._ids_nuevos)
+            self._ids_nuevos = []
+        return self._ids_ordenados
+
+    def _indexar(self, doctor: Doctor) -> None:
+        self._texto.indexar(doctor.id, doctor.nombre, doctor.email)
+        clave = doctor.especialidad.casefold()
+        anterior = self._especialidad_de.get(doctor.id)
+        if anterior == clave:
+            return
+        if anterior is not None:
+            self._desindexar_especialidad(doctor.id)
+        self._por_especialidad.setdefault(clave, {})[doctor.id] = None
+        self._especialidad_de[doctor.id] = clave
+
+    def _desindexar(self, doctor_id: str) -> None:
+        self._texto.quitar(doctor_id)
+        self._desindexar_especialidad(doctor_id)
+
+    def _desindexar_especialidad(self, doctor_id: str) -> None:
+        clave = self._especialidad_de.pop(doctor_id, None)
+        if clave is None:
+            return
+        ids = self._por_especialidad[clave]
+        del ids[doctor_id]
+        if not ids:
+            del self._por_especialidad[clave]
 
     def guardar(self, doctor: Doctor) -> Doctor:
         
         if not doctor.id:
             doctor.id = str(uuid.uuid4())
         doctor.fecha_creacion = datetime.now()
+        anterior = self.doctors.get(doctor.id)
+        if anterior is None:
+            self._ids_nuevos.append(doctor.id)
+        doctor.version = _siguiente_version(anterior)
         self.doctors[doctor.id] = doctor
+        self._indexar(doctor)
+        self._cambios.anotar()
         return doctor
 
     def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
@@ -64,21 +277,191 @@ class InMemoryDoctorRepository(DoctorRepository):
        
         return list(self.doctors.values())
 
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+
+        ids, siguiente = _pagina(self._ids(), cursor, limit)
+        return [self.doctors[doctor_id] for doctor_id in ids], siguiente
+
     def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
     
-        return [doc for doc in self.doctors.values() 
-                if doc.especialidad.lower() == especialidad.lower()]
+        ids = self._por_especialidad.get(especialidad.casefold(), {})
+        return [self.doctors[doctor_id] for doctor_id in ids]
+
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+
+        return [self.doctors[doctor_id] for doctor_id in self._texto.buscar(texto, limite)]
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return {"registros": len(self.doctors), "indice_especialidades": len(self._por_especialidad),
+                **self._texto.estadisticas()}
+
+    def _reemplazar(self, doctor: Doctor) -> Optional[Doctor]:
+        actual = self.doctors.get(doctor.id) if doctor.id else None
+        if actual is None:
+            return None
+        doctor.version = actual.version + 1
+        self.doctors[doctor.id] = doctor
+        self._indexar(doctor)
+        return doctor
 
     def actualizar(self, doctor: Doctor) -> Doctor:
         
-        if doctor.id and doctor.id in self.doctors:
-            self.doctors[doctor.id] = doctor
-            return doctor
-        return None
+        if self._reemplazar(doctor) is None:
+            return None
+        self._cambios.anotar()
+        return doctor
 
     def borrar(self, doctor_id: str) -> bool:
         
         if doctor_id in self.doctors:
             del self.doctors[doctor_id]
+            _quitar_id(self._ids(), doctor_id)
+            self._desindexar(doctor_id)
+            self._cambios.anotar()
             return True
         return False
+
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+
+        sin_id = [doctor for doctor in doctors if not doctor.id]
+        for doctor, doctor_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            doctor.id = doctor_id
+        ahora = datetime.now()
+        nuevos = []
+        for doctor in doctors:
+            doctor.fecha_creacion = ahora
+            anterior = self.doctors.get(doctor.id)
+            if anterior is None:
+                nuevos.append(doctor.id)
+            doctor.version = _siguiente_version(anterior)
+            self.doctors[doctor.id] = doctor
+            self._indexar(doctor)
+        self._ids_nuevos.extend(nuevos)
+        if doctors:
+            self._cambios.anotar()
+        return doctors
+
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+
+        resultados = [self._reemplazar(doctor) for doctor in doctors]
+        if any(resultado is not None for resultado in resultados):
+            self._cambios.anotar()
+        return resultados
+
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+
+        resultados = []
+        borrados = []
+        for doctor_id in doctor_ids:
+            existia = self.doctors.pop(doctor_id, None) is not None
+            if existia:
+                borrados.append(doctor_id)
+                self._desindexar(doctor_id)
+            resultados.append(existia)
+        if borrados:
+            _quitar_ids(self._ids(), borrados)
+            self._cambios.anotar()
+        return resultados
+
+
+class InMemoryCitaRepository(CitaRepository):
+    """Citas en un dict, con la agenda de cada doctor indexada por intervalos"""
+
+    def __init__(self):
+        self.citas: dict[str, Cita] = {}
+        self._cambios = ContadorCambios()
+        self._agendas = Agendas()
+        # paciente -> ids de sus citas (dict como conjunto ordenado)
+        self._por_paciente: dict[str, dict[str, None]] = {}
+        self._ids_reservados: List[str] = []
+
+    def _nuevo_id(self) -> str:
+        # Las citas se reservan de una en una: los ids se generan por lotes
+        # con _nuevos_ids, una lectura de os.urandom cada _LOTE_IDS citas
+        if not self._ids_reservados:
+            self._ids_reservados = _nuevos_ids(_LOTE_IDS)
+        return self._ids_reservados.pop()
+
+    def _indexar_paciente(self, cita: Cita) -> None:
+        self._por_paciente.setdefault(cita.paciente_id, {})[cita.id] = None
+
+    def _desindexar_paciente(self, cita: Cita) -> None:
+        ids = self._por_paciente[cita.paciente_id]
+        del ids[cita.id]
+        if not ids:
+            del self._por_paciente[cita.paciente_id]
+
+    def guardar(self, cita: Cita) -> Cita:
+
+        if cita.id and cita.id in self.citas:
+            return self.actualizar(cita)
+        if not cita.id:
+            cita.id = self._nuevo_id()
+        otra = self._agendas.insertar(cita.doctor_id, cita.id, cita.inicio, cita.fin)
+        if otra is not None:
+            raise CitaSolapada(otra)
+        cita.fecha_creacion = datetime.now()
+        cita.version = 1
+        self.citas[cita.id] = cita
+        self._indexar_paciente(cita)
+        self._cambios.anotar()
+        return cita
+
+    def buscar_por_id(self, cita_id: str) -> Optional[Cita]:
+
+        return self.citas.get(cita_id)
+
+    def buscar_por_doctor(self, doctor_id: str, desde: datetime, hasta: datetime) -> List[Cita]:
+
+        agenda = self._agendas.de(doctor_id)
+        if agenda is None:
+            return []
+        return [self.citas[cita_id] for cita_id in agenda.cruces(desde, hasta)]
+
+    def buscar_por_paciente(self, paciente_id: str) -> List[Cita]:
+
+        citas = [self.citas[cita_id] for cita_id in self._por_paciente.get(paciente_id, {})]
+        citas.sort(key=lambda cita: cita.inicio)
+        return citas
+
+    def actualizar(self, cita: Cita) -> Optional[Cita]:
+
+        actual = self.citas.get(cita.id) if cita.id else None
+        if actual is None:
+            return None
+        self._agendas.quitar(actual.doctor_id, actual.id, actual.inicio)
+        otra = self._agendas.insertar(cita.doctor_id, cita.id, cita.inicio, cita.fin)
+        if otra is not None:
+            # Se deja la agenda como estaba
+            self._agendas.insertar(actual.doctor_id, actual.id, actual.inicio, actual.fin)
+            raise CitaSolapada(otra)
+        self._desindexar_paciente(actual)
+        cita.fecha_creacion = actual.fecha_creacion
+        cita.version = actual.version + 1
+        self.citas[cita.id] = cita
+        self._indexar_paciente(cita)
+        self._cambios.anotar()
+        return cita
+
+    def borrar(self, cita_id: str) -> bool:
+
+        cita = self.citas.pop(cita_id, None)
+        if cita is None:
+            return False
+        self._agendas.quitar(cita.doctor_id, cita_id, cita.inicio)
+        self._desindexar_paciente(cita)
+        self._cambios.anotar()
+        return True
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self._cambios.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return {"registros": len(self.citas), **self._agendas.estadisticas()}
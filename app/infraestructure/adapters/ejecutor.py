@@ -0,0 +1,199 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor
+from app.application.ports.patient_repository import PatientRepository
+from app.application.ports.doctor_repository import DoctorRepository
+from app.application.ports.async_repository import (
+    AsyncPatientRepository,
+    AsyncDoctorRepository,
+    AlmacenamientoSaturado,
+    TiempoAgotado
+)
+
+
+# Repositorios asíncronos sobre los síncronos. Con un EjecutorAcotado cada
+# operación corre en uno de sus hilos y el bucle de eventos sigue atendiendo
+# peticiones mientras tanto (SQLite, fsync del registro de escritura); sin
+# él se llama directamente, que para los almacenamientos en memoria es lo
+# más rápido y lo único seguro si no admiten varios hilos.
+HILOS_POR_DEFECTO = 4
+PENDIENTES_POR_DEFECTO = 64
+TIEMPO_LIMITE_POR_DEFECTO = 5.0
+
+
+class EjecutorAcotado:
+    """Hilos para operaciones bloqueantes con cola limitada y tiempo límite por operación
+
+    Como mucho `max_pendientes` operaciones entre las que corren y las que
+    esperan hilo; las que llegan de más fallan enseguida con
+    AlmacenamientoSaturado en lugar de alargar la cola. Quien espera más
+    de `tiempo_limite` segundos recibe TiempoAgotado: si la operación aún
+    no había empezado se descarta, si ya corría termina igualmente (un
+    hilo no se puede interrumpir) y sigue ocupando su plaza hasta entonces.
+    Seguro entre bucles de eventos de varios hilos.
+    """
+
+    def __init__(self, hilos: int = HILOS_POR_DEFECTO, max_pendientes: int = PENDIENTES_POR_DEFECTO,
+                 tiempo_limite: Optional[float] = TIEMPO_LIMITE_POR_DEFECTO, nombre: str = "almacenamiento"):
+        if hilos < 1 or max_pendientes < hilos:
+            raise ValueError("Hacen falta al menos un hilo y tantas plazas como hilos")
+        self.max_pendientes = max_pendientes
+        self.tiempo_limite = tiempo_limite
+        self._hilos = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix=nombre)
+        self._candado = threading.Lock()
+        self._pendientes = 0
+        self._rechazadas = 0
+        self._agotadas = 0
+
+    def _liberar(self, _futuro) -> None:
+        with self._candado:
+            self._pendientes -= 1
+
+    async def ejecutar(self, funcion: Callable, *argumentos):
+        with self._candado:
+            if self._pendientes >= self.max_pendientes:
+                self._rechazadas += 1
+                raise AlmacenamientoSaturado(f"{self._pendientes} operaciones pendientes")
+            self._pendientes += 1
+        try:
+            futuro = self._hilos.submit(funcion, *argumentos)
+        except BaseException:
+            self._liberar(None)
+            raise
+        # La plaza se libera cuando el hilo termina (o si se cancela antes de empezar)
+        futuro.add_done_callback(self._liberar)
+        try:
+            # Al agotarse el tiempo, wait_for cancela el futuro: solo surte efecto si no había empezado
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), self.tiempo_limite)
+        except asyncio.TimeoutError:
+            with self._candado:
+                self._agotadas += 1
+            raise TiempoAgotado(f"Sin respuesta del almacenamiento en {self.tiempo_limite} s") from None
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._candado:
+            return {"pendientes": self._pendientes, "rechazadas": self._rechazadas, "agotadas": self._agotadas}
+
+    def cerrar(self) -> None:
+        self._hilos.shutdown(wait=True, cancel_futures=True)
+
+
+class _Delegado:
+
+    def __init__(self, repositorio, ejecutor: Optional[EjecutorAcotado]):
+        self.repositorio = repositorio
+        self._ejecutor = ejecutor
+
+    async def _llamar(self, funcion: Callable, *argumentos):
+        if self._ejecutor is None:
+            return funcion(*argumentos)
+        return await self._ejecutor.ejecutar(funcion, *argumentos)
+
+
+class ExecutorPatientRepository(_Delegado, AsyncPatientRepository):
+    """PatientRepository síncrono servido en `ejecutor`, o directamente si es None"""
+
+    def __init__(self, repositorio: PatientRepository, ejecutor: Optional[EjecutorAcotado] = None):
+        super().__init__(repositorio, ejecutor)
+
+    async def guardar(self, patient: paciente) -> paciente:
+        return await self._llamar(self.repositorio.guardar, patient)
+
+    async def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
+        return await self._llamar(self.repositorio.buscar_por_id, patient_id)
+
+    async def buscar_todos(self) -> List[paciente]:
+        return await self._llamar(self.repositorio.buscar_todos)
+
+    async def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+        return await self._llamar(self.repositorio.buscar_pagina, cursor, limit)
+
+    async def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+        return await self._llamar(self.repositorio.buscar_texto, texto, limite)
+
+    async def actualizar(self, patient: paciente) -> paciente:
+        return await self._llamar(self.repositorio.actualizar, patient)
+
+    async def comparar_y_actualizar(self, esperado: paciente, nuevo: paciente) -> bool:
+        return await self._llamar(self.repositorio.comparar_y_actualizar, esperado, nuevo)
+
+    async def actualizar_si_version(self, patient: paciente, version: int) -> Optional[paciente]:
+        return await self._llamar(self.repositorio.actualizar_si_version, patient, version)
+
+    async def version_de(self, patient_id: str) -> int:
+        return await self._llamar(self.repositorio.version_de, patient_id)
+
+    async def estadisticas(self) -> Dict[str, int]:
+        return await self._llamar(self.repositorio.estadisticas)
+
+    async def cambios_coleccion(self) -> Tuple[int, float]:
+        return await self._llamar(self.repositorio.cambios_coleccion)
+
+    async def borrar(self, patient_id: str) -> bool:
+        return await self._llamar(self.repositorio.borrar, patient_id)
+
+    async def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+        return await self._llamar(self.repositorio.guardar_lote, patients)
+
+    async def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+        return await self._llamar(self.repositorio.actualizar_lote, patients)
+
+    async def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+        return await self._llamar(self.repositorio.borrar_lote, patient_ids)
+
+
+class ExecutorDoctorRepository(_Delegado, AsyncDoctorRepository):
+    """DoctorRepository síncrono servido en `ejecutor`, o directamente si es None"""
+
+    def __init__(self, repositorio: DoctorRepository, ejecutor: Optional[EjecutorAcotado] = None):
+        super().__init__(repositorio, ejecutor)
+
+    async def guardar(self, doctor: Doctor) -> Doctor:
+        return await self._llamar(self.repositorio.guardar, doctor)
+
+    async def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
+        return await self._llamar(self.repositorio.buscar_por_id, doctor_id)
+
+    async def buscar_todos(self) -> List[Doctor]:
+        return await self._llamar(self.repositorio.buscar_todos)
+
+    async def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+        return await self._llamar(self.repositorio.buscar_pagina, cursor, limit)
+
+    async def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+        return await self._llamar(self.repositorio.buscar_por_especialidad, especialidad)
+
+    async def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+        return await self._llamar(self.repositorio.buscar_texto, texto, limite)
+
+    async def actualizar(self, doctor: Doctor) -> Doctor:
+        return await self._llamar(self.repositorio.actualizar, doctor)
+
+    async def comparar_y_actualizar(self, esperado: Doctor, nuevo: Doctor) -> bool:
+        return await self._llamar(self.repositorio.comparar_y_actualizar, esperado, nuevo)
+
+    async def actualizar_si_version(self, doctor: Doctor, version: int) -> Optional[Doctor]:
+        return await self._llamar(self.repositorio.actualizar_si_version, doctor, version)
+
+    async def version_de(self, doctor_id: str) -> int:
+        return await self._llamar(self.repositorio.version_de, doctor_id)
+
+    async def estadisticas(self) -> Dict[str, int]:
+        return await self._llamar(self.repositorio.estadisticas)
+
+    async def cambios_coleccion(self) -> Tuple[int, float]:
+        return await self._llamar(self.repositorio.cambios_coleccion)
+
+    async def borrar(self, doctor_id: str) -> bool:
+        return await self._llamar(self.repositorio.borrar, doctor_id)
+
+    async def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+        return await self._llamar(self.repositorio.guardar_lote, doctors)
+
+    async def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+        return await self._llamar(self.repositorio.actualizar_lote, doctors)
+
+    async def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+        return await self._llamar(self.repositorio.borrar_lote, doctor_ids)
@@ -0,0 +1,707 @@
+import mmap
+import os
+import struct
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor, ConflictoDeVersion, a_epoca, desde_epoca
+from app.application.ports.patient_repository import PatientRepository
+from app.application.ports.doctor_repository import DoctorRepository
+from app.infraestructure.adapters.busqueda import IndiceTexto
+from app.infraestructure.adapters.database import _nuevos_ids, ContadorCambios
+from app.infraestructure.adapters.persistente import (
+    OPERACIONES_POR_INSTANTANEA,
+    _Almacen,
+    _Codec,
+    _CODEC_PACIENTE,
+    _CODEC_DOCTOR
+)
+
+
+# Repositorios que sirven las lecturas directamente desde una instantánea
+# mapeada en memoria (mmap), sin cargarla: abrir un archivo de un millón de
+# registros cuesta lo mismo que uno vacío. Las escrituras van a un registro
+# de escritura anticipada y a una capa de cambios en memoria que tapa a la
+# instantánea; cada `operaciones_por_instantanea` operaciones se escribe en
+# segundo plano una instantánea nueva que incorpora los cambios.
+#
+# Formato del archivo (little endian, tamaño fijo salvo la arena):
+#   cabecera  magia, generación, cantidad y desplazamiento de cada sección
+#   ids       UUID de 16 bytes ordenados (el orden de bytes es el del texto)
+#   filas     por registro: creado (q) + versión (I) + (inicio Q, largo I) de cada texto
+#   arena     textos UTF-8 contiguos
+#   extra     doctores: especialidad normalizada -> tramo de filas
+# Solo se decodifican los campos que pide cada operación.
+
+_MAGIA = b"CLINMAP2"
+_CABECERA = struct.Struct("<8sQQQQQQQ")
+_NULO = 0xFFFFFFFF
+_CLAVE_ESPECIALIDAD = struct.Struct("<III")
+_UUID = 16
+
+
+def _clave(item_id: Optional[str]) -> Optional[bytes]:
+    try:
+        return uuid.UUID(item_id).bytes
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _texto_id(clave: bytes) -> str:
+    return str(uuid.UUID(bytes=clave))
+
+
+class _Ids:
+    """Vista de secuencia sobre la sección de ids, para usar bisect sin copiarla"""
+
+    def __init__(self, memoria, inicio: int, cantidad: int):
+        self._memoria = memoria
+        self._inicio = inicio
+        self._cantidad = cantidad
+
+    def __len__(self) -> int:
+        return self._cantidad
+
+    def __getitem__(self, fila: int) -> bytes:
+        desde = self._inicio + fila * _UUID
+        return self._memoria[desde:desde + _UUID]
+
+
+class _Mapa:
+    """Instantánea abierta con mmap; solo lectura"""
+
+    def __init__(self, campos: Tuple[str, ...], ruta: Optional[str] = None, generacion: int = 0):
+        self.campos = campos
+        self.fila = struct.Struct("<qI" + "QI" * len(campos))
+        self.ruta = ruta
+        self.especialidades: Dict[str, Tuple[int, int]] = {}
+        if ruta is None:
+            self.cantidad = 0
+            self.ids = _Ids(b"", 0, 0)
+            return
+        with open(ruta, "rb") as archivo:
+            self._memoria = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, guardada, self.cantidad, inicio_ids, self._inicio_filas, self._inicio_arena, \
+            inicio_extra, self._inicio_orden = _CABECERA.unpack_from(self._memoria, 0)
+        if magia != _MAGIA or guardada != generacion:
+            raise RuntimeError(f"Instantánea mapeada no reconocida: {ruta}")
+        self.ids = _Ids(self._memoria, inicio_ids, self.cantidad)
+        if inicio_extra:
+            # Índice de especialidades: pocas entradas, se lee entero al abrir
+            (cantidad,) = struct.unpack_from("<I", self._memoria, inicio_extra)
+            posicion = inicio_extra + 4
+            for _ in range(cantidad):
+                largo, desde, filas = _CLAVE_ESPECIALIDAD.unpack_from(self._memoria, posicion)
+                posicion += _CLAVE_ESPECIALIDAD.size
+                clave = self._memoria[posicion:posicion + largo].decode("utf-8")
+                posicion += largo
+                self.especialidades[clave] = (desde, filas)
+
+    def buscar(self, clave: bytes) -> Optional[int]:
+        fila = bisect_left(self.ids, clave)
+        return fila if fila < self.cantidad and self.ids[fila] == clave else None
+
+    def datos(self, fila: int) -> tuple:
+        return self.fila.unpack_from(self._memoria, self._inicio_filas + fila * self.fila.size)
+
+    def _texto(self, datos: tuple, campo: int) -> Optional[bytes]:
+        inicio, largo = datos[2 + 2 * campo], datos[3 + 2 * campo]
+        if largo == _NULO:
+            return None
+        desde = self._inicio_arena + inicio
+        return self._memoria[desde:desde + largo]
+
+    def textos(self, fila: int, campos: Tuple[int, ...]) -> List[Optional[str]]:
+        datos = self.datos(fila)
+        textos = []
+        for campo in campos:
+            crudo = self._texto(datos, campo)
+            textos.append(crudo.decode("utf-8") if crudo is not None else None)
+        return textos
+
+    def crudo(self, fila: int) -> Tuple[int, int, List[Optional[bytes]]]:
+        # Fecha, versión y textos sin decodificar, para copiarlos a otra instantánea
+        datos = self.datos(fila)
+        return datos[0], datos[1], [self._texto(datos, campo) for campo in range(len(self.campos))]
+
+    def filas_de_especialidad(self, clave: str) -> Iterator[int]:
+        if clave not in self.especialidades:
+            return iter(())
+        desde, cantidad = self.especialidades[clave]
+        orden = self._inicio_orden + desde * 4
+        return iter(array("I", self._memoria[orden:orden + cantidad * 4]))
+
+
+def escribir_mapa(archivo, generacion: int, campos: Tuple[str, ...],
+                  registros: Iterator[Tuple[bytes, int, int, List[Optional[bytes]]]],
+                  especialidad: Optional[int] = None) -> None:
+    """Escribe registros (id, creado, versión, textos UTF-8) ya ordenados por id
+
+    `especialidad` es la posición del campo por el que se construye el índice
+    de especialidades (solo doctores).
+    """
+    fila = struct.Struct("<qI" + "QI" * len(campos))
+    ids = bytearray()
+    filas = bytearray()
+    arena = bytearray()
+    por_especialidad: Dict[str, array] = {}
+    creados = array("q")
+    cantidad = 0
+    for clave, creado, version, textos in registros:
+        valores = [creado, version]
+        for texto in textos:
+            if texto is None:
+                valores += (0, _NULO)
+            else:
+                valores += (len(arena), len(texto))
+                arena += texto
+        ids += clave
+        filas += fila.pack(*valores)
+        if especialidad is not None:
+            normalizada = bytes(textos[especialidad]).decode("utf-8").casefold()
+            por_especialidad.setdefault(normalizada, array("I")).append(cantidad)
+            creados.append(creado)
+        cantidad += 1
+
+    extra = bytearray()
+    orden = array("I")
+    if especialidad is not None:
+        extra += struct.pack("<I", len(por_especialidad))
+        for normalizada, tramo in sorted(por_especialidad.items()):
+            datos = normalizada.encode("utf-8")
+            extra += _CLAVE_ESPECIALIDAD.pack(len(datos), len(orden), len(tramo))
+            extra += datos
+            # Dentro de cada especialidad, en orden de alta
+            orden.extend(sorted(tramo, key=creados.__getitem__))
+
+    inicio_ids = _CABECERA.size
+    inicio_filas = inicio_ids + len(ids)
+    inicio_arena = inicio_filas + len(filas)
+    inicio_extra = inicio_arena + len(arena) if extra else 0
+    inicio_orden = inicio_arena + len(arena) + len(extra) if extra else 0
+    archivo.write(_CABECERA.pack(_MAGIA, generacion, cantidad, inicio_ids, inicio_filas,
+                                 inicio_arena, inicio_extra, inicio_orden))
+    for seccion in (ids, filas, arena, extra, orden.tobytes()):
+        archivo.write(seccion)
+
+
+class _AlmacenMapeado(_Almacen):
+    """Almacén cuyas instantáneas se abren con mmap en lugar de cargarse"""
+
+    EXTENSION_INSTANTANEA = "map"
+
+    def __init__(self, *argumentos, especialidad: Optional[int] = None):
+        super().__init__(*argumentos)
+        self.campos = self.codec.campos[1:]
+        self.especialidad = especialidad
+        self.mapa = _Mapa(self.campos)
+
+    def _baja(self, estado: Dict[str, object], item_id: str) -> None:
+        # La baja debe tapar al registro de la instantánea
+        estado[item_id] = None
+
+    def _leer_instantanea(self, generacion: int) -> Dict[str, object]:
+        self.mapa = _Mapa(self.campos, self._ruta("instantanea", generacion), generacion)
+        return {}
+
+    def abrir(self, generacion: int) -> _Mapa:
+        return _Mapa(self.campos, self._ruta("instantanea", generacion), generacion)
+
+    def _volcar(self, archivo, generacion: int, contenido) -> None:
+        mapa, cambios = contenido
+        escribir_mapa(archivo, generacion, self.campos, self._mezclar(mapa, cambios), self.especialidad)
+
+    def _mezclar(self, mapa: _Mapa, cambios: Dict[str, object]):
+        # Mezcla ordenada de la instantánea anterior con los cambios
+        nuevos = sorted((_clave(item_id), objeto) for item_id, objeto in cambios.items())
+        campos = self.campos
+        fila = 0
+        for clave, objeto in nuevos:
+            while fila < mapa.cantidad and mapa.ids[fila] < clave:
+                yield (mapa.ids[fila], *mapa.crudo(fila))
+                fila += 1
+            if fila < mapa.cantidad and mapa.ids[fila] == clave:
+                fila += 1
+            if objeto is not None:
+                textos = [getattr(objeto, campo) for campo in campos]
+                yield clave, a_epoca(objeto.fecha_creacion), objeto.version, [
+                    texto.encode("utf-8") if texto is not None else None for texto in textos
+                ]
+        while fila < mapa.cantidad:
+            yield (mapa.ids[fila], *mapa.crudo(fila))
+            fila += 1
+
+
+class _Vista:
+    """Instantánea mapeada más los cambios posteriores, con su registro de escritura
+
+    Los cambios (id -> objeto, None si se borró) tapan a la instantánea. Los
+    `congelados` son los que se están incorporando a la próxima instantánea.
+    Mapa, congelados e ids nuevos se reemplazan juntos en `capas`: un lector
+    toma primero `cambios` y después `capas`, y ve siempre un estado coherente.
+    Las búsquedas por id no toman el candado; las que recorren los ids nuevos,
+    los cambios o el índice de texto sí, porque las escrituras los modifican
+    en el sitio y pueden venir de otro hilo.
+    """
+
+    def __init__(self, directorio: str, codec: _Codec, construir, politica: str, intervalo: float,
+                 operaciones_por_instantanea: int, especialidad: Optional[int] = None):
+        self._construir = construir
+        self.candado = threading.RLock()
+        self.almacen = _AlmacenMapeado(directorio, codec, politica, intervalo, operaciones_por_instantanea,
+                                       especialidad=especialidad)
+        self.cambios: Dict[str, object] = self.almacen.recuperar()
+        self.almacen.operaciones = len(self.cambios)
+        mapa = self.almacen.mapa
+        self.capas: Tuple[_Mapa, Dict[str, object], List[bytes]] = (
+            mapa, {}, self._calcular_ids_nuevos(mapa, self.cambios)
+        )
+        self.campos = self.almacen.campos
+        self._todos_los_campos = tuple(range(len(self.campos)))
+        self.texto = IndiceTexto()
+        self.texto.diferir(self._fuente_texto)
+        self.contador = ContadorCambios()
+
+    @staticmethod
+    def _calcular_ids_nuevos(mapa: _Mapa, vivos: Dict[str, object]) -> List[bytes]:
+        # Ids vivos en los cambios que no están en la instantánea
+        return sorted(clave for clave in (_clave(item_id) for item_id, objeto in vivos.items() if objeto is not None)
+                      if mapa.buscar(clave) is None)
+
+    @property
+    def mapa(self) -> _Mapa:
+        return self.capas[0]
+
+    def cambio(self, item_id: str, cambios: Dict[str, object],
+               congelados: Dict[str, object]) -> Tuple[bool, object]:
+        if item_id in cambios:
+            return True, cambios[item_id]
+        if item_id in congelados:
+            return True, congelados[item_id]
+        return False, None
+
+    def vivos(self) -> Tuple[Dict[str, object], _Mapa, Dict[str, object], List[bytes]]:
+        """Cambios y capas en un orden que no pierde los que se están congelando"""
+        cambios = self.cambios
+        return (cambios, *self.capas)
+
+    def leer_fila(self, mapa: _Mapa, fila: int, item_id: str):
+        creado, version = mapa.datos(fila)[:2]
+        return self._construir(item_id, *mapa.textos(fila, self._todos_los_campos), desde_epoca(creado), version)
+
+    def buscar(self, item_id: str):
+        cambios, mapa, congelados, _ = self.vivos()
+        tapado, objeto = self.cambio(item_id, cambios, congelados)
+        if tapado:
+            return objeto
+        clave = _clave(item_id)
+        if clave is None:
+            return None
+        fila = mapa.buscar(clave)
+        return self.leer_fila(mapa, fila, item_id) if fila is not None else None
+
+    def existe(self, item_id: str) -> bool:
+        return self.version(item_id) > 0
+
+    def version(self, item_id: str) -> int:
+        """Versión guardada de `item_id`, sin decodificar sus textos; 0 si no existe"""
+        cambios, mapa, congelados, _ = self.vivos()
+        tapado, objeto = self.cambio(item_id, cambios, congelados)
+        if tapado:
+            return objeto.version if objeto is not None else 0
+        clave = _clave(item_id)
+        fila = mapa.buscar(clave) if clave is not None else None
+        return mapa.datos(fila)[1] if fila is not None else 0
+
+    def recorrer(self, cursor: Optional[str] = None) -> Iterator:
+        """Registros vivos en orden de id, posteriores a `cursor`; con el candado tomado"""
+        cambios, mapa, congelados, nuevos = self.vivos()
+        desde = _clave(cursor) if cursor else b""
+        if cursor and desde is None:
+            raise ValueError("Cursor inválido")
+        fila = bisect_right(mapa.ids, desde)
+        posicion = bisect_right(nuevos, desde)
+        while fila < mapa.cantidad or posicion < len(nuevos):
+            if posicion < len(nuevos) and (fila >= mapa.cantidad or nuevos[posicion] < mapa.ids[fila]):
+                tapado, objeto = self.cambio(_texto_id(nuevos[posicion]), cambios, congelados)
+                posicion += 1
+                if objeto is not None:
+                    yield objeto
+                continue
+            item_id = _texto_id(mapa.ids[fila])
+            tapado, objeto = self.cambio(item_id, cambios, congelados)
+            if not tapado:
+                objeto = self.leer_fila(mapa, fila, item_id)
+            fila += 1
+            if objeto is not None:
+                yield objeto
+
+    def estadisticas(self) -> Dict[str, int]:
+        # Vivos = filas de la instantánea no borradas después + ids nuevos
+        with self.candado:
+            cambios, mapa, congelados, nuevos = self.vivos()
+            pendientes = {**congelados, **cambios}
+            borradas = sum(1 for item_id, objeto in pendientes.items()
+                           if objeto is None and mapa.buscar(_clave(item_id)) is not None)
+            return {"registros": mapa.cantidad - borradas + len(nuevos), "instantanea_registros": mapa.cantidad,
+                    "cambios_pendientes": len(pendientes), **self.texto.estadisticas()}
+
+    def todos(self) -> list:
+        with self.candado:
+            return list(self.recorrer())
+
+    def pagina(self, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+        objetos = []
+        with self.candado:
+            for objeto in self.recorrer(cursor):
+                if len(objetos) == limit:
+                    return objetos, objetos[-1].id
+                objetos.append(objeto)
+        return objetos, None
+
+    def _fuente_texto(self):
+        # Solo se decodifican nombre y email de la instantánea
+        cambios, mapa, congelados, _ = self.vivos()
+        nombre, email = self.campos.index("nombre"), self.campos.index("email")
+        for fila in range(mapa.cantidad):
+            item_id = _texto_id(mapa.ids[fila])
+            if not self.cambio(item_id, cambios, congelados)[0]:
+                yield (item_id, *mapa.textos(fila, (nombre, email)))
+        for item_id, objeto in {**congelados, **cambios}.items():
+            if objeto is not None:
+                yield item_id, objeto.nombre, objeto.email
+
+    def buscar_texto(self, texto: str, limite: int) -> list:
+        # El índice consolida sus pendientes (o se construye) al buscar
+        with self.candado:
+            encontrados = (self.buscar(item_id) for item_id in self.texto.buscar(texto, limite))
+            return [objeto for objeto in encontrados if objeto is not None]
+
+    def escribir(self, objetos: list, borrados: List[str]) -> None:
+        """Aplica altas/actualizaciones y bajas (ya validadas) y las anota en el registro"""
+        with self.candado:
+            registro, posicion = self.aplicar(objetos, borrados)
+        registro.confirmar(posicion)
+
+    def aplicar(self, objetos: list, borrados: List[str]):
+        """Como escribir() pero con el candado ya tomado y sin confirmar: devuelve
+        el registro y la posición que hay que confirmar después de soltarlo"""
+        codec = self.almacen.codec
+        with self.candado:
+            mapa, _, nuevos = self.capas
+            for objeto in objetos:
+                version = self.version(objeto.id)
+                if not version:
+                    clave = _clave(objeto.id)
+                    if mapa.buscar(clave) is None:
+                        insort(nuevos, clave)
+                objeto.version = version + 1
+                self.cambios[objeto.id] = objeto
+                self.texto.indexar(objeto.id, objeto.nombre, objeto.email)
+            for item_id in borrados:
+                clave = _clave(item_id)
+                posicion = bisect_left(nuevos, clave)
+                if posicion < len(nuevos) and nuevos[posicion] == clave:
+                    del nuevos[posicion]
+                self.cambios[item_id] = None
+                self.texto.quitar(item_id)
+            registro, posicion = self.almacen.anotar(
+                [codec.alta(objeto) for objeto in objetos] + [codec.baja(item_id) for item_id in borrados]
+            )
+            if objetos or borrados:
+                self.contador.anotar()
+            if self.almacen.debe_instantanea():
+                self._congelar_y_escribir(en_segundo_plano=True)
+        return registro, posicion
+
+    def _congelar_y_escribir(self, en_segundo_plano: bool) -> None:
+        # Con el candado tomado. Si la instantánea anterior falló, sus
+        # congelados siguen aquí y entran también en esta. Los cambios se
+        # vacían después de publicar los congelados (ver vivos()).
+        generacion = self.almacen.rotar()
+        mapa, congelados, nuevos = self.capas
+        congelados = {**congelados, **self.cambios}
+        self.capas = (mapa, congelados, nuevos)
+        self.cambios = {}
+        contenido = (mapa, congelados)
+        if en_segundo_plano:
+            self.almacen.instantanea_en_segundo_plano(generacion, contenido, self._cambiar_mapa)
+        else:
+            self.almacen.escribir_instantanea(generacion, contenido)
+            self._cambiar_mapa(generacion)
+
+    def _cambiar_mapa(self, generacion: int) -> None:
+        mapa = self.almacen.abrir(generacion)
+        with self.candado:
+            self.capas = (mapa, {}, self._calcular_ids_nuevos(mapa, self.cambios))
+
+    def instantanea(self) -> None:
+        # La instantánea en curso necesita el candado para terminar: se la
+        # espera sin tenerlo
+        while True:
+            self.almacen.esperar_instantanea()
+            with self.candado:
+                if not self.almacen.instantanea_en_curso():
+                    self._congelar_y_escribir(en_segundo_plano=False)
+                    return
+
+    def cerrar(self) -> None:
+        self.almacen.esperar_instantanea()
+        with self.candado:
+            self.almacen.cerrar()
+
+
+class MmapPatientRepository(PatientRepository):
+    """Pacientes servidos desde una instantánea mapeada en `directorio`"""
+
+    def __init__(self, directorio: str, politica: str = "grupo", intervalo: float = 0.05,
+                 operaciones_por_instantanea: int = OPERACIONES_POR_INSTANTANEA):
+        self.vista = _Vista(directorio, _CODEC_PACIENTE, paciente, politica, intervalo,
+                            operaciones_por_instantanea)
+
+    def guardar(self, patient: paciente) -> paciente:
+
+        return self.guardar_lote([patient])[0]
+
+    def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
+
+        return self.vista.buscar(patient_id)
+
+    def buscar_todos(self) -> List[paciente]:
+
+        return self.vista.todos()
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+
+        return self.vista.pagina(cursor, limit)
+
+    def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+
+        return self.vista.buscar_texto(texto, limite)
+
+    def version_de(self, patient_id: str) -> int:
+
+        return self.vista.version(patient_id)
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self.vista.contador.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return self.vista.estadisticas()
+
+    def actualizar(self, patient: paciente) -> paciente:
+
+        return self.actualizar_lote([patient])[0]
+
+    def borrar(self, patient_id: str) -> bool:
+
+        return self.borrar_lote([patient_id])[0]
+
+    def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+
+        sin_id = [patient for patient in patients if not patient.id]
+        for patient, patient_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            patient.id = patient_id
+        for patient in patients:
+            if _clave(patient.id) is None:
+                raise ValueError(f"El id {patient.id!r} no es un UUID")
+        ahora = datetime.now()
+        for patient in patients:
+            patient.fecha_creacion = ahora
+        self.vista.escribir(patients, [])
+        return patients
+
+    def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+
+        with self.vista.candado:
+            resultados = [patient if patient.id and self.vista.existe(patient.id) else None
+                          for patient in patients]
+            registro, posicion = self.vista.aplicar([patient for patient in resultados if patient], [])
+        registro.confirmar(posicion)
+        return resultados
+
+    def comparar_y_actualizar(self, esperado: paciente, nuevo: paciente) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, de forma atómica"""
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        with self.vista.candado:
+            if self.vista.buscar(esperado.id) != esperado:
+                return False
+            registro, posicion = self.vista.aplicar([nuevo], [])
+        registro.confirmar(posicion)
+        return True
+
+    def actualizar_si_version(self, patient: paciente, version: int) -> Optional[paciente]:
+        """Como en el puerto, pero comparando solo la versión, sin decodificar el registro"""
+        with self.vista.candado:
+            actual = self.vista.version(patient.id)
+            if not actual:
+                return None
+            if actual != version:
+                raise ConflictoDeVersion(actual)
+            registro, posicion = self.vista.aplicar([patient], [])
+        registro.confirmar(posicion)
+        return patient
+
+    def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+
+        with self.vista.candado:
+            resultados = []
+            borrados = set()
+            for patient_id in patient_ids:
+                existia = patient_id not in borrados and self.vista.existe(patient_id)
+                if existia:
+                    borrados.add(patient_id)
+                resultados.append(existia)
+            registro, posicion = self.vista.aplicar(
+                [], [patient_id for patient_id, borrado in zip(patient_ids, resultados) if borrado]
+            )
+        registro.confirmar(posicion)
+        return resultados
+
+    def instantanea(self) -> None:
+        """Incorpora los cambios a una instantánea nueva y espera a que esté en disco"""
+        self.vista.instantanea()
+
+    def cerrar(self) -> None:
+        self.vista.cerrar()
+
+
+class MmapDoctorRepository(DoctorRepository):
+    """Doctores servidos desde una instantánea mapeada en `directorio`"""
+
+    def __init__(self, directorio: str, politica: str = "grupo", intervalo: float = 0.05,
+                 operaciones_por_instantanea: int = OPERACIONES_POR_INSTANTANEA):
+        especialidad = _CODEC_DOCTOR.campos[1:].index("especialidad")
+        self.vista = _Vista(directorio, _CODEC_DOCTOR, Doctor, politica, intervalo,
+                            operaciones_por_instantanea, especialidad=especialidad)
+
+    def guardar(self, doctor: Doctor) -> Doctor:
+
+        return self.guardar_lote([doctor])[0]
+
+    def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
+
+        return self.vista.buscar(doctor_id)
+
+    def buscar_todos(self) -> List[Doctor]:
+
+        return self.vista.todos()
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+
+        return self.vista.pagina(cursor, limit)
+
+    def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        clave = especialidad.casefold()
+        vista = self.vista
+        with vista.candado:
+            cambios, mapa, congelados, _ = vista.vivos()
+            doctors = []
+            for fila in mapa.filas_de_especialidad(clave):
+                doctor_id = _texto_id(mapa.ids[fila])
+                if not vista.cambio(doctor_id, cambios, congelados)[0]:
+                    doctors.append(vista.leer_fila(mapa, fila, doctor_id))
+            for doctor in {**congelados, **cambios}.values():
+                if doctor is not None and doctor.especialidad.casefold() == clave:
+                    doctors.append(doctor)
+        return doctors
+
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+
+        return self.vista.buscar_texto(texto, limite)
+
+    def version_de(self, doctor_id: str) -> int:
+
+        return self.vista.version(doctor_id)
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return self.vista.contador.leer()
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        return self.vista.estadisticas()
+
+    def actualizar(self, doctor: Doctor) -> Doctor:
+
+        return self.actualizar_lote([doctor])[0]
+
+    def borrar(self, doctor_id: str) -> bool:
+
+        return self.borrar_lote([doctor_id])[0]
+
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+
+        sin_id = [doctor for doctor in doctors if not doctor.id]
+        for doctor, doctor_id in zip(sin_id, _nuevos_ids(len(sin_id))):
+            doctor.id = doctor_id
+        for doctor in doctors:
+            if _clave(doctor.id) is None:
+                raise ValueError(f"El id {doctor.id!r} no es un UUID")
+        ahora = datetime.now()
+        for doctor in doctors:
+            doctor.fecha_creacion = ahora
+        self.vista.escribir(doctors, [])
+        return doctors
+
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+
+        with self.vista.candado:
+            resultados = [doctor if doctor.id and self.vista.existe(doctor.id) else None
+                          for doctor in doctors]
+            registro, posicion = self.vista.aplicar([doctor for doctor in resultados if doctor], [])
+        registro.confirmar(posicion)
+        return resultados
+
+    def comparar_y_actualizar(self, esperado: Doctor, nuevo: Doctor) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, de forma atómica"""
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        with self.vista.candado:
+            if self.vista.buscar(esperado.id) != esperado:
+                return False
+            registro, posicion = self.vista.aplicar([nuevo], [])
+        registro.confirmar(posicion)
+        return True
+
+    def actualizar_si_version(self, doctor: Doctor, version: int) -> Optional[Doctor]:
+        """Como en el puerto, pero comparando solo la versión, sin decodificar el registro"""
+        with self.vista.candado:
+            actual = self.vista.version(doctor.id)
+            if not actual:
+                return None
+            if actual != version:
+                raise ConflictoDeVersion(actual)
+            registro, posicion = self.vista.aplicar([doctor], [])
+        registro.confirmar(posicion)
+        return doctor
+
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+
+        with self.vista.candado:
+            resultados = []
+            borrados = set()
+            for doctor_id in doctor_ids:
+                existia = doctor_id not in borrados and self.vista.existe(doctor_id)
+                if existia:
+                    borrados.add(doctor_id)
+                resultados.append(existia)
+            registro, posicion = self.vista.aplicar(
+                [], [doctor_id for doctor_id, borrado in zip(doctor_ids, resultados) if borrado]
+            )
+        registro.confirmar(posicion)
+        return resultados
+
+    def instantanea(self) -> None:
+        """Incorpora los cambios a una instantánea nueva y espera a que esté en disco"""
+        self.vista.instantanea()
+
+    def cerrar(self) -> None:
+        self.vista.cerrar()
@@ -0,0 +1,457 @@
+import logging
+import os
+import re
+import struct
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor, ConflictoDeVersion, a_epoca, desde_epoca
+from app.infraestructure.adapters.database import InMemoryPatientRepository, InMemoryDoctorRepository
+from app.infraestructure.adapters.registro_escritura import (
+    RegistroEscritura,
+    leer_registro,
+    marco,
+    sincronizar_directorio
+)
+
+
+# Repositorios en memoria que sobreviven a un reinicio. Cada escritura se
+# aplica en memoria y se anota en un registro de escritura anticipada (WAL)
+# antes de responder; cada `operaciones_por_instantanea` operaciones se
+# guarda una instantánea binaria y se descartan los registros anteriores.
+#
+# En el directorio de cada repositorio hay generaciones numeradas:
+#   instantanea-N.bin  estado completo al empezar registro-N.log
+#   registro-N.log     operaciones posteriores a esa instantánea
+# Al arrancar se carga la instantánea más reciente y se reaplican los
+# registros de su generación en adelante.
+
+logger = logging.getLogger("clinica.persistente")
+
+OPERACIONES_POR_INSTANTANEA = 100_000
+
+_ALTA = 1
+_BAJA = 2
+_NULO = 0xFFFFFFFF
+_MAGIA = b"CLINICA-INSTANTANEA-2"
+_CONTENIDO_INSTANTANEA = struct.Struct("<QQ")
+_ARCHIVO = re.compile(r"^(instantanea|registro)-(\d+)\.(\w+)$")
+
+
+class _Codec:
+    """Codificación binaria de altas y bajas
+
+    Cabecera fija (operación, fecha en epoch, versión y el largo de cada texto)
+    seguida de los textos UTF-8; un largo _NULO indica None. Las bajas solo
+    llevan el id.
+    """
+
+    def __init__(self, tipo, campos: Tuple[str, ...]):
+        # Los campos van en el orden de los argumentos posicionales de `tipo`
+        self.tipo = tipo
+        self.campos = ("id",) + campos
+        self._cabecera = struct.Struct(f"<BqI{len(self.campos)}I")
+        self._vacios = (_NULO,) * len(campos)
+        self._ultima_fecha = (0, None)
+
+    def alta(self, objeto) -> bytes:
+        textos = [getattr(objeto, campo) for campo in self.campos]
+        datos = [texto.encode("utf-8") if texto is not None else b"" for texto in textos]
+        largos = [len(dato) if texto is not None else _NULO for texto, dato in zip(textos, datos)]
+        return self._cabecera.pack(_ALTA, a_epoca(objeto.fecha_creacion), objeto.version,
+                                   *largos) + b"".join(datos)
+
+    def baja(self, item_id: str) -> bytes:
+        datos = item_id.encode("utf-8")
+        return self._cabecera.pack(_BAJA, 0, 0, len(datos), *self._vacios) + datos
+
+    def _fecha(self, creado: int):
+        # Los registros de un mismo lote comparten la fecha de creación
+        ultima = self._ultima_fecha
+        if ultima[0] != creado:
+            ultima = self._ultima_fecha = (creado, desde_epoca(creado))
+        return ultima[1]
+
+    def leer(self, datos) -> Tuple[int, str, object]:
+        """Devuelve (operación, id, objeto); el objeto es None en las bajas"""
+        operacion, creado, version, *largos = self._cabecera.unpack_from(datos)
+        posicion = self._cabecera.size
+        textos = []
+        for largo in largos:
+            if largo == _NULO:
+                textos.append(None)
+            else:
+                textos.append(str(datos[posicion:posicion + largo], "utf-8"))
+                posicion += largo
+        if operacion == _BAJA:
+            return operacion, textos[0], None
+        return operacion, textos[0], self.tipo(*textos, self._fecha(creado), version)
+
+
+class _Almacen:
+    """Directorio con las instantáneas y registros de un repositorio"""
+
+    EXTENSION_INSTANTANEA = "bin"
+
+    def __init__(self, directorio: str, codec: _Codec, politica: str, intervalo: float,
+                 operaciones_por_instantanea: int):
+        self.directorio = directorio
+        self.codec = codec
+        self.politica = politica
+        self.intervalo = intervalo
+        self.operaciones_por_instantanea = operaciones_por_instantanea
+        self.generacion = 0
+        self.operaciones = 0
+        self.registro: Optional[RegistroEscritura] = None
+        self._hilo_instantanea: Optional[threading.Thread] = None
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, tipo: str, generacion: int) -> str:
+        extension = self.EXTENSION_INSTANTANEA if tipo == "instantanea" else "log"
+        return os.path.join(self.directorio, f"{tipo}-{generacion:010d}.{extension}")
+
+    def _generaciones(self) -> Dict[str, List[int]]:
+        encontradas = {"instantanea": [], "registro": []}
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(".tmp"):
+                # Instantánea a medio escribir cuando se cayó el proceso
+                os.remove(os.path.join(self.directorio, nombre))
+                continue
+            coincidencia = _ARCHIVO.match(nombre)
+            if coincidencia and nombre == os.path.basename(self._ruta(coincidencia.group(1), int(coincidencia.group(2)))):
+                encontradas[coincidencia.group(1)].append(int(coincidencia.group(2)))
+        return {tipo: sorted(generaciones) for tipo, generaciones in encontradas.items()}
+
+    def recuperar(self) -> Dict[str, object]:
+        """Estado guardado (id -> objeto) y apertura de un registro nuevo"""
+        generaciones = self._generaciones()
+        base = generaciones["instantanea"][-1] if generaciones["instantanea"] else 0
+        estado = self._leer_instantanea(base) if base else {}
+        for generacion in generaciones["registro"]:
+            if generacion < base:
+                continue
+            for datos in leer_registro(self._ruta("registro", generacion)):
+                operacion, item_id, objeto = self.codec.leer(datos)
+                if operacion == _ALTA:
+                    estado[item_id] = objeto
+                else:
+                    self._baja(estado, item_id)
+        self.generacion = max([base] + generaciones["registro"]) + 1
+        self.registro = RegistroEscritura(self._ruta("registro", self.generacion), self.politica, self.intervalo)
+        return estado
+
+    def _baja(self, estado: Dict[str, object], item_id: str) -> None:
+        estado.pop(item_id, None)
+
+    def _leer_instantanea(self, generacion: int) -> Dict[str, object]:
+        ruta = self._ruta("instantanea", generacion)
+        marcos = leer_registro(ruta, truncar=False)
+        cabecera = next(marcos, b"")
+        if bytes(cabecera[:len(_MAGIA)]) != _MAGIA:
+            raise RuntimeError(f"Instantánea no reconocida: {ruta}")
+        generacion_guardada, cantidad = _CONTENIDO_INSTANTANEA.unpack_from(cabecera, len(_MAGIA))
+        estado = {}
+        for datos in marcos:
+            _, item_id, objeto = self.codec.leer(datos)
+            estado[item_id] = objeto
+        if generacion_guardada != generacion or len(estado) != cantidad:
+            raise RuntimeError(f"Instantánea incompleta o dañada: {ruta}")
+        return estado
+
+    def anotar(self, registros: Iterable[bytes]) -> Tuple[RegistroEscritura, int]:
+        """Registro en el que quedaron las operaciones y posición que hay que confirmar"""
+        registros = list(registros)
+        self.operaciones += len(registros)
+        return self.registro, self.registro.anotar(registros)
+
+    def instantanea_en_curso(self) -> bool:
+        return self._hilo_instantanea is not None and self._hilo_instantanea.is_alive()
+
+    def debe_instantanea(self) -> bool:
+        return not self.instantanea_en_curso() and self.operaciones >= self.operaciones_por_instantanea
+
+    def rotar(self) -> int:
+        """Empieza un registro nuevo; devuelve su generación (la de la próxima instantánea)"""
+        self.registro.cerrar()
+        self.generacion += 1
+        self.registro = RegistroEscritura(self._ruta("registro", self.generacion), self.politica, self.intervalo)
+        self.operaciones = 0
+        return self.generacion
+
+    def _volcar(self, archivo, generacion: int, objetos: List[object]) -> None:
+        archivo.write(marco(_MAGIA + _CONTENIDO_INSTANTANEA.pack(generacion, len(objetos))))
+        alta = self.codec.alta
+        for objeto in objetos:
+            archivo.write(marco(alta(objeto)))
+
+    def escribir_instantanea(self, generacion: int, contenido) -> None:
+        ruta = self._ruta("instantanea", generacion)
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb", buffering=1 << 20) as archivo:
+            self._volcar(archivo, generacion, contenido)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta)
+        sincronizar_directorio(self.directorio)
+        # Lo anterior a esta generación ya está en la instantánea
+        generaciones = self._generaciones()
+        for tipo, lista in generaciones.items():
+            for vieja in lista:
+                if vieja < generacion:
+                    os.remove(self._ruta(tipo, vieja))
+
+    def instantanea_en_segundo_plano(self, generacion: int, contenido,
+                                     al_terminar: Optional[Callable[[int], None]] = None) -> None:
+        def escribir():
+            try:
+                self.escribir_instantanea(generacion, contenido)
+            except Exception:
+                # Los registros anteriores siguen ahí: no se pierde nada
+                logger.exception("No se pudo guardar la instantánea %s", generacion)
+                return
+            if al_terminar is not None:
+                al_terminar(generacion)
+
+        self._hilo_instantanea = threading.Thread(target=escribir, name="instantanea", daemon=True)
+        self._hilo_instantanea.start()
+
+    def esperar_instantanea(self) -> None:
+        if self._hilo_instantanea is not None:
+            self._hilo_instantanea.join()
+
+    def cerrar(self) -> None:
+        self.esperar_instantanea()
+        self.registro.cerrar()
+
+
+_CODEC_PACIENTE = _Codec(paciente, ("nombre", "email"))
+_CODEC_DOCTOR = _Codec(Doctor, ("nombre", "especialidad", "email"))
+
+
+class PersistentPatientRepository(InMemoryPatientRepository):
+    """InMemoryPatientRepository con registro de escritura e instantáneas en `directorio`"""
+
+    def __init__(self, directorio: str, politica: str = "grupo", intervalo: float = 0.05,
+                 operaciones_por_instantanea: int = OPERACIONES_POR_INSTANTANEA):
+        super().__init__()
+        self._candado = threading.RLock()
+        self._almacen = _Almacen(directorio, _CODEC_PACIENTE, politica, intervalo, operaciones_por_instantanea)
+        self.patients.update(self._almacen.recuperar())
+        self._ids_ordenados = sorted(self.patients)
+        # El índice de texto se reconstruye en la primera búsqueda, no al arrancar
+        self._texto.diferir(lambda: ((p.id, p.nombre, p.email) for p in self.patients.values()))
+
+    def _anotar(self, registros: List[bytes]) -> Tuple[RegistroEscritura, int]:
+        # Con el candado tomado: el orden del registro es el de las escrituras en memoria
+        anotado = self._almacen.anotar(registros)
+        if self._almacen.debe_instantanea():
+            generacion = self._almacen.rotar()
+            self._almacen.instantanea_en_segundo_plano(generacion, list(self.patients.values()))
+        return anotado
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+        # Con un EjecutorAcotado las lecturas corren en otros hilos que las
+        # escrituras: las que recorren los ids ordenados o el índice de texto
+        # (que se consolida al buscar) toman el candado
+        with self._candado:
+            return super().buscar_pagina(cursor, limit)
+
+    def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+
+        with self._candado:
+            return super().buscar_texto(texto, limite)
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        with self._candado:
+            return super().estadisticas()
+
+    def guardar(self, patient: paciente) -> paciente:
+
+        return self.guardar_lote([patient])[0]
+
+    def actualizar(self, patient: paciente) -> paciente:
+
+        return self.actualizar_lote([patient])[0]
+
+    def borrar(self, patient_id: str) -> bool:
+
+        return self.borrar_lote([patient_id])[0]
+
+    def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+
+        with self._candado:
+            super().guardar_lote(patients)
+            registro, posicion = self._anotar([_CODEC_PACIENTE.alta(patient) for patient in patients])
+        registro.confirmar(posicion)
+        return patients
+
+    def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+
+        with self._candado:
+            resultados = super().actualizar_lote(patients)
+            registro, posicion = self._anotar([_CODEC_PACIENTE.alta(patient) for patient in resultados if patient])
+        registro.confirmar(posicion)
+        return resultados
+
+    def comparar_y_actualizar(self, esperado: paciente, nuevo: paciente) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, de forma atómica"""
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        with self._candado:
+            if self.patients.get(esperado.id) != esperado:
+                return False
+            super().actualizar(nuevo)
+            registro, posicion = self._anotar([_CODEC_PACIENTE.alta(nuevo)])
+        registro.confirmar(posicion)
+        return True
+
+    def actualizar_si_version(self, patient: paciente, version: int) -> Optional[paciente]:
+
+        with self._candado:
+            actual = self.patients.get(patient.id)
+            if actual is None:
+                return None
+            if actual.version != version:
+                raise ConflictoDeVersion(actual.version)
+            super().actualizar(patient)
+            registro, posicion = self._anotar([_CODEC_PACIENTE.alta(patient)])
+        registro.confirmar(posicion)
+        return patient
+
+    def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+
+        with self._candado:
+            resultados = super().borrar_lote(patient_ids)
+            registro, posicion = self._anotar([_CODEC_PACIENTE.baja(patient_id)
+                                     for patient_id, borrado in zip(patient_ids, resultados) if borrado])
+        registro.confirmar(posicion)
+        return resultados
+
+    def instantanea(self) -> None:
+        """Guarda una instantánea ahora y espera a que esté en disco"""
+        with self._candado:
+            self._almacen.esperar_instantanea()
+            generacion = self._almacen.rotar()
+            objetos = list(self.patients.values())
+        self._almacen.escribir_instantanea(generacion, objetos)
+
+    def cerrar(self) -> None:
+        with self._candado:
+            self._almacen.cerrar()
+
+
+class PersistentDoctorRepository(InMemoryDoctorRepository):
+    """InMemoryDoctorRepository con registro de escritura e instantáneas en `directorio`"""
+
+    def __init__(self, directorio: str, politica: str = "grupo", intervalo: float = 0.05,
+                 operaciones_por_instantanea: int = OPERACIONES_POR_INSTANTANEA):
+        super().__init__()
+        self._candado = threading.RLock()
+        self._almacen = _Almacen(directorio, _CODEC_DOCTOR, politica, intervalo, operaciones_por_instantanea)
+        self._texto.diferir(lambda: ((d.id, d.nombre, d.email) for d in self.doctors.values()))
+        for doctor in self._almacen.recuperar().values():
+            self.doctors[doctor.id] = doctor
+            self._indexar(doctor)
+        self._ids_ordenados = sorted(self.doctors)
+
+    def _anotar(self, registros: List[bytes]) -> Tuple[RegistroEscritura, int]:
+
+        anotado = self._almacen.anotar(registros)
+        if self._almacen.debe_instantanea():
+            generacion = self._almacen.rotar()
+            self._almacen.instantanea_en_segundo_plano(generacion, list(self.doctors.values()))
+        return anotado
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+        # Ver PersistentPatientRepository.buscar_pagina
+        with self._candado:
+            return super().buscar_pagina(cursor, limit)
+
+    def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        with self._candado:
+            return super().buscar_por_especialidad(especialidad)
+
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+
+        with self._candado:
+            return super().buscar_texto(texto, limite)
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        with self._candado:
+            return super().estadisticas()
+
+    def guardar(self, doctor: Doctor) -> Doctor:
+
+        return self.guardar_lote([doctor])[0]
+
+    def actualizar(self, doctor: Doctor) -> Doctor:
+
+        return self.actualizar_lote([doctor])[0]
+
+    def borrar(self, doctor_id: str) -> bool:
+
+        return self.borrar_lote([doctor_id])[0]
+
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+
+        with self._candado:
+            super().guardar_lote(doctors)
+            registro, posicion = self._anotar([_CODEC_DOCTOR.alta(doctor) for doctor in doctors])
+        registro.confirmar(posicion)
+        return doctors
+
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+
+        with self._candado:
+            resultados = super().actualizar_lote(doctors)
+            registro, posicion = self._anotar([_CODEC_DOCTOR.alta(doctor) for doctor in resultados if doctor])
+        registro.confirmar(posicion)
+        return resultados
+
+    def comparar_y_actualizar(self, esperado: Doctor, nuevo: Doctor) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, de forma atómica"""
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        with self._candado:
+            if self.doctors.get(esperado.id) != esperado:
+                return False
+            super().actualizar(nuevo)
+            registro, posicion = self._anotar([_CODEC_DOCTOR.alta(nuevo)])
+        registro.confirmar(posicion)
+        return True
+
+    def actualizar_si_version(self, doctor: Doctor, version: int) -> Optional[Doctor]:
+
+        with self._candado:
+            actual = self.doctors.get(doctor.id)
+            if actual is None:
+                return None
+            if actual.version != version:
+                raise ConflictoDeVersion(actual.version)
+            super().actualizar(doctor)
+            registro, posicion = self._anotar([_CODEC_DOCTOR.alta(doctor)])
+        registro.confirmar(posicion)
+        return doctor
+
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+
+        with self._candado:
+            resultados = super().borrar_lote(doctor_ids)
+            registro, posicion = self._anotar([_CODEC_DOCTOR.baja(doctor_id)
+                                     for doctor_id, borrado in zip(doctor_ids, resultados) if borrado])
+        registro.confirmar(posicion)
+        return resultados
+
+    def instantanea(self) -> None:
+        """Guarda una instantánea ahora y espera a que esté en disco"""
+        with self._candado:
+            self._almacen.esperar_instantanea()
+            generacion = self._almacen.rotar()
+            objetos = list(self.doctors.values())
+        self._almacen.escribir_instantanea(generacion, objetos)
+
+    def cerrar(self) -> None:
+        with self._candado:
+            self._almacen.cerrar()
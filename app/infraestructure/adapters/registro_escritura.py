@@ -0,0 +1,163 @@
+import os
+import struct
+import threading
+import zlib
+from typing import Iterable, Iterator
+
+
+# Registro de escritura anticipada (WAL): archivo de solo anexado con un
+# marco por operación: largo (4 bytes) + crc32 (4 bytes) + datos.
+# Políticas de sincronización con disco al confirmar una operación:
+#  - "siempre":   un fsync por confirmación; ninguna operación confirmada se pierde
+#  - "grupo":     igual de seguro, pero las confirmaciones concurrentes comparten
+#                 un solo fsync (group commit): el primero en llegar sincroniza
+#                 todo lo pendiente y los demás esperan a que termine
+#  - "intervalo": un hilo hace fsync cada `intervalo` segundos; ante un corte de
+#                 luz se pierde como mucho ese intervalo
+#  - "nunca":     solo se escribe al sistema operativo; sobrevive a la caída del
+#                 proceso pero no a la del sistema
+POLITICAS = ("siempre", "grupo", "intervalo", "nunca")
+
+_MARCO = struct.Struct("<II")
+
+
+def marco(datos: bytes) -> bytes:
+    return _MARCO.pack(len(datos), zlib.crc32(datos)) + datos
+
+
+def leer_registro(ruta: str, truncar: bool = True) -> Iterator[bytes]:
+    """Recorre los datos de cada marco; corta en el primer marco incompleto o corrupto
+
+    Un marco a medias al final es una escritura interrumpida por una caída:
+    con `truncar` se recorta el archivo en ese punto para seguir anexando.
+    """
+    with open(ruta, "rb") as archivo:
+        contenido = archivo.read()
+    posicion = 0
+    vista = memoryview(contenido)
+    while posicion + _MARCO.size <= len(contenido):
+        largo, crc = _MARCO.unpack_from(contenido, posicion)
+        fin = posicion + _MARCO.size + largo
+        if fin > len(contenido):
+            break
+        datos = vista[posicion + _MARCO.size:fin]
+        if zlib.crc32(datos) != crc:
+            break
+        yield datos
+        posicion = fin
+    if truncar and posicion < len(contenido):
+        with open(ruta, "r+b") as archivo:
+            archivo.truncate(posicion)
+            os.fsync(archivo.fileno())
+
+
+def sincronizar_directorio(directorio: str) -> None:
+    # Hace duraderos los renombrados y las altas/bajas de archivos
+    descriptor = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class RegistroEscritura:
+    """WAL de un archivo con confirmación según la política de sincronización"""
+
+    def __init__(self, ruta: str, politica: str = "grupo", intervalo: float = 0.05):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de sincronización desconocida: {politica!r}")
+        self.politica = politica
+        self.intervalo = intervalo
+        self._condicion = threading.Condition()
+        self._pendiente = bytearray()
+        # Posiciones lógicas (bytes anotados desde la apertura): asignada,
+        # escrita al sistema operativo y sincronizada con disco
+        self._anotado = 0
+        self._escrito = 0
+        self._duradero = 0
+        self._sincronizando = False
+        self._cerrado = False
+        self.sincronizaciones = 0
+        self._archivo = open(ruta, "ab", buffering=0)
+        sincronizar_directorio(os.path.dirname(os.path.abspath(ruta)))
+        self._hilo = None
+        if politica == "intervalo":
+            self._hilo = threading.Thread(target=self._sincronizar_periodicamente,
+                                          name="wal-fsync", daemon=True)
+            self._hilo.start()
+
+    def anotar(self, registros: Iterable[bytes]) -> int:
+        """Añade los registros al búfer; devuelve la posición que hay que confirmar"""
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El registro de escritura está cerrado")
+            for datos in registros:
+                self._pendiente += marco(datos)
+            self._anotado = self._escrito + len(self._pendiente)
+            return self._anotado
+
+    def _escribir(self) -> int:
+        # Con la condición tomada: vuelca el búfer al sistema operativo
+        if self._pendiente:
+            self._archivo.write(self._pendiente)
+            self._escrito += len(self._pendiente)
+            self._pendiente = bytearray()
+        return self._escrito
+
+    def _fsync(self) -> None:
+        os.fsync(self._archivo.fileno())
+        self.sincronizaciones += 1
+
+    def confirmar(self, posicion: int) -> None:
+        """Vuelve cuando lo anotado hasta `posicion` es tan duradero como exige la política"""
+        with self._condicion:
+            if self._cerrado:
+                # cerrar() ya sincronizó todo lo anotado
+                return
+            if self.politica in ("nunca", "intervalo"):
+                self._escribir()
+                return
+            if self.politica == "siempre":
+                if self._duradero < posicion:
+                    self._duradero = self._escribir()
+                    self._fsync()
+                return
+            while self._duradero < posicion:
+                if self._sincronizando:
+                    self._condicion.wait()
+                    continue
+                # Líder del grupo: escribe y sincroniza todo lo anotado hasta
+                # ahora, sin retener la condición durante el fsync para que
+                # otros hilos sigan anotando el siguiente grupo
+                self._sincronizando = True
+                objetivo = self._escribir()
+                self._condicion.release()
+                try:
+                    self._fsync()
+                finally:
+                    self._condicion.acquire()
+                    self._sincronizando = False
+                    self._condicion.notify_all()
+                self._duradero = max(self._duradero, objetivo)
+
+    def _sincronizar_periodicamente(self) -> None:
+        while True:
+            with self._condicion:
+                if self._condicion.wait_for(lambda: self._cerrado, timeout=self.intervalo):
+                    return
+                if self._duradero < self._escrito + len(self._pendiente):
+                    self._duradero = self._escribir()
+                    self._fsync()
+
+    def cerrar(self) -> None:
+        with self._condicion:
+            self._condicion.wait_for(lambda: not self._sincronizando)
+            if self._cerrado:
+                return
+            self._duradero = self._escribir()
+            self._fsync()
+            self._cerrado = True
+            self._archivo.close()
+            self._condicion.notify_all()
+        if self._hilo is not None:
+            self._hilo.join()
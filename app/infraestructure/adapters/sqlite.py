@@ -0,0 +1,486 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.domain.core.models import paciente, Doctor, ConflictoDeVersion
+from app.application.ports.patient_repository import PatientRepository
+from app.application.ports.doctor_repository import DoctorRepository
+from app.infraestructure.adapters.busqueda import tokenizar
+
+
+# Tamaño de la caché de sentencias preparadas de cada conexión. Todas las
+# consultas son constantes de clase, así que cada una se compila una sola
+# vez por conexión y después se reutiliza.
+SENTENCIAS_EN_CACHE = 128
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pacientes (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    email TEXT NOT NULL,
+    fecha_creacion TEXT,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS doctores (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    especialidad TEXT NOT NULL,
+    especialidad_clave TEXT NOT NULL,
+    email TEXT,
+    fecha_creacion TEXT,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_doctores_especialidad ON doctores (especialidad_clave);
+"""
+
+# Búsqueda de texto con FTS5 sobre nombre y email. Las tablas FTS no copian
+# el contenido (content=...): solo guardan el índice, que los disparadores
+# mantienen al día. prefix='2 3' precalcula los prefijos cortos, los más caros.
+_ESQUEMA_TEXTO = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_fts USING fts5(
+    nombre, email, content='{tabla}', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS {tabla}_fts_alta AFTER INSERT ON {tabla} BEGIN
+    INSERT INTO {tabla}_fts (rowid, nombre, email) VALUES (new.rowid, new.nombre, new.email);
+END;
+CREATE TRIGGER IF NOT EXISTS {tabla}_fts_baja AFTER DELETE ON {tabla} BEGIN
+    INSERT INTO {tabla}_fts ({tabla}_fts, rowid, nombre, email) VALUES ('delete', old.rowid, old.nombre, old.email);
+END;
+CREATE TRIGGER IF NOT EXISTS {tabla}_fts_cambio AFTER UPDATE OF nombre, email ON {tabla} BEGIN
+    INSERT INTO {tabla}_fts ({tabla}_fts, rowid, nombre, email) VALUES ('delete', old.rowid, old.nombre, old.email);
+    INSERT INTO {tabla}_fts (rowid, nombre, email) VALUES (new.rowid, new.nombre, new.email);
+END;
+"""
+_TABLAS_CON_TEXTO = ("pacientes", "doctores")
+
+# Contador de escrituras por tabla, común a todos los procesos que abren la
+# base. Se sube en la misma transacción que la escritura.
+_ESQUEMA_CAMBIOS = """
+CREATE TABLE IF NOT EXISTS cambios (
+    tabla TEXT PRIMARY KEY,
+    contador INTEGER NOT NULL,
+    modificado REAL NOT NULL
+);
+"""
+_ANOTAR_CAMBIO = "UPDATE cambios SET contador = contador + 1, modificado = ? WHERE tabla = ?"
+_LEER_CAMBIOS = "SELECT contador, modificado FROM cambios WHERE tabla = ?"
+
+
+def _anotar_cambio(conexion: sqlite3.Connection, tabla: str) -> None:
+    conexion.execute(_ANOTAR_CAMBIO, (time.time(), tabla))
+
+
+def _leer_cambios(conexion: sqlite3.Connection, tabla: str) -> Tuple[int, float]:
+    contador, modificado = conexion.execute(_LEER_CAMBIOS, (tabla,)).fetchone()
+    return contador, modificado
+
+
+def _bytes_indice_texto(conexion: sqlite3.Connection, tabla: str) -> int:
+    # Lo que ocupan los segmentos del índice FTS5, sin contar páginas libres
+    return conexion.execute(f"SELECT coalesce(sum(length(block)), 0) FROM {tabla}_fts_data").fetchone()[0]
+
+
+def _consulta_texto(texto: str) -> Optional[str]:
+    # Cada término como prefijo entre comillas; FTS5 los combina con AND
+    terminos = tokenizar(texto)
+    return " ".join(f'"{termino}"*' for termino in terminos) if terminos else None
+
+
+class ConexionesPorHilo:
+    """Una conexión SQLite por hilo (y por proceso) sobre el mismo archivo"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._candado = threading.Lock()
+        self._abiertas: List[sqlite3.Connection] = []
+        with self._nueva() as conexion:
+            # WAL es persistente en el archivo: lectores y escritor no se bloquean
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(_ESQUEMA)
+            conexion.executescript(_ESQUEMA_CAMBIOS)
+            for tabla in _TABLAS_CON_TEXTO:
+                columnas = {fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")}
+                if "version" not in columnas:
+                    # Bases creadas antes de la versión por registro
+                    conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                # Como ContadorCambios: arranca en el reloj en ns para no repetir ETags
+                conexion.execute("INSERT OR IGNORE INTO cambios VALUES (?, ?, ?)",
+                                 (tabla, time.time_ns(), time.time()))
+            for tabla in _TABLAS_CON_TEXTO:
+                existia = conexion.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = ?", (f"{tabla}_fts",)
+                ).fetchone()
+                conexion.executescript(_ESQUEMA_TEXTO.format(tabla=tabla))
+                if not existia:
+                    # Bases creadas antes del índice de texto
+                    conexion.execute(f"INSERT INTO {tabla}_fts ({tabla}_fts) VALUES ('rebuild')")
+
+    def _nueva(self) -> sqlite3.Connection:
+        # check_same_thread=False solo para poder cerrarlas desde cerrar();
+        # cada conexión la usa únicamente el hilo que la abrió
+        conexion = sqlite3.connect(self.ruta, timeout=30, cached_statements=SENTENCIAS_EN_CACHE,
+                                   check_same_thread=False)
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute("PRAGMA busy_timeout=30000")
+        with self._candado:
+            self._abiertas.append(conexion)
+        return conexion
+
+    def obtener(self) -> sqlite3.Connection:
+        # Tras un fork el hijo no debe reutilizar las conexiones del padre
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            self._local.conexion = self._nueva()
+            self._local.pid = pid
+        return self._local.conexion
+
+    def cerrar(self) -> None:
+        with self._candado:
+            for conexion in self._abiertas:
+                conexion.close()
+            self._abiertas.clear()
+        self._local = threading.local()
+
+
+def _fecha(valor: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def _texto_fecha(fecha: Optional[datetime]) -> Optional[str]:
+    return fecha.isoformat() if fecha else None
+
+
+class SqlitePatientRepository(PatientRepository):
+
+
+    _INSERTAR = (
+        "INSERT INTO pacientes (id, nombre, email, fecha_creacion) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET nombre = excluded.nombre, email = excluded.email, "
+        "fecha_creacion = excluded.fecha_creacion, version = pacientes.version + 1"
+    )
+    _POR_ID = "SELECT id, nombre, email, fecha_creacion, version FROM pacientes WHERE id = ?"
+    _TODOS = "SELECT id, nombre, email, fecha_creacion, version FROM pacientes ORDER BY rowid"
+    _PAGINA = "SELECT id, nombre, email, fecha_creacion, version FROM pacientes WHERE id > ? ORDER BY id LIMIT ?"
+    # bm25 con más peso para el nombre que para el email
+    _TEXTO = (
+        "SELECT p.id, p.nombre, p.email, p.fecha_creacion, p.version FROM pacientes_fts "
+        "JOIN pacientes p ON p.rowid = pacientes_fts.rowid "
+        "WHERE pacientes_fts MATCH ? ORDER BY bm25(pacientes_fts, 4.0, 1.0) LIMIT ?"
+    )
+    _ACTUALIZAR = "UPDATE pacientes SET nombre = ?, email = ?, version = version + 1 WHERE id = ?"
+    _ACTUALIZAR_SI = _ACTUALIZAR + " AND version = ? RETURNING version"
+    _VERSION = "SELECT version FROM pacientes WHERE id = ?"
+    _BORRAR = "DELETE FROM pacientes WHERE id = ?"
+    _CONTAR = "SELECT count(*) FROM pacientes"
+
+    def __init__(self, ruta: str, conexiones: Optional[ConexionesPorHilo] = None):
+        self.conexiones = conexiones or ConexionesPorHilo(ruta)
+
+    @staticmethod
+    def _a_paciente(fila) -> paciente:
+        return paciente(id=fila[0], nombre=fila[1], email=fila[2], fecha_creacion=_fecha(fila[3]),
+                        version=fila[4])
+
+    @staticmethod
+    def _fila(patient: paciente) -> tuple:
+        return (patient.id, patient.nombre, patient.email, _texto_fecha(patient.fecha_creacion))
+
+    def guardar(self, patient: paciente) -> paciente:
+
+        return self.guardar_lote([patient])[0]
+
+    def buscar_por_id(self, patient_id: str) -> Optional[paciente]:
+
+        fila = self.conexiones.obtener().execute(self._POR_ID, (patient_id,)).fetchone()
+        return self._a_paciente(fila) if fila else None
+
+    def buscar_todos(self) -> List[paciente]:
+
+        return [self._a_paciente(fila) for fila in self.conexiones.obtener().execute(self._TODOS)]
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[paciente], Optional[str]]:
+
+        filas = self.conexiones.obtener().execute(self._PAGINA, (cursor or "", limit + 1)).fetchall()
+        siguiente = filas[limit - 1][0] if len(filas) > limit else None
+        return [self._a_paciente(fila) for fila in filas[:limit]], siguiente
+
+    def buscar_texto(self, texto: str, limite: int) -> List[paciente]:
+
+        consulta = _consulta_texto(texto)
+        if consulta is None:
+            return []
+        filas = self.conexiones.obtener().execute(self._TEXTO, (consulta, limite))
+        return [self._a_paciente(fila) for fila in filas]
+
+    def version_de(self, patient_id: str) -> int:
+
+        fila = self.conexiones.obtener().execute(self._VERSION, (patient_id,)).fetchone()
+        return fila[0] if fila else 0
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return _leer_cambios(self.conexiones.obtener(), "pacientes")
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        conexion = self.conexiones.obtener()
+        return {"registros": conexion.execute(self._CONTAR).fetchone()[0],
+                "indice_texto_bytes": _bytes_indice_texto(conexion, "pacientes")}
+
+    def actualizar(self, patient: paciente) -> paciente:
+
+        return self.actualizar_lote([patient])[0]
+
+    def borrar(self, patient_id: str) -> bool:
+
+        return self.borrar_lote([patient_id])[0]
+
+    def guardar_lote(self, patients: List[paciente]) -> List[paciente]:
+
+        ahora = datetime.now()
+        for patient in patients:
+            if not patient.id:
+                patient.id = str(uuid.uuid4())
+            patient.fecha_creacion = ahora
+            # Si el id ya existía la base sube su versión y esta queda atrás:
+            # una escritura condicional con ella falla en lugar de pisar datos
+            patient.version = 1
+        conexion = self.conexiones.obtener()
+        with conexion:
+            conexion.executemany(self._INSERTAR, [self._fila(patient) for patient in patients])
+            if patients:
+                _anotar_cambio(conexion, "pacientes")
+        return patients
+
+    def actualizar_lote(self, patients: List[paciente]) -> List[Optional[paciente]]:
+
+        resultados = []
+        conexion = self.conexiones.obtener()
+        with conexion:
+            for patient in patients:
+                filas = conexion.execute(self._ACTUALIZAR + " RETURNING version",
+                                         (patient.nombre, patient.email, patient.id)).fetchall()
+                if filas:
+                    patient.version = filas[0][0]
+                resultados.append(patient if filas else None)
+            if any(resultados):
+                _anotar_cambio(conexion, "pacientes")
+        return resultados
+
+    def comparar_y_actualizar(self, esperado: paciente, nuevo: paciente) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, en una sola sentencia
+
+        Cada escritura sube la versión, así que basta con comparar la versión.
+        """
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        return self._actualizar_si(nuevo, esperado.version) is not None
+
+    def _actualizar_si(self, patient: paciente, version: int) -> Optional[int]:
+        conexion = self.conexiones.obtener()
+        with conexion:
+            filas = conexion.execute(self._ACTUALIZAR_SI, (patient.nombre, patient.email, patient.id,
+                                                           version)).fetchall()
+            if filas:
+                _anotar_cambio(conexion, "pacientes")
+        if not filas:
+            return None
+        patient.version = filas[0][0]
+        return patient.version
+
+    def actualizar_si_version(self, patient: paciente, version: int) -> Optional[paciente]:
+
+        if self._actualizar_si(patient, version) is not None:
+            return patient
+        fila = self.conexiones.obtener().execute(self._VERSION, (patient.id,)).fetchone()
+        if fila is None:
+            return None
+        raise ConflictoDeVersion(fila[0])
+
+    def borrar_lote(self, patient_ids: List[str]) -> List[bool]:
+
+        conexion = self.conexiones.obtener()
+        with conexion:
+            resultados = [conexion.execute(self._BORRAR, (patient_id,)).rowcount > 0 for patient_id in patient_ids]
+            if any(resultados):
+                _anotar_cambio(conexion, "pacientes")
+        return resultados
+
+
+class SqliteDoctorRepository(DoctorRepository):
+
+
+    _COLUMNAS = "id, nombre, especialidad, email, fecha_creacion, version"
+    _INSERTAR = (
+        "INSERT INTO doctores (id, nombre, especialidad, especialidad_clave, email, fecha_creacion) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET nombre = excluded.nombre, especialidad = excluded.especialidad, "
+        "especialidad_clave = excluded.especialidad_clave, email = excluded.email, "
+        "fecha_creacion = excluded.fecha_creacion, version = doctores.version + 1"
+    )
+    _POR_ID = f"SELECT {_COLUMNAS} FROM doctores WHERE id = ?"
+    _TODOS = f"SELECT {_COLUMNAS} FROM doctores ORDER BY rowid"
+    _PAGINA = f"SELECT {_COLUMNAS} FROM doctores WHERE id > ? ORDER BY id LIMIT ?"
+    _POR_ESPECIALIDAD = f"SELECT {_COLUMNAS} FROM doctores WHERE especialidad_clave = ? ORDER BY rowid"
+    _TEXTO = (
+        "SELECT d.id, d.nombre, d.especialidad, d.email, d.fecha_creacion, d.version FROM doctores_fts "
+        "JOIN doctores d ON d.rowid = doctores_fts.rowid "
+        "WHERE doctores_fts MATCH ? ORDER BY bm25(doctores_fts, 4.0, 1.0) LIMIT ?"
+    )
+    _ACTUALIZAR = (
+        "UPDATE doctores SET nombre = ?, especialidad = ?, especialidad_clave = ?, email = ?, "
+        "version = version + 1 WHERE id = ?"
+    )
+    _ACTUALIZAR_SI = _ACTUALIZAR + " AND version = ? RETURNING version"
+    _VERSION = "SELECT version FROM doctores WHERE id = ?"
+    _BORRAR = "DELETE FROM doctores WHERE id = ?"
+    _CONTAR = "SELECT count(*) FROM doctores"
+    # Recorre solo el índice de especialidad
+    _CONTAR_ESPECIALIDADES = "SELECT count(DISTINCT especialidad_clave) FROM doctores"
+
+    def __init__(self, ruta: str, conexiones: Optional[ConexionesPorHilo] = None):
+        self.conexiones = conexiones or ConexionesPorHilo(ruta)
+
+    @staticmethod
+    def _a_doctor(fila) -> Doctor:
+        return Doctor(id=fila[0], nombre=fila[1], especialidad=fila[2], email=fila[3],
+                      fecha_creacion=_fecha(fila[4]), version=fila[5])
+
+    @staticmethod
+    def _fila(doctor: Doctor) -> tuple:
+        return (doctor.id, doctor.nombre, doctor.especialidad, doctor.especialidad.casefold(),
+                doctor.email, _texto_fecha(doctor.fecha_creacion))
+
+    def guardar(self, doctor: Doctor) -> Doctor:
+
+        return self.guardar_lote([doctor])[0]
+
+    def buscar_por_id(self, doctor_id: str) -> Optional[Doctor]:
+
+        fila = self.conexiones.obtener().execute(self._POR_ID, (doctor_id,)).fetchone()
+        return self._a_doctor(fila) if fila else None
+
+    def buscar_todos(self) -> List[Doctor]:
+
+        return [self._a_doctor(fila) for fila in self.conexiones.obtener().execute(self._TODOS)]
+
+    def buscar_pagina(self, cursor: Optional[str], limit: int) -> Tuple[List[Doctor], Optional[str]]:
+
+        filas = self.conexiones.obtener().execute(self._PAGINA, (cursor or "", limit + 1)).fetchall()
+        siguiente = filas[limit - 1][0] if len(filas) > limit else None
+        return [self._a_doctor(fila) for fila in filas[:limit]], siguiente
+
+    def buscar_por_especialidad(self, especialidad: str) -> List[Doctor]:
+
+        filas = self.conexiones.obtener().execute(self._POR_ESPECIALIDAD, (especialidad.casefold(),))
+        return [self._a_doctor(fila) for fila in filas]
+
+    def buscar_texto(self, texto: str, limite: int) -> List[Doctor]:
+
+        consulta = _consulta_texto(texto)
+        if consulta is None:
+            return []
+        filas = self.conexiones.obtener().execute(self._TEXTO, (consulta, limite))
+        return [self._a_doctor(fila) for fila in filas]
+
+    def version_de(self, doctor_id: str) -> int:
+
+        fila = self.conexiones.obtener().execute(self._VERSION, (doctor_id,)).fetchone()
+        return fila[0] if fila else 0
+
+    def cambios_coleccion(self) -> Tuple[int, float]:
+
+        return _leer_cambios(self.conexiones.obtener(), "doctores")
+
+    def estadisticas(self) -> Dict[str, int]:
+
+        conexion = self.conexiones.obtener()
+        return {"registros": conexion.execute(self._CONTAR).fetchone()[0],
+                "indice_especialidades": conexion.execute(self._CONTAR_ESPECIALIDADES).fetchone()[0],
+                "indice_texto_bytes": _bytes_indice_texto(conexion, "doctores")}
+
+    def actualizar(self, doctor: Doctor) -> Doctor:
+
+        return self.actualizar_lote([doctor])[0]
+
+    def borrar(self, doctor_id: str) -> bool:
+
+        return self.borrar_lote([doctor_id])[0]
+
+    def guardar_lote(self, doctors: List[Doctor]) -> List[Doctor]:
+
+        ahora = datetime.now()
+        for doctor in doctors:
+            if not doctor.id:
+                doctor.id = str(uuid.uuid4())
+            doctor.fecha_creacion = ahora
+            # Ver SqlitePatientRepository.guardar_lote
+            doctor.version = 1
+        conexion = self.conexiones.obtener()
+        with conexion:
+            conexion.executemany(self._INSERTAR, [self._fila(doctor) for doctor in doctors])
+            if doctors:
+                _anotar_cambio(conexion, "doctores")
+        return doctors
+
+    def actualizar_lote(self, doctors: List[Doctor]) -> List[Optional[Doctor]]:
+
+        resultados = []
+        conexion = self.conexiones.obtener()
+        with conexion:
+            for doctor in doctors:
+                filas = conexion.execute(self._ACTUALIZAR + " RETURNING version", (
+                    doctor.nombre, doctor.especialidad, doctor.especialidad.casefold(), doctor.email, doctor.id
+                )).fetchall()
+                if filas:
+                    doctor.version = filas[0][0]
+                resultados.append(doctor if filas else None)
+            if any(resultados):
+                _anotar_cambio(conexion, "doctores")
+        return resultados
+
+    def comparar_y_actualizar(self, esperado: Doctor, nuevo: Doctor) -> bool:
+        """Sustituye el registro por `nuevo` solo si sigue igual a `esperado`, en una sola sentencia
+
+        Cada escritura sube la versión, así que basta con comparar la versión.
+        """
+        if nuevo.id != esperado.id:
+            raise ValueError("Los ids de `esperado` y `nuevo` deben coincidir")
+        return self._actualizar_si(nuevo, esperado.version) is not None
+
+    def _actualizar_si(self, doctor: Doctor, version: int) -> Optional[int]:
+        conexion = self.conexiones.obtener()
+        with conexion:
+            filas = conexion.execute(self._ACTUALIZAR_SI, (
+                doctor.nombre, doctor.especialidad, doctor.especialidad.casefold(), doctor.email, doctor.id,
+                version
+            )).fetchall()
+            if filas:
+                _anotar_cambio(conexion, "doctores")
+        if not filas:
+            return None
+        doctor.version = filas[0][0]
+        return doctor.version
+
+    def actualizar_si_version(self, doctor: Doctor, version: int) -> Optional[Doctor]:
+
+        if self._actualizar_si(doctor, version) is not None:
+            return doctor
+        fila = self.conexiones.obtener().execute(self._VERSION, (doctor.id,)).fetchone()
+        if fila is None:
+            return None
+        raise ConflictoDeVersion(fila[0])
+
+    def borrar_lote(self, doctor_ids: List[str]) -> List[bool]:
+
+        conexion = self.conexiones.obtener()
+        with conexion:
+            resultados = [conexion.execute(self._BORRAR, (doctor_id,)).rowcount > 0 for doctor_id in doctor_ids]
+            if any(resultados):
+                _anotar_cambio(conexion, "doctores")
+        return resultados
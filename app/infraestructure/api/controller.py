@@ -1,10 +1,181 @@
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from app.application.services.patient_service import PatientService
-from app.application.services.doctor_service import DoctorService
+import math
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+from time import time as reloj
+from email_validator import EmailNotValidError, validate_email
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import AfterValidator, BaseModel, EmailStr, Field
+from pydantic.networks import validate_email as validar_email_completo
+from typing import Annotated, Awaitable, Callable, Optional, List, Tuple
+from app.domain.core.models import CitaSolapada, ConflictoDeVersion
+from app.application.ports.cache_respuestas import Entrada
+from app.application.ports.async_repository import AlmacenamientoSaturado, TiempoAgotado
+from app.application.services.patient_service import AsyncPatientService
+from app.application.services.doctor_service import AsyncDoctorService, ETIQUETA_LISTADO, etiqueta_especialidad
+from app.application.services.cita_service import APERTURA, CIERRE, CitaService
+from app.infraestructure.api.compresion import (
+    NIVEL_CACHE,
+    UMBRAL_POR_DEFECTO,
+    comprimir_sin_bloquear,
+    elegir_codificacion,
+    etag_debil
+)
+from app.infraestructure.api.serializacion import (
+    RespuestaJSON,
+    paciente_json,
+    pacientes_json,
+    doctor_json,
+    doctores_json,
+    cita_json,
+    citas_json,
+    pacientes_json_por_trozos,
+    doctores_json_por_trozos,
+    ndjson_por_lotes
+)
 
 
+LIMITE_PAGINA_POR_DEFECTO = 100
+LIMITE_PAGINA_MAXIMO = 1000
+# Segundos que se sugieren en Retry-After cuando el almacenamiento está saturado
+SEGUNDOS_REINTENTO = 1
+CABECERA_SIGUIENTE_CURSOR = "X-Siguiente-Cursor"
+CABECERA_ETAG = "ETag"
+CABECERA_ULTIMA_MODIFICACION = "Last-Modified"
+TAMANO_LOTE_EXPORTACION = 1000
+TAMANO_LOTE_MAXIMO = 10000
+LIMITE_BUSQUEDA_POR_DEFECTO = 20
+LIMITE_BUSQUEDA_MAXIMO = 100
+DURACION_HUECO_POR_DEFECTO = 30
+HUECOS_POR_DEFECTO = 10
+HUECOS_MAXIMO = 200
+
+
+def _fecha_iso(fecha) -> Optional[str]:
+    return fecha.isoformat() if fecha else None
+
+
+# Parte local ASCII sin comillas (dot-atom, RFC 5322): email-validator la
+# acepta tal cual, sin normalizarla
+_LOCAL_SIMPLE = re.compile(r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*")
+_LOCAL_MAXIMO = 64
+_EMAIL_MAXIMO = 254
+
+
+@lru_cache(maxsize=4096)
+def _dominio_normalizado(dominio: str) -> Optional[Tuple[str, str]]:
+    # La validación IDNA del dominio es lo caro; en un lote casi todos comparten dominio
+    try:
+        validado = validate_email(f"postmaster@{dominio}", check_deliverability=False)
+    except EmailNotValidError:
+        return None
+    return validado.domain, validado.ascii_domain
+
+
+def _validar_email_lote(valor: str) -> str:
+    # Solo el caso común va por el atajo; el resto (comillas, nombre visible,
+    # saltos de línea, parte local no ASCII, direcciones largas o inválidas)
+    # pasa por el validador de EmailStr, con sus mismos errores
+    if "\r" not in valor and "\n" not in valor:
+        local, arroba, dominio = valor.strip().rpartition("@")
+        if arroba and len(local) <= _LOCAL_MAXIMO and _LOCAL_SIMPLE.fullmatch(local):
+            normalizado = _dominio_normalizado(dominio)
+            if normalizado is not None and len(local) + 1 + len(normalizado[1]) <= _EMAIL_MAXIMO:
+                return f"{local}@{normalizado[0]}"
+    return validar_email_completo(valor)[1]
+
+
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _modificado_fiable(modificado: float) -> Optional[float]:
+    # Last-Modified solo tiene segundos: mientras no termine el segundo de la
+    # última escritura, otra en ese mismo segundo no lo cambiaría y
+    # If-Modified-Since daría un 304 con datos viejos. Hasta entonces solo
+    # vale el ETag. Se comprueba al leer los cambios, antes que los datos
+    return modificado if modificado < math.floor(reloj()) else None
+
+
+def _validadores(etiqueta: int, modificado: Optional[float]) -> dict:
+    if modificado is None:
+        return {CABECERA_ETAG: _etag(etiqueta)}
+    return {CABECERA_ETAG: _etag(etiqueta), CABECERA_ULTIMA_MODIFICACION: formatdate(modificado, usegmt=True)}
+
+
+def _no_modificado(cabeceras: dict, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """If-None-Match (comparación débil) o, si no viene, If-Modified-Since"""
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        etag = cabeceras[CABECERA_ETAG]
+        return any(etiqueta.strip().removeprefix("W/") == etag for etiqueta in if_none_match.split(","))
+    if if_modified_since is None or CABECERA_ULTIMA_MODIFICACION not in cabeceras:
+        return False
+    try:
+        fecha = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(cabeceras[CABECERA_ULTIMA_MODIFICACION]) <= fecha
+
+
+def _respuesta_no_modificado(cabeceras: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+
+
+def _precondicion_fallida(version_actual: int) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
+                         detail="El registro cambió desde que se leyó",
+                         headers={CABECERA_ETAG: _etag(version_actual)})
+
+
+async def _almacenamiento_saturado(_request, exc: AlmacenamientoSaturado) -> JSONResponse:
+    return JSONResponse({"detail": f"Almacenamiento saturado: {exc}"},
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={"Retry-After": str(SEGUNDOS_REINTENTO)})
+
+
+async def _tiempo_agotado(_request, exc: TiempoAgotado) -> JSONResponse:
+    return JSONResponse({"detail": str(exc)}, status_code=status.HTTP_504_GATEWAY_TIMEOUT)
+
+
+# Para FastAPI.add_exception_handler: rechazos del EjecutorAcotado del almacenamiento
+MANEJADORES_ALMACENAMIENTO = {
+    AlmacenamientoSaturado: _almacenamiento_saturado,
+    TiempoAgotado: _tiempo_agotado,
+}
+
+
+async def _version_if_match(if_match: Optional[str], buscar: Callable[[], Awaitable[object]],
+                            no_encontrado: str) -> Optional[int]:
+    """Versión que exige la cabecera If-Match; None si la escritura es incondicional"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versiones = set()
+    for etiqueta in if_match.split(","):
+        etiqueta = etiqueta.strip()
+        # If-Match compara en modo fuerte: las etiquetas débiles (W/) nunca coinciden
+        if len(etiqueta) > 2 and etiqueta[0] == etiqueta[-1] == '"' and etiqueta[1:-1].isdigit():
+            versiones.add(int(etiqueta[1:-1]))
+    if len(versiones) == 1:
+        return versiones.pop()
+    # Varias etiquetas (o ninguna válida): vale la versión actual si está entre ellas
+    actual = await buscar()
+    if actual is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=no_encontrado)
+    if actual.version not in versiones:
+        raise _precondicion_fallida(actual.version)
+    return actual.version
+
+
+# Mismas reglas y errores que EmailStr (tests/test_email_lote.py), validando
+# cada dominio distinto una sola vez por proceso
+EmailLote = Annotated[str, AfterValidator(_validar_email_lote)]
+
 
 class PatientRequest(BaseModel):
     nombre: str
@@ -16,6 +187,7 @@ class PatientResponse(BaseModel):
     nombre: str
     email: str
     fecha_creacion: Optional[str] = None
+    version: int = 0
 
     class Config:
         from_attributes = True
@@ -34,15 +206,99 @@ class DoctorResponse(BaseModel):
     email: Optional[str] = None
     
     fecha_creacion: Optional[str] = None
+    version: int = 0
 
     class Config:
         from_attributes = True
 
 
+class PatientBatchItem(PatientRequest):
+    email: EmailLote
+
+
+class DoctorBatchItem(DoctorRequest):
+    email: Optional[EmailLote] = None
+
+
+class PatientBatchUpdate(PatientBatchItem):
+    id: str
+
+
+class DoctorBatchUpdate(DoctorBatchItem):
+    id: str
+
+
+class CitaRequest(BaseModel):
+    doctor_id: str
+    paciente_id: str
+    inicio: datetime
+    fin: datetime
+    motivo: str = ""
+
+
+class CitaUpdate(BaseModel):
+    inicio: Optional[datetime] = None
+    fin: Optional[datetime] = None
+    motivo: Optional[str] = None
+
+
+class HuecoResponse(BaseModel):
+    inicio: datetime
+    fin: datetime
+
+
+class HuecoDoctorResponse(BaseModel):
+    doctor_id: str
+    doctor_nombre: str
+    inicio: datetime
+    fin: datetime
+
+
+class BatchDeleteRequest(BaseModel):
+    ids: Annotated[List[str], Field(max_length=TAMANO_LOTE_MAXIMO)]
+
+
+class PatientBatchResult(BaseModel):
+    status: int
+    paciente: Optional[PatientResponse] = None
+    error: Optional[str] = None
+
+
+class DoctorBatchResult(BaseModel):
+    status: int
+    doctor: Optional[DoctorResponse] = None
+    error: Optional[str] = None
+
+
+class BatchDeleteResult(BaseModel):
+    id: str
+    status: int
+    error: Optional[str] = None
+
+
+def _hora_local(fecha: Optional[datetime]) -> Optional[datetime]:
+    # El dominio guarda horas locales sin zona; una hora con zona se pasa a la local
+    if fecha is None or fecha.tzinfo is None:
+        return fecha
+    return fecha.astimezone().replace(tzinfo=None)
+
+
+def _cita_solapada(e: CitaSolapada) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+def _resultados_borrado(ids: List[str], borrados: List[bool], mensaje: str) -> List[BatchDeleteResult]:
+    return [
+        BatchDeleteResult(id=item_id, status=status.HTTP_200_OK) if borrado
+        else BatchDeleteResult(id=item_id, status=status.HTTP_404_NOT_FOUND, error=mensaje)
+        for item_id, borrado in zip(ids, borrados)
+    ]
+
+
 class PatientController:
    
 
-    def __init__(self, patient_service: PatientService):
+    def __init__(self, patient_service: AsyncPatientService):
         self.patient_service = patient_service
         self.router = APIRouter(prefix="/pacientes", tags=["Pacientes"])
         self._setup_routes()
@@ -50,6 +306,11 @@ class PatientController:
     def _setup_routes(self):
         
         self.router.add_api_route("/", self.registrar_paciente, methods=["POST"])
+        self.router.add_api_route("/batch", self.registrar_pacientes, methods=["POST"])
+        self.router.add_api_route("/batch", self.actualizar_pacientes, methods=["PUT"])
+        self.router.add_api_route("/batch", self.eliminar_pacientes, methods=["DELETE"])
+        self.router.add_api_route("/export", self.exportar_pacientes, methods=["GET"])
+        self.router.add_api_route("/buscar", self.buscar_pacientes, methods=["GET"])
         self.router.add_api_route("/{patient_id}", self.obtener_paciente, methods=["GET"])
         self.router.add_api_route("/", self.listar_pacientes, methods=["GET"])
         self.router.add_api_route("/{patient_id}", self.actualizar_paciente, methods=["PUT"])
@@ -58,75 +319,138 @@ class PatientController:
     async def registrar_paciente(self, patient_data: PatientRequest) -> PatientResponse:
         
         try:
-            patient = self.patient_service.registrar_paciente(
+            patient = await self.patient_service.registrar_paciente(
                 nombre=patient_data.nombre,
                 email=patient_data.email
             )
-            return PatientResponse(
-                id=patient.id,
-                nombre=patient.nombre,
-                email=patient.email,
-                fecha_creacion=patient.fecha_creacion.isoformat() if patient.fecha_creacion else None
-            )
+            return RespuestaJSON(paciente_json(patient), headers={CABECERA_ETAG: _etag(patient.version)})
         except ValueError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    async def obtener_paciente(self, patient_id: str) -> PatientResponse:
-        
-        patient = self.patient_service.obtener_paciente(patient_id)
+    async def obtener_paciente(self, patient_id: str, if_none_match: Optional[str] = Header(None),
+                               if_modified_since: Optional[str] = Header(None)) -> PatientResponse:
+        """ETag es la versión del paciente; Last-Modified, la última escritura en la colección"""
+        modificado = _modificado_fiable((await self.patient_service.cambios_pacientes())[1])
+        if if_none_match is not None or if_modified_since is not None:
+            version = await self.patient_service.version_paciente(patient_id)
+            cabeceras = _validadores(version, modificado)
+            if version and _no_modificado(cabeceras, if_none_match, if_modified_since):
+                return _respuesta_no_modificado(cabeceras)
+        patient = await self.patient_service.obtener_paciente(patient_id)
         if not patient:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente no encontrado")
         
-        return PatientResponse(
-            id=patient.id,
-            nombre=patient.nombre,
-            email=patient.email,
-            telefono=patient.telefono,
-            fecha_creacion=patient.fecha_creacion.isoformat() if patient.fecha_creacion else None
-        )
+        return RespuestaJSON(paciente_json(patient), headers=_validadores(patient.version, modificado))
 
-    async def listar_pacientes(self) -> List[PatientResponse]:
-       
-        patients = self.patient_service.listar_pacientes()
-        return [
-            PatientResponse(
-                id=p.id,
-                nombre=p.nombre,
-                email=p.email,
-                fecha_creacion=p.fecha_creacion.isoformat() if p.fecha_creacion else None
-            )
-            for p in patients
-        ]
+    async def listar_pacientes(self,
+                               limit: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO),
+                               cursor: Optional[str] = None,
+                               if_none_match: Optional[str] = Header(None),
+                               if_modified_since: Optional[str] = Header(None)) -> List[PatientResponse]:
+        """ETag es el contador de escrituras de la colección, leído antes que los datos"""
+        contador, modificado = await self.patient_service.cambios_pacientes()
+        cabeceras = _validadores(contador, _modificado_fiable(modificado))
+        if _no_modificado(cabeceras, if_none_match, if_modified_since):
+            return _respuesta_no_modificado(cabeceras)
+        if limit is None and cursor is None:
+            patients = await self.patient_service.listar_pacientes()
+        else:
+            try:
+                patients, siguiente = await self.patient_service.listar_pacientes_pagina(
+                    cursor, limit or LIMITE_PAGINA_POR_DEFECTO
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            if siguiente:
+                cabeceras[CABECERA_SIGUIENTE_CURSOR] = siguiente
+        return RespuestaJSON(await pacientes_json_por_trozos(patients), headers=cabeceras)
 
-    async def actualizar_paciente(self, patient_id: str, patient_data: PatientRequest) -> PatientResponse:
-       
-        patient = self.patient_service.actualizar_paciente(
-            patient_id=patient_id,
-            nombre=patient_data.nombre,
-            email=patient_data.email
-        )
+    async def exportar_pacientes(self) -> StreamingResponse:
+
+        lotes = self.patient_service.exportar_pacientes(TAMANO_LOTE_EXPORTACION)
+        return StreamingResponse(ndjson_por_lotes(lotes, paciente_json), media_type="application/x-ndjson")
+
+    async def buscar_pacientes(self, q: str = Query(..., min_length=1, max_length=200),
+                               limite: int = Query(LIMITE_BUSQUEDA_POR_DEFECTO, ge=1,
+                                                   le=LIMITE_BUSQUEDA_MAXIMO),
+                               if_none_match: Optional[str] = Header(None),
+                               if_modified_since: Optional[str] = Header(None)) -> List[PatientResponse]:
+
+        contador, modificado = await self.patient_service.cambios_pacientes()
+        cabeceras = _validadores(contador, _modificado_fiable(modificado))
+        if _no_modificado(cabeceras, if_none_match, if_modified_since):
+            return _respuesta_no_modificado(cabeceras)
+        return RespuestaJSON(pacientes_json(await self.patient_service.buscar_pacientes(q, limite)), headers=cabeceras)
+
+    @staticmethod
+    def _a_dict(p) -> dict:
+        return {
+            "id": p.id,
+            "nombre": p.nombre,
+            "email": p.email,
+            "fecha_creacion": _fecha_iso(p.fecha_creacion),
+            "version": p.version
+        }
+
+    async def actualizar_paciente(self, patient_id: str, patient_data: PatientRequest,
+                                  if_match: Optional[str] = Header(None)) -> PatientResponse:
+        """Con If-Match solo se aplica sobre esa versión; si no, 412 con el ETag actual"""
+        version = await _version_if_match(if_match, lambda: self.patient_service.obtener_paciente(patient_id),
+                                          "Paciente no encontrado")
+        try:
+            patient = await self.patient_service.actualizar_paciente(
+                patient_id=patient_id,
+                nombre=patient_data.nombre,
+                email=patient_data.email,
+                version=version
+            )
+        except ConflictoDeVersion as e:
+            raise _precondicion_fallida(e.version_actual)
         if not patient:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente no encontrado")
         
-        return PatientResponse(
-            id=patient.id,
-            nombre=patient.nombre,
-            email=patient.email,
-            telefono=patient.telefono,
-            fecha_creacion=patient.fecha_creacion.isoformat() if patient.fecha_creacion else None
-        )
+        return RespuestaJSON(paciente_json(patient), headers={CABECERA_ETAG: _etag(patient.version)})
 
     async def eliminar_paciente(self, patient_id: str) -> dict:
         
-        if not self.patient_service.eliminar_paciente(patient_id):
+        if not await self.patient_service.eliminar_paciente(patient_id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente no encontrado")
         return {"mensaje": "Paciente eliminado exitosamente"}
 
+    async def registrar_pacientes(
+        self, patients_data: Annotated[List[PatientBatchItem], Field(max_length=TAMANO_LOTE_MAXIMO)]
+    ) -> List[PatientBatchResult]:
+
+        resultados = await self.patient_service.registrar_pacientes([p.model_dump() for p in patients_data])
+        return [
+            PatientBatchResult(status=status.HTTP_400_BAD_REQUEST, error=str(r)) if isinstance(r, ValueError)
+            else PatientBatchResult(status=status.HTTP_201_CREATED, paciente=PatientResponse(**self._a_dict(r)))
+            for r in resultados
+        ]
+
+    async def actualizar_pacientes(
+        self, patients_data: Annotated[List[PatientBatchUpdate], Field(max_length=TAMANO_LOTE_MAXIMO)]
+    ) -> List[PatientBatchResult]:
+
+        resultados = await self.patient_service.actualizar_pacientes([
+            {"patient_id": p.id, "nombre": p.nombre, "email": p.email} for p in patients_data
+        ])
+        return [
+            PatientBatchResult(status=status.HTTP_200_OK, paciente=PatientResponse(**self._a_dict(r))) if r
+            else PatientBatchResult(status=status.HTTP_404_NOT_FOUND, error="Paciente no encontrado")
+            for r in resultados
+        ]
+
+    async def eliminar_pacientes(self, batch: BatchDeleteRequest) -> List[BatchDeleteResult]:
+
+        borrados = await self.patient_service.eliminar_pacientes(batch.ids)
+        return _resultados_borrado(batch.ids, borrados, "Paciente no encontrado")
+
 
 class DoctorController:
    
 
-    def __init__(self, doctor_service: DoctorService):
+    def __init__(self, doctor_service: AsyncDoctorService):
         self.doctor_service = doctor_service
         self.router = APIRouter(prefix="/doctores", tags=["Doctores"])
         self._setup_routes()
@@ -134,6 +458,12 @@ class DoctorController:
     def _setup_routes(self):
         
         self.router.add_api_route("/", self.registrar_doctor, methods=["POST"])
+        self.router.add_api_route("/batch", self.registrar_doctores, methods=["POST"])
+        self.router.add_api_route("/batch", self.actualizar_doctores, methods=["PUT"])
+        self.router.add_api_route("/batch", self.eliminar_doctores, methods=["DELETE"])
+        self.router.add_api_route("/export", self.exportar_doctores, methods=["GET"])
+        self.router.add_api_route("/buscar", self.buscar_doctores, methods=["GET"])
+        self.router.add_api_route("/cache", self.estadisticas_cache, methods=["GET"])
         self.router.add_api_route("/{doctor_id}", self.obtener_doctor, methods=["GET"])
         self.router.add_api_route("/", self.listar_doctores, methods=["GET"])
         self.router.add_api_route("/especialidad/{especialidad}", self.buscar_por_especialidad, methods=["GET"])
@@ -143,84 +473,300 @@ class DoctorController:
     async def registrar_doctor(self, doctor_data: DoctorRequest) -> DoctorResponse:
        
         try:
-            doctor = self.doctor_service.registrar_doctor(
+            doctor = await self.doctor_service.registrar_doctor(
                 nombre=doctor_data.nombre,
                 especialidad=doctor_data.especialidad,
                 email=doctor_data.email
             )
-            return DoctorResponse(
-                id=doctor.id,
-                nombre=doctor.nombre,
-                especialidad=doctor.especialidad,
-                email=doctor.email,
-                fecha_creacion=doctor.fecha_creacion.isoformat() if doctor.fecha_creacion else None
-            )
+            return RespuestaJSON(doctor_json(doctor), headers={CABECERA_ETAG: _etag(doctor.version)})
         except ValueError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    async def obtener_doctor(self, doctor_id: str) -> DoctorResponse:
-        
-        doctor = self.doctor_service.obtener_doctor(doctor_id)
+    async def obtener_doctor(self, doctor_id: str, if_none_match: Optional[str] = Header(None),
+                             if_modified_since: Optional[str] = Header(None)) -> DoctorResponse:
+        """ETag es la versión del doctor; Last-Modified, la última escritura en la colección"""
+        modificado = _modificado_fiable((await self.doctor_service.cambios_doctores())[1])
+        if if_none_match is not None or if_modified_since is not None:
+            version = await self.doctor_service.version_doctor(doctor_id)
+            cabeceras = _validadores(version, modificado)
+            if version and _no_modificado(cabeceras, if_none_match, if_modified_since):
+                return _respuesta_no_modificado(cabeceras)
+        doctor = await self.doctor_service.obtener_doctor(doctor_id)
         if not doctor:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor no encontrado")
         
-        return DoctorResponse(
-            id=doctor.id,
-            nombre=doctor.nombre,
-            especialidad=doctor.especialidad,
-            email=doctor.email,
-            fecha_creacion=doctor.fecha_creacion.isoformat() if doctor.fecha_creacion else None
-        )
+        return RespuestaJSON(doctor_json(doctor), headers=_validadores(doctor.version, modificado))
 
-    async def listar_doctores(self) -> List[DoctorResponse]:
-        
-        doctors = self.doctor_service.listar_doctores()
-        return [
-            DoctorResponse(
-                id=d.id,
-                nombre=d.nombre,
-                especialidad=d.especialidad,
-                email=d.email,
-                fecha_creacion=d.fecha_creacion.isoformat() if d.fecha_creacion else None
-            )
-            for d in doctors
-        ]
+    async def _cacheada(self, clave: tuple, contador: int, etiquetas: tuple,
+                        construir: Callable[[], Awaitable[Entrada]], accept_encoding: Optional[str]) -> Entrada:
+        # `contador` se leyó antes que los datos que usa `construir` y es el
+        # ETag de la respuesta. La forma comprimida se guarda junto a la
+        # original, con la misma etiqueta de caché y el ETag débil, y el
+        # middleware de compresión deja pasar la respuesta tal cual
+        cache = self.doctor_service.cache
+        if cache is None:
+            return await construir()
+        codificacion = elegir_codificacion(accept_encoding)
+        if codificacion is not None:
+            comprimida = cache.obtener(clave + (codificacion,), contador)
+            if comprimida is not None:
+                return comprimida
+        entrada = cache.obtener(clave, contador)
+        if entrada is None:
+            entrada = await construir()
+            cache.guardar(clave, entrada, etiquetas, contador)
+        cuerpo, propias = entrada
+        if codificacion is None or len(cuerpo) < UMBRAL_POR_DEFECTO:
+            return entrada
+        comprimida = (await comprimir_sin_bloquear(cuerpo, codificacion, NIVEL_CACHE),
+                      {**propias, "Content-Encoding": codificacion, "Vary": "Accept-Encoding",
+                       CABECERA_ETAG: etag_debil(_etag(contador))})
+        cache.guardar(clave + (codificacion,), comprimida, etiquetas, contador)
+        return comprimida
+
+    async def listar_doctores(self,
+                              limit: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO),
+                              cursor: Optional[str] = None,
+                              if_none_match: Optional[str] = Header(None),
+                              if_modified_since: Optional[str] = Header(None),
+                              accept_encoding: Optional[str] = Header(None)) -> List[DoctorResponse]:
+        """ETag es el contador de escrituras de la colección, leído antes que los datos"""
+        contador, modificado = await self.doctor_service.cambios_doctores()
+        cabeceras = _validadores(contador, _modificado_fiable(modificado))
+        if _no_modificado(cabeceras, if_none_match, if_modified_since):
+            return _respuesta_no_modificado(cabeceras)
+        if limit is None and cursor is None:
+            clave = ("listado", None, None)
+        else:
+            clave = ("listado", limit or LIMITE_PAGINA_POR_DEFECTO, cursor)
+
+        async def construir() -> Entrada:
+            if clave[1] is None:
+                return await doctores_json_por_trozos(await self.doctor_service.listar_doctores()), {}
+            try:
+                doctors, siguiente = await self.doctor_service.listar_doctores_pagina(cursor, clave[1])
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            return doctores_json(doctors), {CABECERA_SIGUIENTE_CURSOR: siguiente} if siguiente else {}
+
+        cuerpo, propias = await self._cacheada(clave, contador, (ETIQUETA_LISTADO,), construir, accept_encoding)
+        return RespuestaJSON(cuerpo, headers={**cabeceras, **propias})
+
+    async def exportar_doctores(self) -> StreamingResponse:
 
-    async def buscar_por_especialidad(self, especialidad: str) -> List[DoctorResponse]:
+        lotes = self.doctor_service.exportar_doctores(TAMANO_LOTE_EXPORTACION)
+        return StreamingResponse(ndjson_por_lotes(lotes, doctor_json), media_type="application/x-ndjson")
+
+    @staticmethod
+    def _a_dict(d) -> dict:
+        return {
+            "id": d.id,
+            "nombre": d.nombre,
+            "especialidad": d.especialidad,
+            "email": d.email,
+            "fecha_creacion": _fecha_iso(d.fecha_creacion),
+            "version": d.version
+        }
+
+    async def buscar_doctores(self, q: str = Query(..., min_length=1, max_length=200),
+                              limite: int = Query(LIMITE_BUSQUEDA_POR_DEFECTO, ge=1,
+                                                  le=LIMITE_BUSQUEDA_MAXIMO),
+                              if_none_match: Optional[str] = Header(None),
+                              if_modified_since: Optional[str] = Header(None)) -> List[DoctorResponse]:
+
+        contador, modificado = await self.doctor_service.cambios_doctores()
+        cabeceras = _validadores(contador, _modificado_fiable(modificado))
+        if _no_modificado(cabeceras, if_none_match, if_modified_since):
+            return _respuesta_no_modificado(cabeceras)
+        return RespuestaJSON(doctores_json(await self.doctor_service.buscar_doctores(q, limite)), headers=cabeceras)
+
+    async def buscar_por_especialidad(self, especialidad: str, if_none_match: Optional[str] = Header(None),
+                                      if_modified_since: Optional[str] = Header(None),
+                                      accept_encoding: Optional[str] = Header(None)) -> List[DoctorResponse]:
        
-        doctors = self.doctor_service.buscar_por_especialidad(especialidad)
-        return [
-            DoctorResponse(
-                id=d.id,
-                nombre=d.nombre,
-                especialidad=d.especialidad,
-                email=d.email,
-                fecha_creacion=d.fecha_creacion.isoformat() if d.fecha_creacion else None
-            )
-            for d in doctors
-        ]
+        contador, modificado = await self.doctor_service.cambios_doctores()
+        cabeceras = _validadores(contador, _modificado_fiable(modificado))
+        if _no_modificado(cabeceras, if_none_match, if_modified_since):
+            return _respuesta_no_modificado(cabeceras)
 
-    async def actualizar_doctor(self, doctor_id: str, doctor_data: DoctorRequest) -> DoctorResponse:
-        
-        doctor = self.doctor_service.actualizar_doctor(
-            doctor_id=doctor_id,
-            nombre=doctor_data.nombre,
-            especialidad=doctor_data.especialidad,
-            email=doctor_data.email
+        async def construir() -> Entrada:
+            return await doctores_json_por_trozos(await self.doctor_service.buscar_por_especialidad(especialidad)), {}
+
+        cuerpo, propias = await self._cacheada(
+            ("especialidad", especialidad.casefold()), contador, (etiqueta_especialidad(especialidad),),
+            construir, accept_encoding
         )
+        return RespuestaJSON(cuerpo, headers={**cabeceras, **propias})
+
+    async def estadisticas_cache(self) -> dict:
+        """Contadores de la caché de respuestas; vacío si está desactivada"""
+        cache = self.doctor_service.cache
+        return cache.estadisticas() if cache is not None else {}
+
+    async def actualizar_doctor(self, doctor_id: str, doctor_data: DoctorRequest,
+                                if_match: Optional[str] = Header(None)) -> DoctorResponse:
+        """Con If-Match solo se aplica sobre esa versión; si no, 412 con el ETag actual"""
+        version = await _version_if_match(if_match, lambda: self.doctor_service.obtener_doctor(doctor_id),
+                                          "Doctor no encontrado")
+        try:
+            doctor = await self.doctor_service.actualizar_doctor(
+                doctor_id=doctor_id,
+                nombre=doctor_data.nombre,
+                especialidad=doctor_data.especialidad,
+                email=doctor_data.email,
+                version=version
+            )
+        except ConflictoDeVersion as e:
+            raise _precondicion_fallida(e.version_actual)
         if not doctor:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor no encontrado")
         
-        return DoctorResponse(
-            id=doctor.id,
-            nombre=doctor.nombre,
-            especialidad=doctor.especialidad,
-            email=doctor.email,
-            fecha_creacion=doctor.fecha_creacion.isoformat() if doctor.fecha_creacion else None
-        )
+        return RespuestaJSON(doctor_json(doctor), headers={CABECERA_ETAG: _etag(doctor.version)})
 
     async def eliminar_doctor(self, doctor_id: str) -> dict:
       
-        if not self.doctor_service.eliminar_doctor(doctor_id):
+        if not await self.doctor_service.eliminar_doctor(doctor_id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor no encontrado")
         return {"mensaje": "Doctor eliminado exitosamente"}
+
+    async def registrar_doctores(
+        self, doctors_data: Annotated[List[DoctorBatchItem], Field(max_length=TAMANO_LOTE_MAXIMO)]
+    ) -> List[DoctorBatchResult]:
+
+        resultados = await self.doctor_service.registrar_doctores([d.model_dump() for d in doctors_data])
+        return [
+            DoctorBatchResult(status=status.HTTP_400_BAD_REQUEST, error=str(r)) if isinstance(r, ValueError)
+            else DoctorBatchResult(status=status.HTTP_201_CREATED, doctor=DoctorResponse(**self._a_dict(r)))
+            for r in resultados
+        ]
+
+    async def actualizar_doctores(
+        self, doctors_data: Annotated[List[DoctorBatchUpdate], Field(max_length=TAMANO_LOTE_MAXIMO)]
+    ) -> List[DoctorBatchResult]:
+
+        resultados = await self.doctor_service.actualizar_doctores([
+            {"doctor_id": d.id, "nombre": d.nombre, "especialidad": d.especialidad, "email": d.email}
+            for d in doctors_data
+        ])
+        return [
+            DoctorBatchResult(status=status.HTTP_200_OK, doctor=DoctorResponse(**self._a_dict(r))) if r
+            else DoctorBatchResult(status=status.HTTP_404_NOT_FOUND, error="Doctor no encontrado")
+            for r in resultados
+        ]
+
+    async def eliminar_doctores(self, batch: BatchDeleteRequest) -> List[BatchDeleteResult]:
+
+        borrados = await self.doctor_service.eliminar_doctores(batch.ids)
+        return _resultados_borrado(batch.ids, borrados, "Doctor no encontrado")
+
+
+class CitaController:
+
+
+    def __init__(self, cita_service: CitaService):
+        self.cita_service = cita_service
+        self.router = APIRouter(prefix="/citas", tags=["Citas"])
+        self._setup_routes()
+
+    def _setup_routes(self):
+
+        self.router.add_api_route("/", self.agendar_cita, methods=["POST"])
+        self.router.add_api_route("/doctor/{doctor_id}", self.citas_doctor, methods=["GET"])
+        self.router.add_api_route("/doctor/{doctor_id}/libres", self.huecos_libres, methods=["GET"],
+                                  response_model=List[HuecoResponse])
+        self.router.add_api_route("/especialidad/{especialidad}/libres", self.proximos_huecos, methods=["GET"],
+                                  response_model=List[HuecoDoctorResponse])
+        self.router.add_api_route("/paciente/{paciente_id}", self.citas_paciente, methods=["GET"])
+        self.router.add_api_route("/{cita_id}", self.obtener_cita, methods=["GET"])
+        self.router.add_api_route("/{cita_id}", self.reprogramar_cita, methods=["PUT"])
+        self.router.add_api_route("/{cita_id}", self.cancelar_cita, methods=["DELETE"])
+
+    async def agendar_cita(self, cita_data: CitaRequest):
+        """409 si el doctor ya tiene una cita que se cruza con el horario pedido"""
+        try:
+            cita = await self.cita_service.agendar_cita(
+                doctor_id=cita_data.doctor_id,
+                paciente_id=cita_data.paciente_id,
+                inicio=_hora_local(cita_data.inicio),
+                fin=_hora_local(cita_data.fin),
+                motivo=cita_data.motivo
+            )
+        except CitaSolapada as e:
+            raise _cita_solapada(e)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return RespuestaJSON(cita_json(cita), headers={CABECERA_ETAG: _etag(cita.version)})
+
+    async def obtener_cita(self, cita_id: str):
+
+        cita = self.cita_service.obtener_cita(cita_id)
+        if not cita:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cita no encontrada")
+        return RespuestaJSON(cita_json(cita), headers={CABECERA_ETAG: _etag(cita.version)})
+
+    async def citas_doctor(self, doctor_id: str, desde: datetime, hasta: datetime):
+        """Citas del doctor que se cruzan con [desde, hasta), por hora de inicio"""
+        desde, hasta = _hora_local(desde), _hora_local(hasta)
+        if hasta <= desde:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="`hasta` debe ser posterior a `desde`")
+        return RespuestaJSON(citas_json(self.cita_service.citas_doctor(doctor_id, desde, hasta)))
+
+    async def huecos_libres(self, doctor_id: str, dia: date,
+                            duracion: int = Query(DURACION_HUECO_POR_DEFECTO, ge=1, le=24 * 60,
+                                                  description="minutos"),
+                            apertura: time = APERTURA, cierre: time = CIERRE) -> List[HuecoResponse]:
+        """Tramos libres del doctor en la jornada de `dia` de al menos `duracion` minutos"""
+        try:
+            huecos = self.cita_service.huecos_libres(doctor_id, dia, timedelta(minutes=duracion), apertura, cierre)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return [HuecoResponse(inicio=inicio, fin=fin) for inicio, fin in huecos]
+
+    async def proximos_huecos(self, especialidad: str, desde: Optional[datetime] = None,
+                              cantidad: int = Query(HUECOS_POR_DEFECTO, ge=1, le=HUECOS_MAXIMO),
+                              duracion: int = Query(DURACION_HUECO_POR_DEFECTO, ge=1, le=24 * 60,
+                                                    description="minutos"),
+                              apertura: time = APERTURA, cierre: time = CIERRE) -> List[HuecoDoctorResponse]:
+        """Las primeras franjas libres desde `desde` (por defecto, ahora) entre todos los doctores de la especialidad"""
+        try:
+            huecos = await self.cita_service.proximos_huecos(especialidad, _hora_local(desde) or datetime.now(),
+                                                             cantidad, timedelta(minutes=duracion), apertura, cierre)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return [HuecoDoctorResponse(doctor_id=doctor.id, doctor_nombre=doctor.nombre, inicio=inicio, fin=fin)
+                for doctor, inicio, fin in huecos]
+
+    async def citas_paciente(self, paciente_id: str):
+
+        return RespuestaJSON(citas_json(self.cita_service.citas_paciente(paciente_id)))
+
+    async def reprogramar_cita(self, cita_id: str, cita_data: CitaUpdate, if_match: Optional[str] = Header(None)):
+        """Con If-Match solo se aplica sobre esa versión; 409 si el nuevo horario choca"""
+
+        async def buscar():
+            return self.cita_service.obtener_cita(cita_id)
+
+        version = await _version_if_match(if_match, buscar, "Cita no encontrada")
+        try:
+            cita = self.cita_service.reprogramar_cita(
+                cita_id=cita_id,
+                inicio=_hora_local(cita_data.inicio),
+                fin=_hora_local(cita_data.fin),
+                motivo=cita_data.motivo,
+                version=version
+            )
+        except ConflictoDeVersion as e:
+            raise _precondicion_fallida(e.version_actual)
+        except CitaSolapada as e:
+            raise _cita_solapada(e)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if not cita:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cita no encontrada")
+        return RespuestaJSON(cita_json(cita), headers={CABECERA_ETAG: _etag(cita.version)})
+
+    async def cancelar_cita(self, cita_id: str) -> dict:
+
+        if not self.cita_service.cancelar_cita(cita_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cita no encontrada")
+        return {"mensaje": "Cita cancelada exitosamente"}
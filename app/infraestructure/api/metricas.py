@@ -0,0 +1,204 @@
+import asyncio
+import inspect
+from bisect import bisect_left
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, Iterator, List, Tuple, Union
+
+
+# Métricas de una aplicación en el formato de texto de Prometheus, servidas en
+# RUTA_METRICAS. Las peticiones se agrupan por método, plantilla de ruta
+# (/pacientes/{patient_id}, no el id) y estado, así el número de series no
+# crece con los datos. Todo se actualiza desde el bucle de eventos de la
+# aplicación, sin candados: entre leer y sumar no hay ningún await.
+# Cada petición solo se apunta en una lista; se reparte entre las series por
+# lotes (al llenarse o al consultar las métricas), que en un bucle corto
+# cuesta menos que hacerlo entre el resto del trabajo de la petición
+# (bench/bench_metricas.py).
+# Los indicadores que leen del almacenamiento se registran como funciones
+# async (las de los repositorios con ejecutor), así la consulta no bloquea el
+# bucle; si fallan (ejecutor saturado, tiempo agotado) se sirven sus últimas
+# medidas.
+RUTA_METRICAS = "/metrics"
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+SIN_RUTA = "sin_ruta"
+LOTE = 1024
+
+# Límites superiores (incluidos) de las cubetas
+CUBETAS_DURACION = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CUBETAS_BYTES = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+Medidas = Union[Dict[str, float], Awaitable[Dict[str, float]]]
+
+_METODOS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor) -> str:
+    return str(valor) if isinstance(valor, int) else repr(float(valor))
+
+
+def _histograma(nombre: str, etiquetas: str, limites: Tuple[float, ...], cuentas: List[int], suma) -> Iterator[str]:
+    acumulado = 0
+    for limite, cuenta in zip(limites, cuentas):
+        acumulado += cuenta
+        yield f'{nombre}_bucket{{{etiquetas},le="{_numero(limite)}"}} {acumulado}'
+    acumulado += cuentas[-1]
+    yield f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {acumulado}'
+    yield f"{nombre}_sum{{{etiquetas}}} {_numero(suma)}"
+    yield f"{nombre}_count{{{etiquetas}}} {acumulado}"
+
+
+class _Serie:
+    """Peticiones de un método, ruta y estado: cuentas por cubeta (la última
+    es +Inf, sin acumular) y sumas de duración y bytes"""
+    __slots__ = ("duraciones", "segundos", "tamanos", "bytes")
+
+    def __init__(self):
+        self.duraciones = [0] * (len(CUBETAS_DURACION) + 1)
+        self.segundos = 0.0
+        self.tamanos = [0] * (len(CUBETAS_BYTES) + 1)
+        self.bytes = 0
+
+
+class Metricas:
+    """Contadores por ruta de una aplicación y los indicadores que se le registren"""
+
+    def __init__(self, prefijo: str = "clinica"):
+        self.prefijo = prefijo
+        self.en_curso = 0
+        self._series: Dict[Tuple[str, str, int], _Serie] = {}
+        # (método, ruta de Starlette o None, estado, duración, bytes) aún sin repartir
+        self._pendientes: List[tuple] = []
+        self._indicadores: List[Tuple[str, str, Callable[[], Medidas]]] = []
+        # Últimas medidas de cada indicador, por posición en _indicadores
+        self._ultimas: Dict[int, Dict[str, float]] = {}
+
+    def registrar_indicadores(self, nombre: str, obtener: Callable[[], Medidas], **etiquetas: str) -> None:
+        """Publica como gauges `{prefijo}_{nombre}_{medida}` lo que devuelva `obtener()` en cada
+        consulta; `obtener` puede ser una función async"""
+        texto = ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in sorted(etiquetas.items()))
+        self._indicadores.append((f"{self.prefijo}_{nombre}", texto, obtener))
+
+    async def _medir(self) -> List[Dict[str, float]]:
+        medidas = [obtener() for _, _, obtener in self._indicadores]
+        pendientes = [posicion for posicion, valor in enumerate(medidas) if inspect.isawaitable(valor)]
+        resultados = await asyncio.gather(*(medidas[posicion] for posicion in pendientes), return_exceptions=True)
+        for posicion, resultado in zip(pendientes, resultados):
+            if isinstance(resultado, Exception):
+                medidas[posicion] = self._ultimas.get(posicion, {})
+            else:
+                medidas[posicion] = self._ultimas[posicion] = resultado
+        return medidas
+
+    def observar(self, metodo: str, ruta, estado: int, duracion: float, enviados: int) -> None:
+        """Apunta una petición; `ruta` es la de Starlette que la atendió o None"""
+        pendientes = self._pendientes
+        pendientes.append((metodo, ruta, estado, duracion, enviados))
+        if len(pendientes) >= LOTE:
+            self._consolidar()
+
+    def _consolidar(self) -> None:
+        pendientes, self._pendientes = self._pendientes, []
+        series = self._series
+        for metodo, ruta, estado, duracion, enviados in pendientes:
+            clave = (metodo if metodo in _METODOS else "OTRO", getattr(ruta, "path", SIN_RUTA), estado)
+            serie = series.get(clave)
+            if serie is None:
+                serie = series[clave] = _Serie()
+            serie.duraciones[bisect_left(CUBETAS_DURACION, duracion)] += 1
+            serie.segundos += duracion
+            serie.tamanos[bisect_left(CUBETAS_BYTES, enviados)] += 1
+            serie.bytes += enviados
+
+    async def exponer(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        medidas = await self._medir()
+        self._consolidar()
+        prefijo = self.prefijo
+        lineas = [
+            f"# HELP {prefijo}_peticiones_en_curso Peticiones HTTP atendiéndose ahora",
+            f"# TYPE {prefijo}_peticiones_en_curso gauge",
+            f"{prefijo}_peticiones_en_curso {self.en_curso}",
+        ]
+        series = [(f'metodo="{metodo}",ruta="{_escapar(ruta)}",estado="{estado}"', serie)
+                  for (metodo, ruta, estado), serie in sorted(self._series.items())]
+        nombre = f"{prefijo}_peticiones_total"
+        lineas += [f"# HELP {nombre} Peticiones HTTP atendidas", f"# TYPE {nombre} counter"]
+        for etiquetas, serie in series:
+            lineas.append(f"{nombre}{{{etiquetas}}} {sum(serie.duraciones)}")
+        nombre = f"{prefijo}_peticion_duracion_segundos"
+        lineas += [f"# HELP {nombre} Tiempo hasta enviar la respuesta completa", f"# TYPE {nombre} histogram"]
+        for etiquetas, serie in series:
+            lineas.extend(_histograma(nombre, etiquetas, CUBETAS_DURACION, serie.duraciones, serie.segundos))
+        nombre = f"{prefijo}_respuesta_bytes"
+        lineas += [f"# HELP {nombre} Bytes del cuerpo enviados, ya comprimidos", f"# TYPE {nombre} histogram"]
+        for etiquetas, serie in series:
+            lineas.extend(_histograma(nombre, etiquetas, CUBETAS_BYTES, serie.tamanos, serie.bytes))
+        # Las medidas de varios registros con el mismo nombre van bajo un solo TYPE
+        indicadores: Dict[str, List[str]] = {}
+        for (base, etiquetas, _), valores in zip(self._indicadores, medidas):
+            for medida, valor in valores.items():
+                serie = f"{{{etiquetas}}}" if etiquetas else ""
+                indicadores.setdefault(f"{base}_{medida}", []).append(f"{base}_{medida}{serie} {_numero(valor)}")
+        for nombre, series in indicadores.items():
+            lineas.append(f"# TYPE {nombre} gauge")
+            lineas.extend(series)
+        return "\n".join(lineas) + "\n"
+
+
+class MetricasMiddleware:
+    """Middleware ASGI que mide cada petición y sirve `metricas` en GET `ruta`
+
+    Debe ser el más externo de los middlewares de la aplicación para que la
+    duración y los bytes incluyan los de los demás (CORS, compresión). La
+    plantilla de ruta se lee de scope["route"], que el router de Starlette
+    deja en el mismo scope al elegir la ruta.
+    """
+
+    def __init__(self, app, metricas: Metricas, ruta: str = RUTA_METRICAS):
+        self.app = app
+        self.metricas = metricas
+        self.ruta = ruta
+
+    async def _exponer(self, send) -> None:
+        cuerpo = (await self.metricas.exponer()).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", TIPO_CONTENIDO.encode()),
+            (b"content-length", str(len(cuerpo)).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == self.ruta and scope["method"] == "GET":
+            await self._exponer(send)
+            return
+
+        # Sin respuesta iniciada, una excepción acaba en un 500
+        estado = 500
+        enviados = 0
+
+        # Devuelve el awaitable de send() en vez de esperarlo: una corrutina
+        # menos por mensaje
+        def enviar(mensaje):
+            nonlocal estado, enviados
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            else:
+                enviados += len(mensaje.get("body", b""))
+            return send(mensaje)
+
+        metricas = self.metricas
+        metricas.en_curso += 1
+        inicio = perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = perf_counter() - inicio
+            metricas.en_curso -= 1
+            metricas.observar(scope["method"], scope.get("route"), estado, duracion, enviados)
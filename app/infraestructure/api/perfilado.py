@@ -0,0 +1,220 @@
+import cProfile
+import io
+import json
+import pstats
+import random
+import threading
+import tracemalloc
+from collections import deque
+from datetime import datetime, timezone
+from itertools import count
+from time import perf_counter
+from typing import Deque, List, Optional
+
+
+# Perfilado de peticiones sueltas para depurar: cuando una petición trae la
+# cabecera CABECERA_PERFILAR (o cae en el muestreo) se atiende bajo cProfile y
+# tracemalloc, y el informe se guarda en un búfer circular que se consulta en
+# RUTA_PERFILES. Solo se perfila una petición a la vez en todo el proceso,
+# aunque haya varias aplicaciones en varios hilos, porque tracemalloc es
+# global; las que llegan mientras tanto se atienden sin perfilar.
+# cProfile mide el hilo del bucle de eventos entero: si mientras la petición
+# espera (await) se atienden otras, su trabajo también aparece en el informe.
+# Lo que corre en el threadpool (cuerpos de StreamingResponse con iteradores
+# síncronos) no aparece.
+RUTA_PERFILES = "/debug/perfiles"
+CABECERA_PERFILAR = "X-Perfilar"
+CAPACIDAD_POR_DEFECTO = 20
+FUNCIONES_POR_DEFECTO = 25
+
+_CABECERA = CABECERA_PERFILAR.lower().encode("latin-1")
+# Lo tiene quien perfila: es dueño de tracemalloc hasta soltarlo
+_PERFILANDO = threading.Lock()
+# Las asignaciones de tracemalloc y del propio perfilado no interesan
+_FILTROS_MEMORIA = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+def _nombre_funcion(funcion: tuple) -> str:
+    archivo, linea, nombre = funcion
+    return nombre if archivo == "~" else f"{archivo}:{linea}({nombre})"
+
+
+def _funciones(perfil: cProfile.Profile, limite: int) -> List[dict]:
+    """Las `limite` funciones con más tiempo acumulado"""
+    estadisticas = pstats.Stats(perfil).stats
+    primeras = sorted(estadisticas.items(), key=lambda par: par[1][3], reverse=True)[:limite]
+    return [{
+        "funcion": _nombre_funcion(funcion),
+        "llamadas": llamadas,
+        "propio_ms": round(propio * 1000, 3),
+        "acumulado_ms": round(acumulado * 1000, 3),
+    } for funcion, (_, llamadas, propio, acumulado, _) in primeras]
+
+
+def _texto_pstats(perfil: cProfile.Profile, limite: int) -> str:
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limite)
+    return salida.getvalue()
+
+
+def _asignaciones(instantanea: tracemalloc.Snapshot, limite: int) -> List[dict]:
+    """Líneas que más memoria siguen ocupando al terminar la petición"""
+    estadisticas = instantanea.filter_traces(_FILTROS_MEMORIA).statistics("lineno")
+    return [{
+        "linea": f"{estadistica.traceback[0].filename}:{estadistica.traceback[0].lineno}",
+        "bytes": estadistica.size,
+        "bloques": estadistica.count,
+    } for estadistica in estadisticas[:limite]]
+
+
+class Perfiles:
+    """Búfer circular con los últimos informes de perfilado"""
+
+    def __init__(self, capacidad: int = CAPACIDAD_POR_DEFECTO):
+        self._informes: Deque[dict] = deque(maxlen=capacidad)
+        self._ids = count(1)
+
+    def agregar(self, informe: dict) -> dict:
+        informe = {"id": next(self._ids), **informe}
+        self._informes.append(informe)
+        return informe
+
+    def resumen(self) -> List[dict]:
+        """Los informes guardados, el más reciente primero, sin el detalle"""
+        return [{clave: valor for clave, valor in informe.items() if clave not in ("funciones", "asignaciones", "texto")}
+                for informe in reversed(self._informes)]
+
+    def obtener(self, id_informe: int) -> Optional[dict]:
+        for informe in self._informes:
+            if informe["id"] == id_informe:
+                return informe
+        return None
+
+
+class PerfiladoMiddleware:
+    """Middleware ASGI que perfila con cProfile y tracemalloc las peticiones marcadas
+
+    Una petición se perfila si trae `CABECERA_PERFILAR` (con el valor de
+    `clave`, si se configura una) o, sin cabecera, con probabilidad
+    `muestreo`. Los informes se sirven en JSON en GET `ruta` (resumen) y
+    GET `ruta`/{id} (funciones por tiempo acumulado y líneas con más memoria
+    retenida); GET `ruta`/{id}/texto devuelve la tabla de pstats. Con
+    `clave`, esas rutas también exigen la cabecera.
+
+    Perfilar multiplica el tiempo de la petición; solo para depurar.
+    """
+
+    def __init__(self, app, perfiles: Optional[Perfiles] = None, muestreo: float = 0.0,
+                 clave: Optional[str] = None, funciones: int = FUNCIONES_POR_DEFECTO,
+                 ruta: str = RUTA_PERFILES):
+        self.app = app
+        self.perfiles = perfiles if perfiles is not None else Perfiles()
+        self.muestreo = muestreo
+        self.clave = clave.encode("latin-1") if clave else None
+        self.funciones = funciones
+        self.ruta = ruta
+
+    def _cabecera(self, scope) -> Optional[bytes]:
+        for nombre, valor in scope["headers"]:
+            if nombre == _CABECERA:
+                return valor
+        return None
+
+    def _autorizada(self, cabecera: Optional[bytes]) -> bool:
+        return cabecera is not None and (self.clave is None or cabecera == self.clave)
+
+    async def _responder(self, send, estado: int, cuerpo: bytes, tipo: bytes = b"application/json") -> None:
+        await send({"type": "http.response.start", "status": estado, "headers": [
+            (b"content-type", tipo),
+            (b"content-length", str(len(cuerpo)).encode()),
+            (b"cache-control", b"no-store"),
+        ]})
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    async def _consultar(self, scope, send) -> None:
+        if self.clave is not None and self._cabecera(scope) != self.clave:
+            await self._responder(send, 403, b'{"detail":"Falta la cabecera ' + _CABECERA + b'"}')
+            return
+        partes = scope["path"][len(self.ruta):].strip("/").split("/")
+        if partes == [""]:
+            await self._responder(send, 200, json.dumps(self.perfiles.resumen()).encode())
+            return
+        informe = self.perfiles.obtener(int(partes[0])) if partes[0].isdigit() and len(partes) <= 2 else None
+        if informe is None or (len(partes) == 2 and partes[1] != "texto"):
+            await self._responder(send, 404, b'{"detail":"Informe no encontrado"}')
+        elif len(partes) == 2:
+            await self._responder(send, 200, informe["texto"].encode(), b"text/plain; charset=utf-8")
+        else:
+            await self._responder(send, 200, json.dumps(
+                {clave: valor for clave, valor in informe.items() if clave != "texto"}).encode())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] == "GET" and (scope["path"] == self.ruta or scope["path"].startswith(self.ruta + "/")):
+            await self._consultar(scope, send)
+            return
+        cabecera = self._cabecera(scope)
+        if cabecera is not None:
+            perfilar = self._autorizada(cabecera)
+        else:
+            perfilar = self.muestreo > 0 and random.random() < self.muestreo
+        if not perfilar or not _PERFILANDO.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._perfilar(scope, receive, send)
+        finally:
+            _PERFILANDO.release()
+
+    async def _perfilar(self, scope, receive, send) -> None:
+
+        estado = 500
+        enviados = 0
+
+        def enviar(mensaje):
+            nonlocal estado, enviados
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            else:
+                enviados += len(mensaje.get("body", b""))
+            return send(mensaje)
+
+        # Si tracemalloc ya estaba activo (PYTHONTRACEMALLOC) se deja como estaba
+        propio_tracemalloc = not tracemalloc.is_tracing()
+        if propio_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        memoria_inicial = tracemalloc.get_traced_memory()[0]
+        perfil = cProfile.Profile()
+        inicio = perf_counter()
+        perfil.enable()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            perfil.disable()
+            duracion = perf_counter() - inicio
+            actual, pico = tracemalloc.get_traced_memory()
+            instantanea = tracemalloc.take_snapshot()
+            if propio_tracemalloc:
+                tracemalloc.stop()
+            self.perfiles.agregar({
+                "fecha": datetime.now(timezone.utc).isoformat(),
+                "metodo": scope["method"],
+                "ruta": scope["path"] + ("?" + scope["query_string"].decode("latin-1")
+                                         if scope.get("query_string") else ""),
+                "estado": estado,
+                "bytes_enviados": enviados,
+                "duracion_ms": round(duracion * 1000, 3),
+                "memoria_pico_bytes": pico - memoria_inicial,
+                "memoria_retenida_bytes": actual - memoria_inicial,
+                "funciones": _funciones(perfil, self.funciones),
+                "asignaciones": _asignaciones(instantanea, self.funciones),
+                "texto": _texto_pstats(perfil, self.funciones),
+            })
@@ -0,0 +1,88 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, List
+from fastapi import Response
+from pydantic import TypeAdapter
+from app.domain.core.models import paciente, Doctor, Cita
+
+
+# Los serializadores se construyen una sola vez y convierten las dataclasses
+# del dominio directamente a JSON, sin crear un PatientResponse/DoctorResponse
+# por fila ni validar de nuevo la salida.
+_PACIENTE = TypeAdapter(paciente)
+_PACIENTES = TypeAdapter(List[paciente])
+_DOCTOR = TypeAdapter(Doctor)
+_DOCTORES = TypeAdapter(List[Doctor])
+_CITA = TypeAdapter(Cita)
+_CITAS = TypeAdapter(List[Cita])
+
+# Un listado de cientos de miles de filas tarda cientos de ms en pasar a
+# JSON y, hecho de una vez, retiene el bucle de eventos (y las demás
+# peticiones del hilo) todo ese tiempo. Por encima de FILAS_POR_TROZO
+# filas se serializa por trozos cediendo el bucle entre uno y otro. No se
+# manda a otro hilo: el serializador no suelta el GIL y solo se cambiaría
+# un bloqueo largo por muchos cortos sin control de su tamaño.
+FILAS_POR_TROZO = 2000
+
+
+class RespuestaJSON(Response):
+    media_type = "application/json"
+
+
+def paciente_json(patient: paciente) -> bytes:
+    return _PACIENTE.dump_json(patient)
+
+
+def pacientes_json(patients: List[paciente]) -> bytes:
+    return _PACIENTES.dump_json(patients)
+
+
+async def _json_por_trozos(items: List, adaptador: TypeAdapter, filas: int) -> bytes:
+    if len(items) <= filas:
+        return adaptador.dump_json(items)
+    # Mismos bytes que de una vez: cada trozo es "[a,b]" y se unen sus interiores con comas
+    partes = []
+    for inicio in range(0, len(items), filas):
+        if inicio:
+            await asyncio.sleep(0)
+        partes.append(adaptador.dump_json(items[inicio:inicio + filas])[1:-1])
+    return b"[" + b",".join(partes) + b"]"
+
+
+async def pacientes_json_por_trozos(patients: List[paciente], filas: int = FILAS_POR_TROZO) -> bytes:
+    """Como pacientes_json, cediendo el bucle de eventos cada `filas` filas"""
+    return await _json_por_trozos(patients, _PACIENTES, filas)
+
+
+def doctor_json(doctor: Doctor) -> bytes:
+    return _DOCTOR.dump_json(doctor)
+
+
+def doctores_json(doctors: List[Doctor]) -> bytes:
+    return _DOCTORES.dump_json(doctors)
+
+
+async def doctores_json_por_trozos(doctors: List[Doctor], filas: int = FILAS_POR_TROZO) -> bytes:
+    """Como doctores_json, cediendo el bucle de eventos cada `filas` filas"""
+    return await _json_por_trozos(doctors, _DOCTORES, filas)
+
+
+def cita_json(cita: Cita) -> bytes:
+    return _CITA.dump_json(cita)
+
+
+def citas_json(citas: List[Cita]) -> bytes:
+    return _CITAS.dump_json(citas)
+
+
+def ndjson(items: Iterable, a_json) -> bytes:
+    """Un registro JSON por línea"""
+    return b"".join(a_json(item) + b"\n" for item in items)
+
+
+async def ndjson_por_lotes(lotes: AsyncIterable[List], a_json: Callable[[object], bytes]) -> AsyncIterator[bytes]:
+    """Cuerpo NDJSON de una exportación, un trozo por lote, cediendo el bucle de eventos entre lotes"""
+    async for lote in lotes:
+        yield ndjson(lote, a_json)
+        # Si ni el almacenamiento ni el envío llegan a esperar, la exportación
+        # entera correría sin soltar el bucle
+        await asyncio.sleep(0)
@@ -0,0 +1,158 @@
+import logging
+import multiprocessing
+import signal
+import socket
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+import uvicorn
+
+
+logger = logging.getLogger("clinica.lanzador")
+
+# Si un trabajador muere antes de este tiempo se espera antes de relanzarlo,
+# para no entrar en un bucle de reinicios cuando falla al arrancar.
+VIDA_MINIMA_SEGUNDOS = 5.0
+ESPERA_MAXIMA_REINICIO = 30.0
+
+
+def crear_socket(host: str, puerto: int, compartido: bool = True) -> socket.socket:
+    """Socket con SO_REUSEPORT: varios procesos escuchan el mismo puerto y el kernel reparte
+
+    Con `compartido=False` es un socket normal, para un solo proceso.
+    """
+    if compartido and not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT no está disponible en esta plataforma")
+    # proto explícito: asyncio solo activa TCP_NODELAY en las conexiones
+    # aceptadas si el socket declara IPPROTO_TCP
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if compartido:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, puerto))
+    sock.set_inheritable(True)
+    return sock
+
+
+def servir(app, puertos: Sequence[int], host: str = "0.0.0.0", log_level: str = "info") -> None:
+    """Un solo servidor uvicorn, con un solo bucle de eventos, que escucha en todos los `puertos`"""
+    sockets = [crear_socket(host, puerto, compartido=False) for puerto in puertos]
+    uvicorn.Server(uvicorn.Config(app, log_level=log_level)).run(sockets=sockets)
+
+
+def _trabajador(app: str, host: str, puertos: Tuple[int, ...], log_level: str) -> None:
+    sockets = [crear_socket(host, puerto) for puerto in puertos]
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+@dataclass
+class Servicio:
+    """Una aplicación ASGI (ruta de importación 'modulo:atributo') y su puerto
+
+    Con `otros_puertos` cada trabajador atiende también esos puertos desde
+    el mismo servidor.
+    """
+    app: str
+    puerto: int
+    host: str = "0.0.0.0"
+    otros_puertos: Tuple[int, ...] = ()
+
+    @property
+    def puertos(self) -> Tuple[int, ...]:
+        return (self.puerto,) + tuple(self.otros_puertos)
+
+
+@dataclass
+class _Trabajador:
+    servicio: Servicio
+    proceso: Optional[multiprocessing.Process] = None
+    inicio: float = 0.0
+    fallos_seguidos: int = 0
+    reinicio_en: float = 0.0
+
+
+@dataclass
+class Supervisor:
+    """Arranca N procesos por servicio y relanza los que terminan inesperadamente"""
+    servicios: List[Servicio]
+    trabajadores_por_servicio: int
+    log_level: str = "info"
+    intervalo: float = 0.5
+    _trabajadores: List[_Trabajador] = field(default_factory=list)
+    _detenido: bool = False
+
+    def __post_init__(self):
+        if self.trabajadores_por_servicio < 1:
+            raise ValueError("Se necesita al menos un trabajador por servicio")
+        # spawn: cada trabajador importa la aplicación desde cero, sin heredar
+        # conexiones ni hilos del supervisor
+        self._contexto = multiprocessing.get_context("spawn")
+
+    def _lanzar(self, trabajador: _Trabajador) -> None:
+        servicio = trabajador.servicio
+        trabajador.proceso = self._contexto.Process(
+            target=_trabajador,
+            args=(servicio.app, servicio.host, servicio.puertos, self.log_level),
+            name=f"{servicio.app}@{'+'.join(map(str, servicio.puertos))}",
+        )
+        trabajador.proceso.start()
+        trabajador.inicio = time.monotonic()
+        logger.info("Trabajador %s iniciado (pid %s)", trabajador.proceso.name, trabajador.proceso.pid)
+
+    def _revisar(self, trabajador: _Trabajador) -> None:
+        if self._detenido:
+            return
+        proceso = trabajador.proceso
+        ahora = time.monotonic()
+        if proceso is not None and proceso.is_alive():
+            if ahora - trabajador.inicio >= VIDA_MINIMA_SEGUNDOS:
+                trabajador.fallos_seguidos = 0
+            return
+        if proceso is not None:
+            logger.warning("Trabajador %s terminó con código %s", proceso.name, proceso.exitcode)
+            proceso.join()
+            trabajador.proceso = None
+            espera = 0.0
+            if ahora - trabajador.inicio < VIDA_MINIMA_SEGUNDOS:
+                trabajador.fallos_seguidos += 1
+                espera = min(ESPERA_MAXIMA_REINICIO, 0.5 * 2 ** trabajador.fallos_seguidos)
+            trabajador.reinicio_en = ahora + espera
+        if ahora >= trabajador.reinicio_en:
+            self._lanzar(trabajador)
+
+    def detener(self, *_) -> None:
+        self._detenido = True
+
+    def ejecutar(self) -> None:
+        # Comprobar los puertos antes de lanzar nada, para fallar pronto
+        for servicio in self.servicios:
+            for puerto in servicio.puertos:
+                crear_socket(servicio.host, puerto).close()
+        signal.signal(signal.SIGINT, self.detener)
+        signal.signal(signal.SIGTERM, self.detener)
+        self._trabajadores = [
+            _Trabajador(servicio)
+            for servicio in self.servicios
+            for _ in range(self.trabajadores_por_servicio)
+        ]
+        for trabajador in self._trabajadores:
+            self._lanzar(trabajador)
+        try:
+            while not self._detenido:
+                for trabajador in self._trabajadores:
+                    self._revisar(trabajador)
+                time.sleep(self.intervalo)
+        finally:
+            self._terminar()
+
+    def _terminar(self) -> None:
+        procesos = [t.proceso for t in self._trabajadores if t.proceso is not None]
+        for proceso in procesos:
+            proceso.terminate()
+        for proceso in procesos:
+            proceso.join(timeout=10)
+            if proceso.is_alive():
+                proceso.kill()
+                proceso.join()
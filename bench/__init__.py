@@ -0,0 +1 @@
+"""Benchmarks del sistema clínico"""
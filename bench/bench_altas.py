@@ -0,0 +1,54 @@
+"""Altas de una en una sobre InMemoryPatientRepository con 1M pacientes.
+
+"insort" coloca cada id en la lista ordenada al darlo de alta, como hacía
+guardar() antes: cada alta mueve la cola de la lista. "pendientes" deja los
+ids nuevos aparte y los mezcla en la siguiente página. Con una página entre
+cada alta y la siguiente las dos hacen lo mismo; con varias altas seguidas la
+primera página paga una sola mezcla.
+
+Uso: python -m bench.bench_altas [registros] [altas...]
+"""
+import sys
+import time
+from app.domain.core.models import paciente
+from app.infraestructure.adapters.database import InMemoryPatientRepository
+
+
+REGISTROS = 1_000_000
+ALTAS = [1, 10, 100, 1_000, 10_000]
+
+
+def poblar(registros: int) -> InMemoryPatientRepository:
+    repo = InMemoryPatientRepository()
+    repo.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(registros)])
+    repo.buscar_pagina(None, 1)
+    return repo
+
+
+def medir(repo: InMemoryPatientRepository, altas: int, colocar_cada_alta: bool):
+    nuevos = [paciente(nombre=f"Alta {i}", email=f"a{i}@clinica.org") for i in range(altas)]
+    inicio = time.perf_counter()
+    for patient in nuevos:
+        repo.guardar(patient)
+        if colocar_cada_alta:
+            repo._ids()
+    segundos_altas = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    repo.buscar_pagina(None, 100)
+    segundos_pagina = time.perf_counter() - inicio
+    repo.borrar_lote([patient.id for patient in nuevos])
+    return segundos_altas / altas * 1e6, segundos_pagina * 1000, (segundos_altas + segundos_pagina) * 1000
+
+
+def main(registros: int, altas_por_prueba) -> None:
+    repo = poblar(registros)
+    print(f"{'variante':>11} {'altas':>7} {'µs/alta':>9} {'página (ms)':>12} {'total (ms)':>11}")
+    for altas in altas_por_prueba:
+        for nombre, colocar in (("insort", True), ("pendientes", False)):
+            por_alta, pagina, total = medir(repo, altas, colocar)
+            print(f"{nombre:>11} {altas:>7} {por_alta:>9.1f} {pagina:>12.2f} {total:>11.1f}")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(argumentos[0] if argumentos else REGISTROS, argumentos[1:] or ALTAS)
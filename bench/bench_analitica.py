@@ -0,0 +1,44 @@
+"""Lecturas analíticas sobre doctores: conteo por especialidad y exportación de emails.
+
+Compara InMemoryDoctorRepository (recorriendo objetos Doctor) con
+ColumnarDoctorRepository (leyendo columnas sin materializar doctores).
+
+Uso: python -m bench.bench_analitica [doctores]
+"""
+import sys
+import time
+from collections import Counter
+from app.domain.core.models import Doctor
+from app.infraestructure.adapters.database import InMemoryDoctorRepository
+from app.infraestructure.adapters.columnar import ColumnarDoctorRepository
+
+
+ESPECIALIDADES = ["Cardiología", "Pediatría", "Neurología", "Dermatología", "Oncología",
+                  "Ginecología", "Traumatología", "Oftalmología", "Psiquiatría", "Urología"]
+
+
+def medir(funcion) -> float:
+    inicio = time.perf_counter()
+    funcion()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main(n: int) -> None:
+    memoria = InMemoryDoctorRepository()
+    columnar = ColumnarDoctorRepository()
+    for repo in (memoria, columnar):
+        repo.guardar_lote([Doctor(nombre=f"Doctor {i}", especialidad=ESPECIALIDADES[i % 10],
+                                  email=f"doctor{i}@clinica.mx") for i in range(n)])
+    casos = [
+        ("conteo", "memoria", lambda: Counter(d.especialidad.casefold() for d in memoria.buscar_todos())),
+        ("conteo", "columnar", columnar.contar_por_especialidad),
+        ("emails", "memoria", lambda: [d.email for d in memoria.buscar_todos()]),
+        ("emails", "columnar", lambda: list(columnar.emails())),
+    ]
+    print(f"{'lectura':>8} {'backend':>9} {'doctores':>9} {'ms':>9}")
+    for lectura, backend, funcion in casos:
+        print(f"{lectura:>8} {backend:>9} {n:>9} {medir(funcion):>9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
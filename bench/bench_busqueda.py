@@ -0,0 +1,84 @@
+"""Latencia de la búsqueda de texto: recorrido lineal contra índice invertido.
+
+Uso: python -m bench.bench_busqueda [tamaños...]
+"""
+import random
+import sys
+import time
+from app.domain.core.models import paciente
+from app.infraestructure.adapters.database import InMemoryPatientRepository
+
+
+NOMBRES = [
+    "María", "José", "Antonio", "Carmen", "Manuel", "Ana", "Francisco", "Laura",
+    "David", "Isabel", "Juan", "Lucía", "Javier", "Marta", "Daniel", "Pilar",
+    "Carlos", "Elena", "Miguel", "Rosa", "Pedro", "Sofía", "Alejandro", "Paula",
+]
+APELLIDOS = [
+    "García", "Rodríguez", "González", "Fernández", "López", "Martínez", "Sánchez",
+    "Pérez", "Gómez", "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno",
+    "Muñoz", "Álvarez", "Romero", "Alonso", "Gutiérrez", "Navarro", "Torres",
+    "Domínguez", "Vázquez", "Ramos", "Gil", "Ramírez", "Serrano", "Blanco", "Molina",
+]
+DOMINIOS = ["gmail.com", "hotmail.es", "yahoo.es", "clinica.org", "correo.net"]
+CONSULTAS = ["zubizarreta", "maria garcia", "gomez", "fern", "ga", "carmen ruiz 12", "ana gil", "a g"]
+TAMANOS = [10_000, 100_000, 1_000_000]
+REPETICIONES = 200
+
+
+def poblar(n: int) -> InMemoryPatientRepository:
+    azar = random.Random(7)
+    repo = InMemoryPatientRepository()
+    lote = []
+    for i in range(n):
+        nombre, apellido1, apellido2 = azar.choice(NOMBRES), azar.choice(APELLIDOS), azar.choice(APELLIDOS)
+        usuario = f"{nombre[0]}{apellido1}{i}".lower()
+        lote.append(paciente(nombre=f"{nombre} {apellido1} {apellido2}",
+                             email=f"{usuario}@{azar.choice(DOMINIOS)}"))
+        if len(lote) == 10_000:
+            repo.guardar_lote(lote)
+            lote = []
+    lote.append(paciente(nombre="Íñigo Zubizarreta", email="izubi@clinica.org"))
+    repo.guardar_lote(lote)
+    return repo
+
+
+def recorrido_lineal(repo: InMemoryPatientRepository, consulta: str, limite: int):
+    # Búsqueda sin índice: subcadena en nombre o email, sin ranking
+    terminos = consulta.casefold().split()
+    encontrados = []
+    for patient in repo.patients.values():
+        texto = f"{patient.nombre} {patient.email}".casefold()
+        if all(termino in texto for termino in terminos):
+            encontrados.append(patient)
+            if len(encontrados) == limite:
+                break
+    return encontrados
+
+
+def percentiles(funcion, repeticiones: int):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2], tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))]
+
+
+def main(tamanos):
+    print(f"{'pacientes':>10} {'consulta':>16} {'lineal p50':>11} {'índice p50':>11} "
+          f"{'índice p99':>11} {'resultados':>10}   (ms)")
+    for n in tamanos:
+        inicio = time.perf_counter()
+        repo = poblar(n)
+        print(f"# {n} pacientes indexados en {time.perf_counter() - inicio:.1f} s")
+        for consulta in CONSULTAS:
+            lineal, _ = percentiles(lambda: recorrido_lineal(repo, consulta, 20), max(1, 100_000 // n))
+            p50, p99 = percentiles(lambda: repo.buscar_texto(consulta, 20), REPETICIONES)
+            resultados = len(repo.buscar_texto(consulta, 20))
+            print(f"{n:>10} {consulta:>16} {lineal:>11.3f} {p50:>11.3f} {p99:>11.3f} {resultados:>10}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or TAMANOS)
@@ -0,0 +1,75 @@
+"""GET /doctores/especialidad/{e} y GET /doctores/ con y sin la caché de respuestas.
+
+Cada ronda consulta todas las especialidades y el listado; cada
+`ESCRITURAS_CADA` rondas se cambia un doctor, lo que solo invalida su
+especialidad y los listados.
+
+Uso: python -m bench.bench_cache [doctores] [rondas]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from fastapi import FastAPI
+from app.domain.core.models import Doctor
+from app.application.services.doctor_service import AsyncDoctorService
+from app.infraestructure.adapters.cache_respuestas import CacheLRU
+from app.infraestructure.adapters.database import InMemoryDoctorRepository
+from app.infraestructure.adapters.ejecutor import ExecutorDoctorRepository
+from app.infraestructure.adapters.sqlite import SqliteDoctorRepository
+from app.infraestructure.api.controller import DoctorController
+from bench.cliente_asgi import peticion
+from bench.bench_especialidad import ESPECIALIDADES
+
+
+ESCRITURAS_CADA = 10
+
+
+def crear_app(repo, doctores: int, con_cache: bool):
+    service = AsyncDoctorService(ExecutorDoctorRepository(repo), CacheLRU() if con_cache else None)
+    guardados = repo.guardar_lote([
+        Doctor(nombre=f"Doctor {i}", especialidad=ESPECIALIDADES[i % len(ESPECIALIDADES)],
+               email=f"d{i}@clinica.mx")
+        for i in range(doctores)
+    ])
+    app = FastAPI()
+    app.include_router(DoctorController(service).router)
+    return app, service, [doctor.id for doctor in guardados]
+
+
+async def medir(app, service, ids, rondas: int) -> float:
+    rutas = [f"/doctores/especialidad/{especialidad}" for especialidad in ESPECIALIDADES] + ["/doctores/"]
+    peticiones = 0
+    inicio = time.perf_counter()
+    for ronda in range(rondas):
+        if ronda % ESCRITURAS_CADA == ESCRITURAS_CADA - 1:
+            await service.actualizar_doctor(ids[ronda % len(ids)], nombre=f"Cambio {ronda}")
+        for ruta in rutas:
+            respuesta = await peticion(app, "GET", ruta, guardar_cuerpo=False)
+            assert respuesta.status == 200, respuesta.status
+            peticiones += 1
+    return (time.perf_counter() - inicio) / peticiones * 1000
+
+
+def main(doctores: int, rondas: int) -> None:
+    directorio = tempfile.mkdtemp()
+    backends = {
+        "memoria": InMemoryDoctorRepository,
+        "sqlite": lambda etiqueta: SqliteDoctorRepository(f"{directorio}/{etiqueta}.db"),
+    }
+    print(f"{'backend':>8} {'doctores':>9} {'sin caché (ms)':>15} {'con caché (ms)':>15} {'aciertos':>9}")
+    for nombre, crear in backends.items():
+        tiempos = []
+        for con_cache in (False, True):
+            repo = crear() if nombre == "memoria" else crear(f"{nombre}-{con_cache}")
+            app, service, ids = crear_app(repo, doctores, con_cache)
+            tiempos.append(asyncio.run(medir(app, service, ids, rondas)))
+            estadisticas = service.cache.estadisticas() if service.cache else None
+        total = estadisticas["aciertos"] + estadisticas["fallos"]
+        print(f"{nombre:>8} {doctores:>9} {tiempos[0]:>15.3f} {tiempos[1]:>15.3f} "
+              f"{estadisticas['aciertos'] / total:>9.0%}")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [10_000, 50][len(argumentos):]))
@@ -0,0 +1,142 @@
+"""Agenda de citas: reservar, detectar choques y buscar huecos libres.
+
+Reserva `citas` citas de media hora repartidas entre `doctores` doctores
+(CitaService sobre los repositorios en memoria, en orden aleatorio) y luego
+mide por operación:
+
+- choque: reservar un horario ya ocupado (CitaSolapada).
+- agenda del día: citas de un doctor en un día.
+- huecos libres: tramos de al menos 30 minutos en la jornada de un día.
+
+Las consultas se comparan con recorrer todas las citas del doctor, que es lo
+que haría falta sin el índice por intervalos.
+
+Uso: python -m bench.bench_citas [citas] [doctores]
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from app.domain.core.models import paciente, Doctor, CitaSolapada
+from app.application.services.cita_service import APERTURA, CIERRE, CitaService
+from app.infraestructure.adapters.database import (
+    InMemoryPatientRepository,
+    InMemoryDoctorRepository,
+    InMemoryCitaRepository
+)
+from app.infraestructure.adapters.ejecutor import ExecutorDoctorRepository, ExecutorPatientRepository
+
+
+PRIMER_DIA = datetime(2026, 11, 2)
+DURACION = timedelta(minutes=30)
+FRANJAS_POR_DIA = 24
+PACIENTES = 10_000
+CONSULTAS = 20_000
+
+
+def preparar(citas: int, doctores: int):
+    pacientes = InMemoryPatientRepository()
+    pacientes.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(PACIENTES)])
+    medicos = InMemoryDoctorRepository()
+    medicos.guardar_lote([Doctor(nombre=f"Doctor {i}", especialidad="Medicina general") for i in range(doctores)])
+    servicio = CitaService(InMemoryCitaRepository(), ExecutorPatientRepository(pacientes),
+                           ExecutorDoctorRepository(medicos))
+    doctor_ids = [doctor.id for doctor in medicos.buscar_todos()]
+    paciente_ids = [patient.id for patient in pacientes.buscar_todos()]
+    # Cada doctor ocupa sin repetir franjas de media hora de los días necesarios
+    por_doctor = -(-citas // doctores)
+    dias = max(1, -(-2 * por_doctor // FRANJAS_POR_DIA))
+    reservas = []
+    for indice, doctor_id in enumerate(doctor_ids):
+        cuantas = min(por_doctor, citas - len(reservas))
+        for franja in random.sample(range(dias * FRANJAS_POR_DIA), cuantas):
+            dia, hora = divmod(franja, FRANJAS_POR_DIA)
+            inicio = PRIMER_DIA + timedelta(days=dia, hours=APERTURA.hour) + hora * DURACION
+            reservas.append((doctor_id, random.choice(paciente_ids), inicio, inicio + DURACION))
+    random.shuffle(reservas)
+    return servicio, doctor_ids, reservas, dias
+
+
+def recorrido_lineal(citas, desde: datetime, hasta: datetime):
+    return [cita for cita in citas if cita.inicio < hasta and cita.fin > desde]
+
+
+def huecos_lineal(citas, desde: datetime, hasta: datetime, duracion: timedelta):
+    huecos = []
+    libre = desde
+    for cita in sorted(recorrido_lineal(citas, desde, hasta), key=lambda cita: cita.inicio):
+        if cita.inicio - libre >= duracion:
+            huecos.append((libre, cita.inicio))
+        libre = max(libre, cita.fin)
+    if hasta - libre >= duracion:
+        huecos.append((libre, hasta))
+    return huecos
+
+
+def medir(funcion, argumentos) -> float:
+    inicio = time.perf_counter()
+    for argumento in argumentos:
+        funcion(*argumento)
+    return (time.perf_counter() - inicio) / len(argumentos) * 1e6
+
+
+def medir_async(corrutina, argumentos) -> float:
+    # Todas las llamadas en un mismo bucle de eventos
+
+    async def todas():
+        for argumento in argumentos:
+            await corrutina(*argumento)
+
+    inicio = time.perf_counter()
+    asyncio.run(todas())
+    return (time.perf_counter() - inicio) / len(argumentos) * 1e6
+
+
+def main(citas: int, doctores: int) -> None:
+    random.seed(1)
+    servicio, doctor_ids, reservas, dias = preparar(citas, doctores)
+    segundos = medir_async(servicio.agendar_cita, reservas) * len(reservas) / 1e6
+    print(f"{citas} citas entre {doctores} doctores en {dias} días: {segundos:.1f} s, "
+          f"{citas / segundos:,.0f} reservas/s, {segundos / citas * 1e6:.2f} µs por reserva")
+
+    # Sin índice: todas las citas de cada doctor en una lista
+    listas = {}
+    for cita in servicio.cita_repository.citas.values():
+        listas.setdefault(cita.doctor_id, []).append(cita)
+
+    ocupadas = random.sample(reservas, CONSULTAS)
+    # Media franja después: se cruza con la cita reservada
+    choques = [(doctor_id, paciente_id, desde + DURACION / 2, hasta + DURACION / 2)
+               for doctor_id, paciente_id, desde, hasta in ocupadas]
+    dias_consulta = [(random.choice(doctor_ids), PRIMER_DIA + timedelta(days=random.randrange(dias)))
+                     for _ in range(CONSULTAS)]
+    jornadas = [(doctor_id, dia + timedelta(hours=APERTURA.hour), dia + timedelta(hours=CIERRE.hour))
+                for doctor_id, dia in dias_consulta]
+
+    async def reservar_ocupado(doctor_id, paciente_id, desde, hasta):
+        try:
+            await servicio.agendar_cita(doctor_id, paciente_id, desde, hasta)
+        except CitaSolapada:
+            return
+        raise AssertionError("la reserva debía chocar")
+
+    filas = [
+        ("choque", medir(lambda doctor_id, _, desde, hasta: recorrido_lineal(listas[doctor_id], desde, hasta),
+                         choques),
+         medir_async(reservar_ocupado, choques)),
+        ("agenda del día", medir(lambda doctor_id, desde, hasta: recorrido_lineal(listas[doctor_id], desde, hasta),
+                                 jornadas),
+         medir(servicio.citas_doctor, jornadas)),
+        ("huecos libres", medir(lambda doctor_id, desde, hasta: huecos_lineal(listas[doctor_id], desde, hasta,
+                                                                              DURACION), jornadas),
+         medir(lambda doctor_id, dia: servicio.huecos_libres(doctor_id, dia.date(), DURACION), dias_consulta)),
+    ]
+    print(f"{'operación':>15} {'recorrido (µs)':>15} {'índice (µs)':>12}")
+    for nombre, lineal, indice in filas:
+        print(f"{nombre:>15} {lineal:>15.2f} {indice:>12.2f}")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [1_000_000, 5_000][len(argumentos):]))
@@ -0,0 +1,59 @@
+"""Bytes en el cable y CPU por petición con y sin compresión.
+
+- GET /pacientes/ y /pacientes/export: sin caché, se comprimen al vuelo
+  (la exportación trozo a trozo).
+- GET /doctores/especialidad/{e}: la forma comprimida sale de la caché.
+
+Uso: python -m bench.bench_compresion [registros] [repeticiones]
+"""
+import asyncio
+import sys
+import time
+from fastapi import FastAPI
+from app.domain.core.models import paciente, Doctor
+from app.application.services.patient_service import AsyncPatientService
+from app.application.services.doctor_service import AsyncDoctorService
+from app.infraestructure.adapters.cache_respuestas import CacheLRU
+from app.infraestructure.adapters.database import InMemoryPatientRepository, InMemoryDoctorRepository
+from app.infraestructure.adapters.ejecutor import ExecutorPatientRepository, ExecutorDoctorRepository
+from app.infraestructure.api.compresion import CompresionMiddleware
+from app.infraestructure.api.controller import PatientController, DoctorController
+from bench.cliente_asgi import peticion
+
+
+def crear_app(registros: int) -> FastAPI:
+    pacientes = InMemoryPatientRepository()
+    pacientes.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(registros)])
+    doctores = InMemoryDoctorRepository()
+    doctores.guardar_lote([Doctor(nombre=f"Doctor {i}", especialidad="Cardiología", email=f"d{i}@clinica.mx")
+                           for i in range(registros)])
+    app = FastAPI()
+    app.include_router(PatientController(AsyncPatientService(ExecutorPatientRepository(pacientes))).router)
+    app.include_router(DoctorController(AsyncDoctorService(ExecutorDoctorRepository(doctores), CacheLRU())).router)
+    app.add_middleware(CompresionMiddleware)
+    return app
+
+
+async def medir(app, ruta: str, cabeceras, repeticiones: int):
+    await peticion(app, "GET", ruta, cabeceras=cabeceras, guardar_cuerpo=False)
+    recibidos = 0
+    cpu = time.process_time()
+    for _ in range(repeticiones):
+        respuesta = await peticion(app, "GET", ruta, cabeceras=cabeceras, guardar_cuerpo=False)
+        assert respuesta.status == 200, respuesta.status
+        recibidos += respuesta.bytes_recibidos
+    return (time.process_time() - cpu) / repeticiones * 1000, recibidos // repeticiones
+
+
+def main(registros: int, repeticiones: int) -> None:
+    app = crear_app(registros)
+    print(f"{'ruta':>32} {'codificación':>13} {'bytes':>10} {'ms CPU/petición':>16}")
+    for ruta in ("/pacientes/", "/pacientes/export", "/doctores/especialidad/cardiología"):
+        for codificacion in ("identity", "gzip", "deflate"):
+            ms, recibidos = asyncio.run(medir(app, ruta, {"Accept-Encoding": codificacion}, repeticiones))
+            print(f"{ruta:>32} {codificacion:>13} {recibidos:>10} {ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [10_000, 20][len(argumentos):]))
@@ -0,0 +1,60 @@
+"""Coste de CPU de los endpoints sondeados: GET completo contra GET condicional (304).
+
+Un panel que sondea repite la petición con el ETag de la respuesta anterior.
+"antes" es la petición sin If-None-Match (se serializa todo cada vez);
+"después" la envía y, sin cambios en la colección, recibe un 304 vacío.
+
+Uso: python -m bench.bench_condicional [doctores] [repeticiones]
+"""
+import asyncio
+import sys
+import time
+from fastapi import FastAPI
+from app.domain.core.models import Doctor
+from app.infraestructure.adapters.database import InMemoryDoctorRepository
+from app.application.services.doctor_service import AsyncDoctorService
+from app.infraestructure.adapters.ejecutor import ExecutorDoctorRepository
+from app.infraestructure.api.controller import DoctorController
+from bench.cliente_asgi import peticion
+
+
+def crear_app(doctores: int):
+    repo = InMemoryDoctorRepository()
+    guardados = repo.guardar_lote([
+        Doctor(nombre=f"Doctor {i}", especialidad="Cardiología", email=f"d{i}@clinica.mx")
+        for i in range(doctores)
+    ])
+    app = FastAPI()
+    app.include_router(DoctorController(AsyncDoctorService(ExecutorDoctorRepository(repo))).router)
+    return app, guardados[0].id
+
+
+async def medir(app, ruta: str, repeticiones: int, condicional: bool):
+    primera = await peticion(app, "GET", ruta)
+    assert primera.status == 200, primera.body
+    cabeceras = {"If-None-Match": primera.cabecera("ETag")} if condicional else None
+    esperado = 304 if condicional else 200
+    recibidos = 0
+    cpu = time.process_time()
+    for _ in range(repeticiones):
+        respuesta = await peticion(app, "GET", ruta, cabeceras=cabeceras)
+        assert respuesta.status == esperado, respuesta.status
+        recibidos += respuesta.bytes_recibidos
+    return (time.process_time() - cpu) / repeticiones * 1000, recibidos // repeticiones
+
+
+def main(doctores: int, repeticiones: int) -> None:
+    app, doctor_id = crear_app(doctores)
+    print(f"{'ruta':>28} {'variante':>9} {'ms CPU/petición':>16} {'bytes':>9}")
+    for ruta in ("/doctores/", f"/doctores/{doctor_id}", "/doctores/especialidad/cardiología"):
+        antes = asyncio.run(medir(app, ruta, repeticiones, condicional=False))
+        despues = asyncio.run(medir(app, ruta, repeticiones, condicional=True))
+        nombre = ruta if len(ruta) <= 28 else ruta[:25] + "..."
+        print(f"{nombre:>28} {'antes':>9} {antes[0]:>16.3f} {antes[1]:>9}")
+        print(f"{nombre:>28} {'después':>9} {despues[0]:>16.3f} {despues[1]:>9}")
+        print(f"{'':>28} reducción: {antes[0] / despues[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [10_000, 50][len(argumentos):]))
@@ -0,0 +1,97 @@
+"""Próximas franjas libres de una especialidad: doctor a doctor contra la mezcla con montón.
+
+Cada doctor de la especialidad tiene ocupada una fracción de las franjas de
+media hora de los primeros días. "doctor a doctor" saca las primeras
+`cantidad` franjas de cada doctor y ordena el conjunto, que es lo que
+haría falta con buscar_por_especialidad y la agenda de cada uno;
+CitaService.proximos_huecos mezcla las agendas con un montón y solo abre
+las de los doctores que pueden aportar alguna franja. Se busca desde la
+apertura del primer día y desde las 22:00 de la víspera, fuera de la jornada.
+
+Uso: python -m bench.bench_disponibilidad [doctores...]
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import islice, product
+from app.domain.core.models import paciente, Doctor
+from app.application.services.cita_service import APERTURA, CIERRE, DIAS_BUSQUEDA, CitaService
+from app.infraestructure.adapters.database import (
+    InMemoryPatientRepository,
+    InMemoryDoctorRepository,
+    InMemoryCitaRepository
+)
+from app.infraestructure.adapters.ejecutor import ExecutorDoctorRepository, ExecutorPatientRepository
+
+
+DOCTORES = [100, 1_000, 5_000]
+CANTIDADES = [1, 10, 100]
+PRIMER_DIA = datetime(2026, 11, 2)
+DURACION = timedelta(minutes=30)
+FRANJAS_POR_DIA = 24
+DIAS_OCUPADOS = 3
+
+
+async def poblar(doctores: int, ocupacion: float) -> CitaService:
+    pacientes = InMemoryPatientRepository()
+    titular = pacientes.guardar(paciente(nombre="Paciente", email="p@clinica.org"))
+    medicos = InMemoryDoctorRepository()
+    medicos.guardar_lote([Doctor(nombre=f"Doctor {i}", especialidad="Cardiología") for i in range(doctores)])
+    servicio = CitaService(InMemoryCitaRepository(), ExecutorPatientRepository(pacientes),
+                           ExecutorDoctorRepository(medicos))
+    franjas = DIAS_OCUPADOS * FRANJAS_POR_DIA
+    for doctor in medicos.buscar_todos():
+        for franja in random.sample(range(franjas), int(franjas * ocupacion)):
+            dia, hora = divmod(franja, FRANJAS_POR_DIA)
+            inicio = PRIMER_DIA + timedelta(days=dia, hours=APERTURA.hour) + hora * DURACION
+            await servicio.agendar_cita(doctor.id, titular.id, inicio, inicio + DURACION)
+    return servicio
+
+
+async def doctor_a_doctor(servicio: CitaService, desde: datetime, cantidad: int):
+    franjas = []
+    for orden, doctor in enumerate(await servicio.doctor_repository.buscar_por_especialidad("cardiología")):
+        for inicio, fin in islice(servicio._franjas(doctor.id, desde, DURACION, APERTURA, CIERRE, DIAS_BUSQUEDA),
+                                  cantidad):
+            franjas.append((inicio, orden, fin, doctor))
+    franjas.sort(key=lambda franja: franja[:2])
+    return [(doctor, inicio, fin) for inicio, _, fin, doctor in franjas[:cantidad]]
+
+
+async def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        await funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+async def principal(doctores_por_prueba) -> None:
+    random.seed(1)
+    inicios = {"apertura": PRIMER_DIA + timedelta(hours=APERTURA.hour),
+               "víspera 22h": PRIMER_DIA - timedelta(hours=2)}
+    print(f"{'doctores':>9} {'ocupación':>10} {'desde':>12} {'cantidad':>9} {'doctor a doctor (ms)':>21} "
+          f"{'montón (ms)':>12}")
+    for doctores in doctores_por_prueba:
+        # Con 100% los primeros días están llenos: todos los doctores aportan
+        # franjas del primer día libre y el montón tiene que abrirlos todos
+        for ocupacion in (0.5, 0.9, 1.0):
+            servicio = await poblar(doctores, ocupacion)
+            for (nombre, desde), cantidad in product(inicios.items(), CANTIDADES):
+                esperado = await doctor_a_doctor(servicio, desde, cantidad)
+                assert await servicio.proximos_huecos("cardiología", desde, cantidad, DURACION) == esperado
+                repeticiones = max(1, 20_000 // doctores)
+                antes = await medir(lambda: doctor_a_doctor(servicio, desde, cantidad), repeticiones)
+                despues = await medir(lambda: servicio.proximos_huecos("cardiología", desde, cantidad, DURACION),
+                                      repeticiones)
+                print(f"{doctores:>9} {ocupacion:>10.0%} {nombre:>12} {cantidad:>9} {antes:>21.3f} "
+                      f"{despues:>12.3f}")
+
+
+def main(doctores_por_prueba) -> None:
+    asyncio.run(principal(doctores_por_prueba))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DOCTORES)
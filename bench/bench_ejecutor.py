@@ -0,0 +1,93 @@
+"""Latencia de /health mientras otras peticiones esperan a SQLite: en el bucle o en el EjecutorAcotado.
+
+LENTAS clientes piden sin parar páginas de GET /pacientes/ sobre SQLite
+y otro sondea /health. "en el bucle" llama al repositorio directamente,
+como hacían los servicios síncronos: cada consulta detiene el bucle de
+eventos y la sonda espera a que termine. "ejecutor" la lleva a los hilos
+del EjecutorAcotado y el bucle sigue respondiendo mientras tanto. La
+latencia de la sonda se cuenta desde que toca cada sondeo, así que incluye
+la espera hasta que el bucle vuelve a ella. Las páginas por segundo bajan
+algo con el ejecutor: cada consulta cambia de hilo y compite por el GIL.
+
+Uso: python -m bench.bench_ejecutor [registros] [sondeos]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from fastapi import FastAPI
+from app.domain.core.models import paciente
+from app.application.services.patient_service import AsyncPatientService
+from app.infraestructure.adapters.ejecutor import EjecutorAcotado, ExecutorPatientRepository
+from app.infraestructure.adapters.sqlite import SqlitePatientRepository
+from app.infraestructure.api.controller import PatientController, MANEJADORES_ALMACENAMIENTO
+from bench.cliente_asgi import peticion
+
+
+LENTAS = 8
+PAGINA = 1000
+# Pausa entre sondeos de /health, en segundos
+INTERVALO = 0.005
+
+
+def crear_app(repo, ejecutor) -> FastAPI:
+    app = FastAPI()
+    app.include_router(PatientController(AsyncPatientService(ExecutorPatientRepository(repo, ejecutor))).router)
+    for excepcion, manejador in MANEJADORES_ALMACENAMIENTO.items():
+        app.add_exception_handler(excepcion, manejador)
+
+    @app.get("/health")
+    async def health():
+        return {"estado": "activo"}
+
+    return app
+
+
+async def medir(app, sondeos: int):
+    terminado = False
+    paginas = 0
+
+    async def lenta():
+        nonlocal paginas
+        while not terminado:
+            respuesta = await peticion(app, "GET", f"/pacientes/?limit={PAGINA}", guardar_cuerpo=False)
+            assert respuesta.status == 200, respuesta.status
+            paginas += 1
+            # Sin esperas reales (repositorio en el bucle) la tarea no cedería nunca el turno
+            await asyncio.sleep(0)
+
+    clientes = [asyncio.create_task(lenta()) for _ in range(LENTAS)]
+    await asyncio.sleep(0.1)
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(sondeos):
+        # Cuenta desde que toca sondear: incluye lo que el bucle tarda en volver a la sonda
+        antes = time.perf_counter() + INTERVALO
+        await asyncio.sleep(INTERVALO)
+        respuesta = await peticion(app, "GET", "/health")
+        latencias.append((time.perf_counter() - antes) * 1000)
+        assert respuesta.status == 200, respuesta.status
+    segundos = time.perf_counter() - inicio
+    terminado = True
+    await asyncio.gather(*clientes)
+    latencias.sort()
+    return latencias[len(latencias) // 2], latencias[int(len(latencias) * 0.99)], paginas / segundos
+
+
+def main(registros: int, sondeos: int) -> None:
+    repo = SqlitePatientRepository(f"{tempfile.mkdtemp()}/pacientes.db")
+    repo.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(registros)])
+    print(f"{'variante':>12} {'/health p50 (ms)':>17} {'/health p99 (ms)':>17} {'páginas/s':>10}")
+    for nombre in ("en el bucle", "ejecutor"):
+        ejecutor = EjecutorAcotado() if nombre == "ejecutor" else None
+        try:
+            p50, p99, por_segundo = asyncio.run(medir(crear_app(repo, ejecutor), sondeos))
+        finally:
+            if ejecutor is not None:
+                ejecutor.cerrar()
+        print(f"{nombre:>12} {p50:>17.2f} {p99:>17.2f} {por_segundo:>10.0f}")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [20_000, 200][len(argumentos):]))
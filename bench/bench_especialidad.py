@@ -0,0 +1,53 @@
+"""Latencia de buscar_por_especialidad: recorrido lineal contra índice.
+
+Uso: python -m bench.bench_especialidad [tamaños...]
+"""
+import sys
+import time
+from app.domain.core.models import Doctor
+from app.infraestructure.adapters.database import InMemoryDoctorRepository
+
+
+ESPECIALIDADES = [
+    "Cardiología", "Pediatría", "Neurología", "Dermatología", "Oncología",
+    "Ginecología", "Traumatología", "Oftalmología", "Psiquiatría", "Urología",
+]
+TAMANOS = [1_000, 100_000, 1_000_000]
+
+
+def recorrido_lineal(repo: InMemoryDoctorRepository, especialidad: str):
+    # Implementación anterior al índice
+    return [doc for doc in repo.doctors.values()
+            if doc.especialidad.lower() == especialidad.lower()]
+
+
+def poblar(n: int) -> InMemoryDoctorRepository:
+    repo = InMemoryDoctorRepository()
+    # Una especialidad rara para medir el caso de pocas coincidencias
+    repo.guardar(Doctor(nombre="Dr. Único", especialidad="Genética"))
+    for i in range(n - 1):
+        repo.guardar(Doctor(nombre=f"Doctor {i}",
+                            especialidad=ESPECIALIDADES[i % len(ESPECIALIDADES)]))
+    return repo
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main(tamanos):
+    print(f"{'doctores':>10} {'consulta':>12} {'antes (ms)':>12} {'después (ms)':>13}")
+    for n in tamanos:
+        repo = poblar(n)
+        repeticiones = max(1, 100_000 // n)
+        for especialidad in ("genética", "cardiología"):
+            antes = medir(lambda: recorrido_lineal(repo, especialidad), repeticiones)
+            despues = medir(lambda: repo.buscar_por_especialidad(especialidad), repeticiones)
+            print(f"{n:>10} {especialidad:>12} {antes:>12.3f} {despues:>13.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or TAMANOS)
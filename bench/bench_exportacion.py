@@ -0,0 +1,51 @@
+"""Pico de RSS y tiempo al primer byte: GET /pacientes/ contra /pacientes/export.
+
+Cada modo corre en un proceso aparte para que el pico de memoria de uno
+no contamine al otro.
+
+Uso: python -m bench.bench_exportacion [filas]
+"""
+import asyncio
+import resource
+import subprocess
+import sys
+from app.domain.core.models import paciente
+
+
+RUTAS = {"lista": "/pacientes/", "export": "/pacientes/export"}
+
+
+def _rss_pico_mb() -> float:
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir(modo: str, filas: int) -> None:
+    import main
+    from bench.cliente_asgi import peticion
+
+    for i in range(filas):
+        main.patient_repository.guardar(paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.mx"))
+    rss_base = _rss_pico_mb()
+    respuesta = asyncio.run(
+        peticion(main.app_patients, "GET", RUTAS[modo], guardar_cuerpo=False)
+    )
+    print(f"{modo:>7} {filas:>9} {respuesta.status:>6} "
+          f"{respuesta.segundos_primer_byte * 1000:>10.1f} {respuesta.segundos_total:>9.2f} "
+          f"{respuesta.bytes_recibidos / 2**20:>9.1f} {_rss_pico_mb() - rss_base:>12.1f}")
+
+
+def main(filas: int) -> None:
+    print(f"{'modo':>7} {'filas':>9} {'status':>6} {'TTFB (ms)':>10} {'total (s)':>9} "
+          f"{'MiB env':>9} {'+RSS (MiB)':>12}", flush=True)
+    for modo in RUTAS:
+        subprocess.run([sys.executable, "-m", "bench.bench_exportacion", "--modo", modo, str(filas)],
+                       check=True)
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    if argumentos[:1] == ["--modo"]:
+        medir(argumentos[1], int(argumentos[2]))
+    else:
+        main(int(argumentos[0]) if argumentos else 1_000_000)
@@ -0,0 +1,96 @@
+"""Latencia de /health mientras se sirve GET /pacientes/ con 500k pacientes.
+
+Un cliente pide sin parar el listado completo y otro sondea /health cada
+INTERVALO segundos, en el mismo bucle de eventos. "antes" reproduce el
+manejador original: serializa la lista de una vez y, con gzip, la comprime
+también de una vez dentro del bucle. "después" es el PatientController
+actual detrás de CompresionMiddleware: serializa por trozos cediendo el
+bucle entre ellos y comprime los cuerpos grandes en otro hilo. La latencia
+de la sonda se cuenta desde que toca cada sondeo, así que incluye la espera
+hasta que el bucle vuelve a ella.
+
+Uso: python -m bench.bench_listado [pacientes] [sondeos]
+"""
+import asyncio
+import sys
+import time
+from fastapi import FastAPI, Header
+from typing import Optional
+from app.domain.core.models import paciente
+from app.application.services.patient_service import AsyncPatientService
+from app.infraestructure.adapters.database import InMemoryPatientRepository
+from app.infraestructure.adapters.ejecutor import ExecutorPatientRepository
+from app.infraestructure.api.compresion import CompresionMiddleware, comprimir, elegir_codificacion
+from app.infraestructure.api.controller import PatientController
+from app.infraestructure.api.serializacion import RespuestaJSON, pacientes_json
+from bench.cliente_asgi import peticion
+
+
+# Pausa entre sondeos de /health y entre listados, en segundos
+INTERVALO = 0.005
+
+
+def crear_app(registros: int) -> FastAPI:
+    repo = InMemoryPatientRepository()
+    repo.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(registros)])
+    service = AsyncPatientService(ExecutorPatientRepository(repo))
+    app = FastAPI()
+    app.include_router(PatientController(service).router)
+    app.add_middleware(CompresionMiddleware)
+
+    @app.get("/antes/pacientes/")
+    async def listar_pacientes_antes(accept_encoding: Optional[str] = Header(None)):
+        cuerpo = pacientes_json(await service.listar_pacientes())
+        codificacion = elegir_codificacion(accept_encoding)
+        if codificacion is None:
+            return RespuestaJSON(cuerpo)
+        return RespuestaJSON(comprimir(cuerpo, codificacion), headers={"Content-Encoding": codificacion})
+
+    @app.get("/health")
+    async def health():
+        return {"estado": "activo"}
+
+    return app
+
+
+async def medir(app, ruta: str, cabeceras: Optional[dict], sondeos: int):
+    terminado = False
+    listados = []
+
+    async def listar():
+        while not terminado:
+            respuesta = await peticion(app, "GET", ruta, cabeceras=cabeceras, guardar_cuerpo=False)
+            assert respuesta.status == 200, respuesta.status
+            listados.append(respuesta.segundos_total)
+            await asyncio.sleep(INTERVALO)
+
+    cliente = asyncio.create_task(listar())
+    latencias = []
+    for _ in range(sondeos):
+        antes = time.perf_counter() + INTERVALO
+        await asyncio.sleep(INTERVALO)
+        respuesta = await peticion(app, "GET", "/health")
+        latencias.append((time.perf_counter() - antes) * 1000)
+        assert respuesta.status == 200, respuesta.status
+    terminado = True
+    await cliente
+    latencias.sort()
+    return (latencias[len(latencias) // 2], latencias[int(len(latencias) * 0.99)], latencias[-1],
+            sum(listados) / len(listados) * 1000)
+
+
+def main(registros: int, sondeos: int) -> None:
+    app = crear_app(registros)
+    print(f"{'variante':>16} {'/health p50 (ms)':>17} {'/health p99 (ms)':>17} {'máx (ms)':>9} "
+          f"{'listado (ms)':>13}")
+    for codificacion in (None, "gzip"):
+        cabeceras = {"Accept-Encoding": codificacion} if codificacion else None
+        for nombre, ruta in (("antes", "/antes/pacientes/"), ("después", "/pacientes/")):
+            p50, p99, maximo, listado = asyncio.run(medir(app, ruta, cabeceras, sondeos))
+            variante = f"{nombre} {codificacion or 'sin comprimir'}"
+            print(f"{variante:>16} {p50:>17.2f} {p99:>17.2f} {maximo:>9.1f} {listado:>13.0f}")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [500_000, 40][len(argumentos):]))
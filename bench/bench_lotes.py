@@ -0,0 +1,55 @@
+"""Filas por segundo: POST /pacientes/ uno a uno contra POST /pacientes/batch.
+
+Uso: python -m bench.bench_lotes [filas] [tamaño_lote]
+"""
+import asyncio
+import sys
+import time
+from fastapi import FastAPI
+from app.application.services.patient_service import AsyncPatientService
+from app.infraestructure.adapters.database import InMemoryPatientRepository
+from app.infraestructure.adapters.ejecutor import ExecutorPatientRepository
+from app.infraestructure.api.controller import PatientController
+from bench.cliente_asgi import peticion
+
+
+def crear_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(PatientController(AsyncPatientService(ExecutorPatientRepository(InMemoryPatientRepository()))).router)
+    return app
+
+
+async def uno_a_uno(app, filas):
+    for i in range(filas):
+        respuesta = await peticion(app, "POST", "/pacientes/",
+                                   {"nombre": f"Paciente {i}", "email": f"p{i}@clinica.mx"})
+        assert respuesta.status == 200, respuesta.body
+
+
+async def por_lotes(app, filas, tamano_lote):
+    for inicio in range(0, filas, tamano_lote):
+        lote = [{"nombre": f"Paciente {i}", "email": f"p{i}@clinica.mx"}
+                for i in range(inicio, min(filas, inicio + tamano_lote))]
+        respuesta = await peticion(app, "POST", "/pacientes/batch", lote)
+        assert respuesta.status == 200, respuesta.body
+
+
+def medir(corrutina) -> float:
+    inicio = time.perf_counter()
+    asyncio.run(corrutina)
+    return time.perf_counter() - inicio
+
+
+def main(filas: int, tamano_lote: int) -> None:
+    # Cada modo usa una aplicación y un repositorio vacío recién creados
+    segundos_uno = medir(uno_a_uno(crear_app(), filas))
+    segundos_lote = medir(por_lotes(crear_app(), filas, tamano_lote))
+    print(f"{'modo':>12} {'filas':>8} {'segundos':>9} {'filas/s':>10}")
+    print(f"{'uno a uno':>12} {filas:>8} {segundos_uno:>9.2f} {filas / segundos_uno:>10.0f}")
+    print(f"{'lote ' + str(tamano_lote):>12} {filas:>8} {segundos_lote:>9.2f} {filas / segundos_lote:>10.0f}")
+    print(f"aceleración: {segundos_uno / segundos_lote:.1f}x")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [20_000, 1000][len(argumentos):]))
@@ -0,0 +1,69 @@
+"""Arranque con instantánea mapeada (mmap) frente a cargarla en memoria, y
+latencia de lectura por id y por página en cada caso.
+
+Uso: python -m bench.bench_mapeado [tamaños separados por coma] [directorio]
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from app.domain.core.models import paciente
+from app.infraestructure.adapters.mapeado import MmapPatientRepository
+from app.infraestructure.adapters.persistente import PersistentPatientRepository
+
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+CONSULTAS = 2000
+TAMANO_PAGINA = 50
+TAMANO_LOTE = 10_000
+
+
+def poblar(repo, registros: int):
+    for inicio in range(0, registros, TAMANO_LOTE):
+        repo.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org")
+                           for i in range(inicio, min(registros, inicio + TAMANO_LOTE))])
+    repo.instantanea()
+
+
+def latencias(funcion, argumentos) -> str:
+    tiempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcion(argumento)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return f"p50 {statistics.median(tiempos):.3f} ms  p99 {tiempos[int(len(tiempos) * 0.99)]:.3f} ms"
+
+
+def medir(nombre: str, clase, directorio: str):
+    inicio = time.perf_counter()
+    repo = clase(directorio, "nunca")
+    arranque = time.perf_counter() - inicio
+    ids = [patient.id for patient, _ in zip(repo.buscar_todos(), range(CONSULTAS * 10))]
+    muestra = random.sample(ids, min(CONSULTAS, len(ids)))
+    print(f"  {nombre:<12} arranque {arranque * 1000:9.1f} ms")
+    print(f"  {'':<12} por id   {latencias(repo.buscar_por_id, muestra)}")
+    print(f"  {'':<12} página   {latencias(lambda cursor: repo.buscar_pagina(cursor, TAMANO_PAGINA), muestra)}")
+    repo.cerrar()
+
+
+def main(tamanos, base: str):
+    for registros in tamanos:
+        print(f"# {registros} pacientes")
+        for nombre, clase in (("persistente", PersistentPatientRepository), ("mapeado", MmapPatientRepository)):
+            directorio = tempfile.mkdtemp(dir=base)
+            repo = clase(directorio, "nunca", operaciones_por_instantanea=registros * 10)
+            poblar(repo, registros)
+            repo.cerrar()
+            del repo
+            medir(nombre, clase, directorio)
+            shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    tamanos = [int(valor) for valor in sys.argv[1].split(",")] if len(sys.argv) > 1 else TAMANOS
+    base = sys.argv[2] if len(sys.argv) > 2 else os.getcwd()
+    main(tamanos, base)
@@ -0,0 +1,84 @@
+"""Bytes por registro retenidos por los repositorios en memoria.
+
+- antes:    dataclass sin slots (como el modelo original) en InMemory*Repository
+- slots:    modelos actuales del dominio en InMemory*Repository
+- compacto: Compact*Repository (UUID como entero, fecha en epoch, especialidad internada)
+- columnar: Columnar*Repository (un array por campo y textos en arenas de bytes)
+
+Uso: python -m bench.bench_memoria [registros]
+"""
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from app.domain.core.models import paciente, Doctor
+from app.infraestructure.adapters.database import InMemoryPatientRepository, InMemoryDoctorRepository
+from app.infraestructure.adapters.compacto import CompactPatientRepository, CompactDoctorRepository
+from app.infraestructure.adapters.columnar import ColumnarPatientRepository, ColumnarDoctorRepository
+
+
+ESPECIALIDADES = ["Cardiología", "Pediatría", "Neurología", "Dermatología", "Oncología"]
+
+
+@dataclass
+class PacienteAntes:
+    id: Optional[str] = None
+    nombre: str = ""
+    email: str = ""
+    fecha_creacion: Optional[datetime] = None
+
+
+@dataclass
+class DoctorAntes:
+    id: Optional[str] = None
+    nombre: str = ""
+    especialidad: str = ""
+    email: Optional[str] = None
+    fecha_creacion: Optional[datetime] = None
+
+
+def pacientes(clase, n):
+    return [clase(nombre=f"Paciente {i}", email=f"paciente{i}@clinica.mx") for i in range(n)]
+
+
+def doctores(clase, n):
+    # La especialidad llega como texto nuevo en cada petición, no compartido
+    return [clase(nombre=f"Doctor {i}", especialidad="".join(ESPECIALIDADES[i % 5]),
+                  email=f"doctor{i}@clinica.mx") for i in range(n)]
+
+
+def bytes_por_registro(crear_repo, crear_registros, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    repo = crear_repo()
+    # Uno a uno, como POST /pacientes/: cada registro con su propia fecha
+    for registro in crear_registros(n):
+        repo.guardar(registro)
+    gc.collect()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del repo
+    return actual / n
+
+
+def main(n: int) -> None:
+    casos = [
+        ("pacientes", "antes", InMemoryPatientRepository, lambda k: pacientes(PacienteAntes, k)),
+        ("pacientes", "slots", InMemoryPatientRepository, lambda k: pacientes(paciente, k)),
+        ("pacientes", "compacto", CompactPatientRepository, lambda k: pacientes(paciente, k)),
+        ("pacientes", "columnar", ColumnarPatientRepository, lambda k: pacientes(paciente, k)),
+        ("doctores", "antes", InMemoryDoctorRepository, lambda k: doctores(DoctorAntes, k)),
+        ("doctores", "slots", InMemoryDoctorRepository, lambda k: doctores(Doctor, k)),
+        ("doctores", "compacto", CompactDoctorRepository, lambda k: doctores(Doctor, k)),
+        ("doctores", "columnar", ColumnarDoctorRepository, lambda k: doctores(Doctor, k)),
+    ]
+    print(f"{'colección':>10} {'modelo':>9} {'registros':>10} {'bytes/registro':>15}")
+    for coleccion, modelo, crear_repo, crear_registros in casos:
+        print(f"{coleccion:>10} {modelo:>9} {n:>10} "
+              f"{bytes_por_registro(crear_repo, crear_registros, n):>15.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
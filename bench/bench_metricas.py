@@ -0,0 +1,122 @@
+"""Coste de MetricasMiddleware sobre una ruta mínima.
+
+La misma ruta "hola mundo" con y sin el middleware, en tandas cortas
+alternas para que la deriva del equipo afecte igual a las dos variantes:
+
+- asgi: en el proceso, sin red; mediana del tiempo por petición de las
+  tandas. Solo cuenta el trabajo de la aplicación, así que es la cota
+  más pesimista.
+- http: cada variante en su propio uvicorn, con un cliente keep-alive; CPU
+  del proceso servidor (de /proc, solo Linux) entre todas las peticiones.
+
+También mide cuánto tarda GET /metrics con las series que dejan las tandas.
+
+Uso: python -m bench.bench_metricas [peticiones_por_tanda] [tandas]
+"""
+import asyncio
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from fastapi import FastAPI
+from app.infraestructure.api.metricas import Metricas, MetricasMiddleware
+from bench.cliente_asgi import peticion
+from bench.carga_workers import RAIZ, _esperar_puerto
+
+
+PUERTOS = {False: 8101, True: 8102}
+
+
+def crear_app(con_metricas: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/hola")
+    async def hola():
+        return {"hola": "mundo"}
+
+    if con_metricas:
+        app.add_middleware(MetricasMiddleware, metricas=Metricas())
+    return app
+
+
+async def tanda(app, peticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        respuesta = await peticion(app, "GET", "/hola", guardar_cuerpo=False)
+        assert respuesta.status == 200, respuesta.status
+    return (time.perf_counter() - inicio) / peticiones * 1e6
+
+
+async def medir_asgi(peticiones: int, tandas: int):
+    apps = {False: crear_app(False), True: crear_app(True)}
+    tiempos = {False: [], True: []}
+    for app in apps.values():
+        await tanda(app, peticiones)
+    for _ in range(tandas):
+        for con_metricas, app in apps.items():
+            tiempos[con_metricas].append(await tanda(app, peticiones))
+    inicio = time.perf_counter()
+    respuesta = await peticion(apps[True], "GET", "/metrics")
+    exponer = (time.perf_counter() - inicio) * 1000
+    return statistics.median(tiempos[False]), statistics.median(tiempos[True]), exponer, len(respuesta.body)
+
+
+def _cpu_proceso(pid: int) -> float:
+    # utime + stime, campos 14 y 15 de /proc/<pid>/stat (el nombre puede llevar espacios)
+    campos = open(f"/proc/{pid}/stat").read().rsplit(")", 1)[1].split()
+    return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _servidor(con_metricas: bool) -> subprocess.Popen:
+    codigo = (
+        "import uvicorn; from bench.bench_metricas import crear_app; "
+        f"uvicorn.run(crear_app({con_metricas}), host='127.0.0.1', port={PUERTOS[con_metricas]}, "
+        "log_level='warning', access_log=False)"
+    )
+    return subprocess.Popen([sys.executable, "-c", codigo], cwd=RAIZ)
+
+
+def medir_http(peticiones: int, tandas: int):
+    servidores = {con_metricas: _servidor(con_metricas) for con_metricas in PUERTOS}
+    try:
+        conexiones = {}
+        for con_metricas, puerto in PUERTOS.items():
+            _esperar_puerto(puerto)
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+            conexion.connect()
+            conexion.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conexiones[con_metricas] = conexion
+        cpu = {False: 0.0, True: 0.0}
+        for vuelta in range(tandas + 1):
+            for con_metricas, conexion in conexiones.items():
+                antes = _cpu_proceso(servidores[con_metricas].pid)
+                for _ in range(peticiones):
+                    conexion.request("GET", "/hola")
+                    respuesta = conexion.getresponse()
+                    respuesta.read()
+                    assert respuesta.status == 200, respuesta.status
+                # La primera vuelta solo calienta
+                if vuelta:
+                    cpu[con_metricas] += _cpu_proceso(servidores[con_metricas].pid) - antes
+        return cpu[False] / (peticiones * tandas) * 1e6, cpu[True] / (peticiones * tandas) * 1e6
+    finally:
+        for servidor in servidores.values():
+            servidor.terminate()
+            servidor.wait(timeout=30)
+
+
+def main(peticiones: int, tandas: int) -> None:
+    sin, con, exponer, bytes_metricas = asyncio.run(medir_asgi(peticiones, tandas))
+    print(f"{'modo':>5} {'sin métricas (µs)':>18} {'con métricas (µs)':>18} {'sobrecoste':>11}")
+    print(f"{'asgi':>5} {sin:>18.1f} {con:>18.1f} {(con - sin) / sin:>11.2%}")
+    sin, con = medir_http(peticiones, tandas // 4 or 1)
+    print(f"{'http':>5} {sin:>18.1f} {con:>18.1f} {(con - sin) / sin:>11.2%}")
+    print(f"GET /metrics: {exponer:.2f} ms, {bytes_metricas} bytes")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [200, 400][len(argumentos):]))
@@ -0,0 +1,102 @@
+"""Registro de escritura e instantáneas: rendimiento de escritura por política
+de sincronización y tiempo de recuperación.
+
+Uso: python -m bench.bench_persistencia [registros_recuperacion] [directorio]
+
+El directorio debe estar en el disco real (no tmpfs) para que fsync cueste lo
+que cuesta en producción; por defecto se usa un temporal junto al proyecto.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from app.domain.core.models import paciente
+from app.infraestructure.adapters.database import InMemoryPatientRepository
+from app.infraestructure.adapters.persistente import PersistentPatientRepository
+from app.infraestructure.adapters.registro_escritura import POLITICAS
+
+
+ESCRITURAS = 4000
+HILOS = [1, 8]
+REGISTROS_RECUPERACION = 1_000_000
+TAMANO_LOTE = 10_000
+
+
+def escribir(repo, hilos: int, total: int) -> float:
+    # `total` altas individuales repartidas entre `hilos` hilos; devuelve escrituras/s
+    por_hilo = total // hilos
+
+    def trabajo(k: int):
+        for i in range(por_hilo):
+            repo.guardar(paciente(nombre=f"Paciente {k} {i}", email=f"p{k}.{i}@clinica.org"))
+
+    trabajadores = [threading.Thread(target=trabajo, args=(k,)) for k in range(hilos)]
+    inicio = time.perf_counter()
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    return por_hilo * hilos / (time.perf_counter() - inicio)
+
+
+def rendimiento(base: str):
+    print(f"{'política':>10} {'hilos':>6} {'escrituras/s':>13} {'fsync':>7}")
+    for hilos in HILOS:
+        print(f"{'sin WAL':>10} {hilos:>6} {escribir(InMemoryPatientRepository(), hilos, ESCRITURAS):>13.0f} {'-':>7}")
+        for politica in POLITICAS:
+            directorio = tempfile.mkdtemp(dir=base)
+            repo = PersistentPatientRepository(directorio, politica)
+            por_segundo = escribir(repo, hilos, ESCRITURAS)
+            sincronizaciones = repo._almacen.registro.sincronizaciones
+            repo.cerrar()
+            shutil.rmtree(directorio)
+            print(f"{politica:>10} {hilos:>6} {por_segundo:>13.0f} {sincronizaciones:>7}")
+
+
+def recuperacion(base: str, registros: int):
+    directorio = tempfile.mkdtemp(dir=base)
+    repo = PersistentPatientRepository(directorio, "nunca", operaciones_por_instantanea=registros * 10)
+    for inicio in range(0, registros, TAMANO_LOTE):
+        repo.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org")
+                           for i in range(inicio, min(registros, inicio + TAMANO_LOTE))])
+    inicio = time.perf_counter()
+    repo.instantanea()
+    print(f"# instantánea de {registros} registros: {time.perf_counter() - inicio:.2f} s")
+    # Cola del registro posterior a la instantánea: un 10 % de cambios
+    cola = registros // 10
+    ids = repo._ids()[:cola]
+    for inicio in range(0, cola, TAMANO_LOTE):
+        cambios = [repo.buscar_por_id(patient_id) for patient_id in ids[inicio:inicio + TAMANO_LOTE]]
+        for patient in cambios:
+            patient.nombre = patient.nombre + " (actualizado)"
+        repo.actualizar_lote(cambios)
+    repo.cerrar()
+    tamanos = {nombre: os.path.getsize(os.path.join(directorio, nombre)) for nombre in os.listdir(directorio)}
+    for nombre, tamano in sorted(tamanos.items()):
+        print(f"# {nombre}: {tamano / 2 ** 20:.1f} MiB")
+    del repo
+
+    inicio = time.perf_counter()
+    repo = PersistentPatientRepository(directorio)
+    arranque = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    repo.buscar_texto("paciente", 1)
+    indice = time.perf_counter() - inicio
+    assert len(repo.patients) == registros
+    print(f"recuperación de {registros} registros + {cola} en el registro: {arranque:.2f} s")
+    print(f"índice de texto (primera búsqueda): {indice:.2f} s")
+    repo.cerrar()
+    shutil.rmtree(directorio)
+
+
+def main(registros: int, base: str):
+    rendimiento(base)
+    recuperacion(base, registros)
+
+
+if __name__ == "__main__":
+    registros = int(sys.argv[1]) if len(sys.argv) > 1 else REGISTROS_RECUPERACION
+    base = sys.argv[2] if len(sys.argv) > 2 else os.getcwd()
+    main(registros, base)
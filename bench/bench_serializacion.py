@@ -0,0 +1,69 @@
+"""GET /doctores/ con 10k doctores: respuesta construida fila a fila contra serializador precompilado.
+
+La ruta "antes" reproduce el manejador original: un DoctorResponse por fila
+que FastAPI vuelve a validar y serializar. La ruta "después" es la del
+DoctorController actual.
+
+Uso: python -m bench.bench_serializacion [doctores] [repeticiones]
+"""
+import asyncio
+import sys
+import time
+from typing import List
+from fastapi import FastAPI
+from app.domain.core.models import Doctor
+from app.infraestructure.adapters.database import InMemoryDoctorRepository
+from app.application.services.doctor_service import AsyncDoctorService
+from app.infraestructure.adapters.ejecutor import ExecutorDoctorRepository
+from app.infraestructure.api.controller import DoctorController, DoctorResponse
+from bench.cliente_asgi import peticion
+
+
+def crear_app(doctores: int) -> FastAPI:
+    repo = InMemoryDoctorRepository()
+    repo.guardar_lote([
+        Doctor(nombre=f"Doctor {i}", especialidad="Cardiología", email=f"d{i}@clinica.mx")
+        for i in range(doctores)
+    ])
+    service = AsyncDoctorService(ExecutorDoctorRepository(repo))
+    app = FastAPI()
+    app.include_router(DoctorController(service).router)
+
+    @app.get("/antes/doctores/")
+    async def listar_doctores_antes() -> List[DoctorResponse]:
+        return [
+            DoctorResponse(
+                id=d.id,
+                nombre=d.nombre,
+                especialidad=d.especialidad,
+                email=d.email,
+                fecha_creacion=d.fecha_creacion.isoformat() if d.fecha_creacion else None
+            )
+            for d in await service.listar_doctores()
+        ]
+
+    return app
+
+
+async def medir(app, ruta: str, repeticiones: int) -> float:
+    primera = await peticion(app, "GET", ruta)
+    assert primera.status == 200, primera.body
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        await peticion(app, "GET", ruta)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main(doctores: int, repeticiones: int) -> None:
+    app = crear_app(doctores)
+    antes = asyncio.run(medir(app, "/antes/doctores/", repeticiones))
+    despues = asyncio.run(medir(app, "/doctores/", repeticiones))
+    print(f"{'ruta':>8} {'doctores':>9} {'ms/petición':>12}")
+    print(f"{'antes':>8} {doctores:>9} {antes:>12.2f}")
+    print(f"{'después':>8} {doctores:>9} {despues:>12.2f}")
+    print(f"aceleración: {antes / despues:.1f}x")
+
+
+if __name__ == "__main__":
+    argumentos = [int(arg) for arg in sys.argv[1:]]
+    main(*(argumentos + [10_000, 20][len(argumentos):]))
@@ -0,0 +1,74 @@
+"""Operaciones por segundo de los repositorios de doctores bajo carga concurrente.
+
+Mezcla por operación: 70% buscar_por_id, 20% buscar_por_especialidad y
+10% guardar, repartida entre N hilos durante unos segundos.
+
+Uso: python -m bench.bench_sqlite [doctores] [segundos]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from app.domain.core.models import Doctor
+from app.infraestructure.adapters.database import InMemoryDoctorRepository
+from app.infraestructure.adapters.sqlite import SqliteDoctorRepository
+
+
+ESPECIALIDADES = ["Cardiología", "Pediatría", "Neurología", "Dermatología", "Oncología",
+                  "Ginecología", "Traumatología", "Oftalmología", "Psiquiatría", "Urología",
+                  "Genética", "Nefrología", "Endocrinología", "Reumatología", "Neumología",
+                  "Hematología", "Infectología", "Geriatría", "Radiología", "Anestesiología"]
+HILOS = [1, 2, 4, 8]
+
+
+def carga(repo, ids, segundos, contador, indice):
+    aleatorio = random.Random(indice)
+    operaciones = 0
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        tirada = aleatorio.random()
+        if tirada < 0.7:
+            repo.buscar_por_id(aleatorio.choice(ids))
+        elif tirada < 0.9:
+            repo.buscar_por_especialidad(aleatorio.choice(ESPECIALIDADES))
+        else:
+            repo.guardar(Doctor(nombre="Nuevo", especialidad=aleatorio.choice(ESPECIALIDADES)))
+        operaciones += 1
+    contador[indice] = operaciones
+
+
+def medir(repo, ids, hilos, segundos) -> float:
+    contador = [0] * hilos
+    trabajadores = [threading.Thread(target=carga, args=(repo, ids, segundos, contador, i))
+                    for i in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    return sum(contador) / segundos
+
+
+def main(doctores: int, segundos: float) -> None:
+    with tempfile.TemporaryDirectory() as directorio:
+        repos = {
+            "memoria": InMemoryDoctorRepository(),
+            "sqlite": SqliteDoctorRepository(os.path.join(directorio, "bench.db")),
+        }
+        print(f"{'backend':>8} {'hilos':>6} {'ops/s':>10}")
+        for nombre, repo in repos.items():
+            guardados = repo.guardar_lote([
+                Doctor(nombre=f"Doctor {i}", especialidad=ESPECIALIDADES[i % len(ESPECIALIDADES)])
+                for i in range(doctores)
+            ])
+            ids = [doctor.id for doctor in guardados]
+            for hilos in HILOS:
+                print(f"{nombre:>8} {hilos:>6} {medir(repo, ids, hilos, segundos):>10.0f}", flush=True)
+        repos["sqlite"].conexiones.cerrar()
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    main(int(argumentos[0]) if argumentos else 10_000,
+         float(argumentos[1]) if len(argumentos) > 1 else 2.0)
@@ -0,0 +1,105 @@
+"""Memoria y peticiones por segundo: dos servidores en hilos contra una aplicación compartida.
+
+Arranca `main.py` con CLINICA_MODO=hilos (un uvicorn por API, cada uno con
+su bucle de eventos en un hilo) y con CLINICA_MODO=compartido (un solo
+uvicorn y bucle que escucha en los dos puertos). La mitad de los procesos
+cliente pide pacientes a PUERTO_PACIENTES y la otra mitad doctores a
+PUERTO_DOCTORES, con conexiones keep-alive. La memoria es la residente del
+servidor (VmRSS) al arrancar y tras la carga, y su máximo (VmHWM), leídos
+de /proc, así que solo funciona en Linux.
+
+Uso: python -m bench.carga_compartida [clientes] [segundos] [registros]
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from bench.carga_workers import RAIZ, _esperar_puerto
+
+
+PUERTO_PACIENTES = 8001
+PUERTO_DOCTORES = 8002
+MODOS = ("hilos", "compartido")
+
+
+def _memoria_kib(pid: int) -> dict:
+    medidas = {}
+    with open(f"/proc/{pid}/status", encoding="ascii") as archivo:
+        for linea in archivo:
+            clave, _, valor = linea.partition(":")
+            if clave in ("VmRSS", "VmHWM"):
+                medidas[clave] = int(valor.split()[0])
+    return medidas
+
+
+def _crear(puerto: int, ruta: str, cuerpo: dict) -> str:
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+    conexion.request("POST", ruta, json.dumps(cuerpo), {"Content-Type": "application/json"})
+    identificador = json.loads(conexion.getresponse().read())["id"]
+    conexion.close()
+    return identificador
+
+
+def _cliente(argumentos) -> int:
+    puerto, ruta, segundos = argumentos
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+    peticiones = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        conexion.request("GET", ruta)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        peticiones += 1
+    conexion.close()
+    return peticiones
+
+
+def medir(modo: str, clientes: int, segundos: float, registros: int):
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(os.environ, CLINICA_MODO=modo, CLINICA_DATOS=directorio)
+        servidor = subprocess.Popen([sys.executable, "main.py"], cwd=RAIZ, env=entorno,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _esperar_puerto(PUERTO_PACIENTES)
+            _esperar_puerto(PUERTO_DOCTORES)
+            arranque = _memoria_kib(servidor.pid)["VmRSS"]
+            paciente_id = doctor_id = None
+            for i in range(registros):
+                paciente_id = _crear(PUERTO_PACIENTES, "/pacientes/",
+                                     {"nombre": f"Paciente {i}", "email": f"p{i}@clinica.org"})
+                doctor_id = _crear(PUERTO_DOCTORES, "/doctores/",
+                                   {"nombre": f"Doctor {i}", "especialidad": "Cardiología"})
+            trabajos = [(PUERTO_PACIENTES, f"/pacientes/{paciente_id}", segundos) if i % 2 == 0
+                        else (PUERTO_DOCTORES, f"/doctores/{doctor_id}", segundos) for i in range(clientes)]
+            with multiprocessing.Pool(clientes) as pool:
+                total = sum(pool.map(_cliente, trabajos))
+            memoria = _memoria_kib(servidor.pid)
+            return arranque, memoria["VmRSS"], memoria["VmHWM"], total / segundos
+        finally:
+            servidor.send_signal(signal.SIGINT)
+            try:
+                servidor.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                servidor.kill()
+                servidor.wait()
+
+
+def main(clientes: int, segundos: float, registros: int) -> None:
+    print(f"{'modo':>11} {'RSS inicial (MiB)':>18} {'RSS final (MiB)':>16} {'RSS máx (MiB)':>14} {'req/s':>8}",
+          flush=True)
+    for modo in MODOS:
+        inicial, final, maximo, por_segundo = medir(modo, clientes, segundos, registros)
+        print(f"{modo:>11} {inicial / 1024:>18.1f} {final / 1024:>16.1f} {maximo / 1024:>14.1f} "
+              f"{por_segundo:>8.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    main(int(argumentos[0]) if argumentos else 8,
+         float(argumentos[1]) if len(argumentos) > 1 else 5.0,
+         int(argumentos[2]) if len(argumentos) > 2 else 100)
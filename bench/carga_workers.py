@@ -0,0 +1,82 @@
+"""Peticiones por segundo de la API de doctores según el número de workers.
+
+Arranca `main.py` con CLINICA_BACKEND=sqlite y CLINICA_WORKERS=N para cada
+N, y lo carga desde varios procesos cliente con conexiones keep-alive.
+Las cifras solo escalan si la máquina tiene núcleos libres para servidor
+y clientes a la vez.
+
+Uso: python -m bench.carga_workers [clientes] [segundos] [workers...]
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+PUERTO = 8002
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _esperar_puerto(puerto: int, segundos: float = 30.0) -> None:
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El puerto {puerto} no respondió")
+
+
+def _cliente(argumentos) -> int:
+    ruta, segundos = argumentos
+    conexion = http.client.HTTPConnection("127.0.0.1", PUERTO)
+    peticiones = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        conexion.request("GET", ruta)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        peticiones += 1
+    conexion.close()
+    return peticiones
+
+
+def medir(workers: int, clientes: int, segundos: float) -> float:
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(os.environ, CLINICA_BACKEND="sqlite", CLINICA_WORKERS=str(workers),
+                       CLINICA_SQLITE_RUTA=os.path.join(directorio, "carga.db"))
+        servidor = subprocess.Popen([sys.executable, "main.py"], cwd=RAIZ, env=entorno,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _esperar_puerto(PUERTO)
+            conexion = http.client.HTTPConnection("127.0.0.1", PUERTO)
+            conexion.request("POST", "/doctores/", json.dumps({"nombre": "Carga", "especialidad": "Cardiología"}),
+                             {"Content-Type": "application/json"})
+            doctor_id = json.loads(conexion.getresponse().read())["id"]
+            conexion.close()
+            with multiprocessing.Pool(clientes) as pool:
+                total = sum(pool.map(_cliente, [(f"/doctores/{doctor_id}", segundos)] * clientes))
+            return total / segundos
+        finally:
+            servidor.send_signal(signal.SIGINT)
+            servidor.wait(timeout=30)
+
+
+def main(clientes: int, segundos: float, lista_workers) -> None:
+    print(f"{'workers':>8} {'clientes':>9} {'req/s':>10}", flush=True)
+    for workers in lista_workers:
+        print(f"{workers:>8} {clientes:>9} {medir(workers, clientes, segundos):>10.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    argumentos = [arg for arg in sys.argv[1:]]
+    main(int(argumentos[0]) if argumentos else 8,
+         float(argumentos[1]) if len(argumentos) > 1 else 5.0,
+         [int(arg) for arg in argumentos[2:]] or [1, 2, 4])
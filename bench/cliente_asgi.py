@@ -0,0 +1,84 @@
+"""Cliente ASGI mínimo para medir las aplicaciones sin pasar por la red"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+@dataclass
+class Respuesta:
+    status: int = 0
+    headers: List[Tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+    segundos_primer_byte: Optional[float] = None
+    segundos_total: float = 0.0
+    bytes_recibidos: int = 0
+
+    def cabecera(self, nombre: str) -> Optional[str]:
+        nombre_bytes = nombre.lower().encode("latin-1")
+        for clave, valor in self.headers:
+            if clave.lower() == nombre_bytes:
+                return valor.decode("latin-1")
+        return None
+
+    def json(self):
+        return json.loads(self.body)
+
+
+async def peticion(app, metodo: str, ruta: str, cuerpo=None,
+                   cabeceras: Optional[dict] = None, guardar_cuerpo: bool = True) -> Respuesta:
+    partes = urlsplit(ruta)
+    datos = b"" if cuerpo is None else json.dumps(cuerpo).encode("utf-8")
+    lista_cabeceras = [(b"host", b"bench")]
+    if cuerpo is not None:
+        lista_cabeceras.append((b"content-type", b"application/json"))
+        lista_cabeceras.append((b"content-length", str(len(datos)).encode()))
+    for clave, valor in (cabeceras or {}).items():
+        lista_cabeceras.append((clave.lower().encode("latin-1"), valor.encode("latin-1")))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": metodo,
+        "scheme": "http",
+        "path": partes.path,
+        "raw_path": partes.path.encode(),
+        "query_string": partes.query.encode(),
+        "root_path": "",
+        "headers": lista_cabeceras,
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    enviado = False
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {"type": "http.request", "body": datos, "more_body": False}
+        # El cliente sigue conectado hasta que la respuesta termina
+        await asyncio.Event().wait()
+
+    respuesta = Respuesta()
+    partes_cuerpo = []
+    inicio = time.perf_counter()
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta.status = mensaje["status"]
+            respuesta.headers = list(mensaje.get("headers", []))
+        elif mensaje["type"] == "http.response.body":
+            trozo = mensaje.get("body", b"")
+            if trozo and respuesta.segundos_primer_byte is None:
+                respuesta.segundos_primer_byte = time.perf_counter() - inicio
+            respuesta.bytes_recibidos += len(trozo)
+            if guardar_cuerpo:
+                partes_cuerpo.append(trozo)
+
+    await app(scope, receive, send)
+    respuesta.segundos_total = time.perf_counter() - inicio
+    if guardar_cuerpo:
+        respuesta.body = b"".join(partes_cuerpo)
+    return respuesta
@@ -0,0 +1,135 @@
+"""Prueba de estrés de los repositorios concurrentes: escritores y lectores
+simultáneos, rendimiento según el número de hilos y comprobación de que no
+se pierden actualizaciones ni se corrompen los índices.
+
+Uso: python -m bench.estres_concurrencia [segundos por medición]
+"""
+import asyncio
+import random
+import sys
+import threading
+import time
+from dataclasses import replace
+from app.application.services.patient_service import AsyncPatientService
+from app.domain.core.models import paciente
+from app.infraestructure.adapters.concurrente import FRANJAS, ConcurrentPatientRepository
+from app.infraestructure.adapters.ejecutor import ExecutorPatientRepository
+
+
+HILOS = [1, 2, 4, 8, 16]
+# 1 franja equivale a un único candado global
+VARIANTES_FRANJAS = [1, FRANJAS, 16]
+REGISTROS = 10_000
+DURACION = 1.0
+INCREMENTOS = 2000
+CONTADORES = 4
+# Cambios de hilo mucho más frecuentes que los 5 ms por defecto para forzar intercalados
+INTERVALO_CAMBIO = 1e-5
+
+
+def poblar(repo) -> list:
+    return [patient.id for patient in repo.guardar_lote(
+        [paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(REGISTROS)]
+    )]
+
+
+async def trabajo_mixto(repo, ids: list, fin: float, contador: list, semilla: int):
+    # 70 % lecturas por id, 10 % páginas, 10 % actualizaciones (CAS), 10 % altas y bajas.
+    # Un bucle de eventos por hilo; sin ejecutor el servicio llama al repositorio
+    # en el propio hilo, así que los hilos siguen compitiendo por él
+    aleatorio = random.Random(semilla)
+    servicio = AsyncPatientService(ExecutorPatientRepository(repo))
+    propios = []
+    operaciones = 0
+    while time.perf_counter() < fin:
+        dado = aleatorio.random()
+        if dado < 0.7:
+            repo.buscar_por_id(aleatorio.choice(ids))
+        elif dado < 0.8:
+            repo.buscar_pagina(aleatorio.choice(ids), 20)
+        elif dado < 0.9:
+            await servicio.actualizar_paciente(aleatorio.choice(ids), nombre=f"Paciente {operaciones}")
+        elif propios and dado < 0.95:
+            repo.borrar(propios.pop())
+        else:
+            propios.append(repo.guardar(paciente(nombre="Temporal", email="t@clinica.org")).id)
+        operaciones += 1
+    contador.append(operaciones)
+
+
+def rendimiento(duracion: float):
+    print(f"{'hilos':>6}" + "".join(f"{f'{franjas} franjas':>12}" for franjas in VARIANTES_FRANJAS)
+          + "   (operaciones/s)")
+    for hilos in HILOS:
+        fila = []
+        for franjas in VARIANTES_FRANJAS:
+            repo = ConcurrentPatientRepository(franjas)
+            ids = poblar(repo)
+            contador = []
+            fin = time.perf_counter() + duracion
+            trabajadores = [threading.Thread(target=asyncio.run, args=(trabajo_mixto(repo, ids, fin, contador, k),))
+                            for k in range(hilos)]
+            for trabajador in trabajadores:
+                trabajador.start()
+            for trabajador in trabajadores:
+                trabajador.join()
+            comprobar_indices(repo)
+            fila.append(sum(contador) / duracion)
+        print(f"{hilos:>6}" + "".join(f"{por_segundo:>12.0f}" for por_segundo in fila))
+
+
+def comprobar_indices(repo):
+    paginados = []
+    cursor = None
+    while True:
+        lote, cursor = repo.buscar_pagina(cursor, 500)
+        paginados.extend(patient.id for patient in lote)
+        if cursor is None:
+            break
+    assert paginados == sorted(set(paginados)), "páginas desordenadas o repetidas"
+    assert set(paginados) == {patient.id for patient in repo.buscar_todos()}, "páginas incompletas"
+
+
+def incrementar(repo, contador_id: str, veces: int, reintentos: list):
+    fallidos = 0
+    for _ in range(veces):
+        while True:
+            actual = repo.buscar_por_id(contador_id)
+            nuevo = replace(actual, nombre=str(int(actual.nombre) + 1))
+            if repo.comparar_y_actualizar(actual, nuevo):
+                break
+            fallidos += 1
+    reintentos.append(fallidos)
+
+
+def actualizaciones_perdidas(hilos: int):
+    # Cada hilo incrementa los contadores con lectura + comparar_y_actualizar;
+    # al final cada contador debe valer exactamente la suma de incrementos
+    repo = ConcurrentPatientRepository()
+    contadores = [repo.guardar(paciente(nombre="0", email=f"c{i}@clinica.org")).id for i in range(CONTADORES)]
+    reintentos = []
+    trabajadores = [threading.Thread(target=incrementar,
+                                     args=(repo, contadores[k % CONTADORES], INCREMENTOS, reintentos))
+                    for k in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    esperado = [INCREMENTOS * len(range(k, hilos, CONTADORES)) for k in range(CONTADORES)]
+    obtenido = [int(repo.buscar_por_id(contador_id).nombre) for contador_id in contadores]
+    assert obtenido == esperado, f"actualizaciones perdidas: {obtenido} != {esperado}"
+    print(f"# {hilos} hilos x {INCREMENTOS} incrementos: sin pérdidas, {sum(reintentos)} reintentos de CAS")
+
+
+def main(duracion: float):
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(INTERVALO_CAMBIO)
+    try:
+        actualizaciones_perdidas(max(HILOS))
+    finally:
+        sys.setswitchinterval(intervalo)
+    rendimiento(duracion)
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else DURACION)
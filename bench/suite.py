@@ -0,0 +1,332 @@
+"""Suite de rendimiento: repositorios, servicios y las dos APIs en el proceso.
+
+Tres niveles con los mismos escenarios por colección (crear, obtener,
+listar una página, buscar por especialidad, actualizar y una mezcla):
+
+- repositorio y servicio: llamadas directas a los objetos de main.py, una
+  detrás de otra (los servicios son asíncronos: cada llamada se espera
+  antes de la siguiente, en el ejecutor del almacenamiento si lo tiene).
+- asgi: peticiones HTTP a app_patients y app_doctors sin pasar por la red,
+  con `concurrencia` peticiones en vuelo a la vez (la latencia incluye la
+  espera por las demás).
+
+Se usa el almacenamiento de CLINICA_BACKEND (memoria si no se indica), con
+sus archivos en un directorio temporal. Cada escenario se repite --rondas
+veces y se queda la ronda con más ops/s, la menos afectada por el resto del
+equipo. Sus ops/s y latencias p50/p95/p99 se guardan en JSON; con --base se
+compara con un resultado anterior y el proceso termina con código 1 si
+algún escenario pierde más de --tolerancia en ops/s o en p50. La
+tolerancia tiene que superar el ruido del equipo: compárense dos
+ejecuciones sin cambios antes de fiarse de un umbral.
+
+Uso: python -m bench.suite [--registros N] [--operaciones N] [--rondas N]
+                           [--concurrencia N] [--solo texto] [--salida archivo.json]
+                           [--base archivo.json] [--tolerancia 0.15]
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+from app.domain.core.models import paciente, Doctor
+from bench.cliente_asgi import peticion
+from bench.bench_especialidad import ESPECIALIDADES
+
+
+FORMATO = 1
+PAGINA = 50
+# Peso de cada operación en las mezclas: sobre todo lecturas
+MEZCLA = {"obtener": 50, "listar": 15, "especialidad": 15, "crear": 10, "actualizar": 10}
+
+
+def _resumen(latencias: List[float], segundos: float) -> Dict[str, float]:
+    ordenadas = sorted(latencias)
+    total = len(ordenadas)
+
+    def percentil(fraccion: float) -> float:
+        return round(ordenadas[min(total - 1, int(total * fraccion))] * 1000, 4)
+
+    return {
+        "operaciones": total,
+        "ops_s": round(total / segundos, 1),
+        "media_ms": round(sum(ordenadas) / total * 1000, 4),
+        "p50_ms": percentil(0.50),
+        "p95_ms": percentil(0.95),
+        "p99_ms": percentil(0.99),
+    }
+
+
+def _mezcla(operaciones: Dict[str, Callable]) -> Callable:
+    nombres = [nombre for nombre in MEZCLA if nombre in operaciones]
+    pesos = [MEZCLA[nombre] for nombre in nombres]
+
+    def mezcla(azar: random.Random):
+        return operaciones[azar.choices(nombres, pesos)[0]](azar)
+
+    return mezcla
+
+
+def _nombre(azar: random.Random) -> str:
+    return f"Persona {azar.randrange(10**9)}"
+
+
+def escenarios_repositorio(aplicacion, ids_pacientes: List[str], ids_doctores: List[str]):
+    pacientes, doctores = aplicacion.patient_repository, aplicacion.doctor_repository
+
+    def actualizar(repo, ids, azar):
+        actual = repo.buscar_por_id(azar.choice(ids))
+        return repo.actualizar(replace(actual, nombre=_nombre(azar)))
+
+    return {
+        "pacientes": {
+            "crear": lambda azar: pacientes.guardar(paciente(nombre=_nombre(azar), email="suite@clinica.org")),
+            "obtener": lambda azar: pacientes.buscar_por_id(azar.choice(ids_pacientes)),
+            "listar": lambda azar: pacientes.buscar_pagina(azar.choice(ids_pacientes), PAGINA),
+            "actualizar": lambda azar: actualizar(pacientes, ids_pacientes, azar),
+        },
+        "doctores": {
+            "crear": lambda azar: doctores.guardar(Doctor(nombre=_nombre(azar), especialidad=azar.choice(ESPECIALIDADES))),
+            "obtener": lambda azar: doctores.buscar_por_id(azar.choice(ids_doctores)),
+            "listar": lambda azar: doctores.buscar_pagina(azar.choice(ids_doctores), PAGINA),
+            "especialidad": lambda azar: doctores.buscar_por_especialidad(azar.choice(ESPECIALIDADES)),
+            "actualizar": lambda azar: actualizar(doctores, ids_doctores, azar),
+        },
+    }
+
+
+def escenarios_servicio(aplicacion, ids_pacientes: List[str], ids_doctores: List[str]):
+    pacientes, doctores = aplicacion.patient_service, aplicacion.doctor_service
+    return {
+        "pacientes": {
+            "crear": lambda azar: pacientes.registrar_paciente(_nombre(azar), "suite@clinica.org"),
+            "obtener": lambda azar: pacientes.obtener_paciente(azar.choice(ids_pacientes)),
+            "listar": lambda azar: pacientes.listar_pacientes_pagina(azar.choice(ids_pacientes), PAGINA),
+            "actualizar": lambda azar: pacientes.actualizar_paciente(azar.choice(ids_pacientes), nombre=_nombre(azar)),
+        },
+        "doctores": {
+            "crear": lambda azar: doctores.registrar_doctor(_nombre(azar), azar.choice(ESPECIALIDADES)),
+            "obtener": lambda azar: doctores.obtener_doctor(azar.choice(ids_doctores)),
+            "listar": lambda azar: doctores.listar_doctores_pagina(azar.choice(ids_doctores), PAGINA),
+            "especialidad": lambda azar: doctores.buscar_por_especialidad(azar.choice(ESPECIALIDADES)),
+            "actualizar": lambda azar: doctores.actualizar_doctor(azar.choice(ids_doctores), nombre=_nombre(azar)),
+        },
+    }
+
+
+def escenarios_asgi(aplicacion, ids_pacientes: List[str], ids_doctores: List[str]):
+
+    def pedir(app, metodo: str, ruta: Callable, cuerpo: Callable = None):
+        async def operacion(azar: random.Random):
+            destino = ruta(azar)
+            respuesta = await peticion(app, metodo, destino, cuerpo(azar) if cuerpo else None,
+                                       guardar_cuerpo=False)
+            if respuesta.status >= 400:
+                raise RuntimeError(f"{metodo} {destino}: {respuesta.status}")
+        return operacion
+
+    pacientes, doctores = aplicacion.app_patients, aplicacion.app_doctors
+    cuerpo_paciente = lambda azar: {"nombre": _nombre(azar), "email": "suite@clinica.org"}
+    cuerpo_doctor = lambda azar: {"nombre": _nombre(azar), "especialidad": azar.choice(ESPECIALIDADES)}
+    return {
+        "pacientes": {
+            "crear": pedir(pacientes, "POST", lambda azar: "/pacientes/", cuerpo_paciente),
+            "obtener": pedir(pacientes, "GET", lambda azar: f"/pacientes/{azar.choice(ids_pacientes)}"),
+            "listar": pedir(pacientes, "GET",
+                            lambda azar: f"/pacientes/?limit={PAGINA}&cursor={azar.choice(ids_pacientes)}"),
+            "actualizar": pedir(pacientes, "PUT", lambda azar: f"/pacientes/{azar.choice(ids_pacientes)}",
+                                cuerpo_paciente),
+        },
+        "doctores": {
+            "crear": pedir(doctores, "POST", lambda azar: "/doctores/", cuerpo_doctor),
+            "obtener": pedir(doctores, "GET", lambda azar: f"/doctores/{azar.choice(ids_doctores)}"),
+            "listar": pedir(doctores, "GET",
+                            lambda azar: f"/doctores/?limit={PAGINA}&cursor={azar.choice(ids_doctores)}"),
+            "especialidad": pedir(doctores, "GET",
+                                  lambda azar: f"/doctores/especialidad/{azar.choice(ESPECIALIDADES)}"),
+            "actualizar": pedir(doctores, "PUT", lambda azar: f"/doctores/{azar.choice(ids_doctores)}",
+                                cuerpo_doctor),
+        },
+    }
+
+
+def medir(operacion: Callable, operaciones: int, semilla: int) -> Dict[str, float]:
+    azar = random.Random(semilla)
+    for _ in range(min(100, operaciones // 10)):
+        operacion(azar)
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(operaciones):
+        antes = time.perf_counter()
+        operacion(azar)
+        latencias.append(time.perf_counter() - antes)
+    return _resumen(latencias, time.perf_counter() - inicio)
+
+
+async def medir_concurrente(operacion: Callable, operaciones: int, concurrencia: int,
+                            semilla: int) -> Dict[str, float]:
+    restantes = 0
+    latencias = []
+
+    async def trabajador(indice: int, registrar: bool):
+        nonlocal restantes
+        azar = random.Random(semilla + indice)
+        while restantes > 0:
+            restantes -= 1
+            antes = time.perf_counter()
+            await operacion(azar)
+            if registrar:
+                latencias.append(time.perf_counter() - antes)
+
+    restantes = min(100, operaciones // 10)
+    await asyncio.gather(*(trabajador(indice, False) for indice in range(concurrencia)))
+    restantes = operaciones
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(indice, True) for indice in range(concurrencia)))
+    return _resumen(latencias, time.perf_counter() - inicio)
+
+
+def poblar(aplicacion, registros: int):
+    azar = random.Random(1)
+    pacientes = aplicacion.patient_repository.guardar_lote([
+        paciente(nombre=_nombre(azar), email=f"p{i}@clinica.org") for i in range(registros)
+    ])
+    doctores = aplicacion.doctor_repository.guardar_lote([
+        Doctor(nombre=_nombre(azar), especialidad=ESPECIALIDADES[i % len(ESPECIALIDADES)], email=f"d{i}@clinica.mx")
+        for i in range(registros)
+    ])
+    return [patient.id for patient in pacientes], [doctor.id for doctor in doctores]
+
+
+def ejecutar(aplicacion, registros: int, operaciones: int, rondas: int, concurrencia: int,
+             solo: str) -> Dict[str, Dict]:
+    ids_pacientes, ids_doctores = poblar(aplicacion, registros)
+    niveles = {
+        "repositorio": escenarios_repositorio(aplicacion, ids_pacientes, ids_doctores),
+        "servicio": escenarios_servicio(aplicacion, ids_pacientes, ids_doctores),
+        "asgi": escenarios_asgi(aplicacion, ids_pacientes, ids_doctores),
+    }
+    resultados = {}
+    print(f"{'escenario':>32} {'ops/s':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}", flush=True)
+    for nivel, colecciones in niveles.items():
+        for coleccion, operaciones_coleccion in colecciones.items():
+            escenarios = dict(operaciones_coleccion, mezcla=_mezcla(operaciones_coleccion))
+            for nombre, operacion in escenarios.items():
+                clave = f"{nivel}/{coleccion}.{nombre}"
+                if solo and solo not in clave:
+                    continue
+                medidas = []
+                for ronda in range(rondas):
+                    # La semilla solo depende del escenario: --solo no cambia la secuencia
+                    semilla = zlib.crc32(clave.encode()) + ronda
+                    # Como timeit: sin recolecciones del ciclo de basura a mitad de ronda
+                    gc.collect()
+                    gc.disable()
+                    try:
+                        if nivel == "asgi":
+                            medidas.append(asyncio.run(medir_concurrente(operacion, operaciones, concurrencia,
+                                                                         semilla)))
+                        elif nivel == "servicio":
+                            medidas.append(asyncio.run(medir_concurrente(operacion, operaciones, 1, semilla)))
+                        else:
+                            medidas.append(medir(operacion, operaciones, semilla))
+                    finally:
+                        gc.enable()
+                medida = resultados[clave] = max(medidas, key=lambda medida: medida["ops_s"])
+                print(f"{clave:>32} {medida['ops_s']:>10.0f} {medida['p50_ms']:>9.3f} "
+                      f"{medida['p95_ms']:>9.3f} {medida['p99_ms']:>9.3f}", flush=True)
+    return resultados
+
+
+def comparar(actual: Dict, base: Dict, tolerancia: float) -> List[str]:
+    """Imprime los cambios frente a `base` y devuelve los escenarios que empeoran"""
+    distintos = {clave: (base["entorno"].get(clave), valor) for clave, valor in actual["entorno"].items()
+                 if clave != "python" and base["entorno"].get(clave) != valor}
+    for clave, (antes, ahora) in distintos.items():
+        print(f"# aviso: {clave} distinto de la base ({antes} -> {ahora})")
+    regresiones = []
+    print(f"{'escenario':>32} {'ops/s base':>11} {'ops/s':>10} {'Δ ops/s':>8} {'Δ p50':>8} {'Δ p99':>8}")
+    for clave, medida in actual["escenarios"].items():
+        anterior = base["escenarios"].get(clave)
+        if anterior is None:
+            print(f"{clave:>32} {'-':>11} {medida['ops_s']:>10.0f}   (nuevo)")
+            continue
+        cambio_ops = medida["ops_s"] / anterior["ops_s"] - 1
+        cambio_p50 = medida["p50_ms"] / anterior["p50_ms"] - 1 if anterior["p50_ms"] else 0.0
+        cambio_p99 = medida["p99_ms"] / anterior["p99_ms"] - 1 if anterior["p99_ms"] else 0.0
+        empeora = cambio_ops < -tolerancia or cambio_p50 > tolerancia
+        if empeora:
+            regresiones.append(clave)
+        print(f"{clave:>32} {anterior['ops_s']:>11.0f} {medida['ops_s']:>10.0f} {cambio_ops:>+8.1%} "
+              f"{cambio_p50:>+8.1%} {cambio_p99:>+8.1%}{'  EMPEORA' if empeora else ''}")
+    return regresiones
+
+
+def main(argumentos: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.suite", description=__doc__.splitlines()[0])
+    parser.add_argument("--registros", type=int, default=10_000, help="pacientes y doctores precargados")
+    parser.add_argument("--operaciones", type=int, default=2_000, help="operaciones medidas por escenario")
+    parser.add_argument("--rondas", type=int, default=3, help="repeticiones de cada escenario; se queda la mejor")
+    parser.add_argument("--concurrencia", type=int, default=16, help="peticiones en vuelo en el nivel asgi")
+    parser.add_argument("--solo", default="", help="solo los escenarios cuyo nombre contenga este texto")
+    parser.add_argument("--salida", default="resultados_suite.json", help="JSON donde guardar los resultados")
+    parser.add_argument("--base", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.15,
+                        help="pérdida relativa de ops/s o p50 que se acepta antes de fallar")
+    opciones = parser.parse_args(argumentos)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # main.py lee la configuración al importarse
+        os.environ.setdefault("CLINICA_DATOS", os.path.join(directorio, "datos"))
+        os.environ.setdefault("CLINICA_SQLITE_RUTA", os.path.join(directorio, "suite.db"))
+        aplicacion = importlib.import_module("main")
+        try:
+            escenarios = ejecutar(aplicacion, opciones.registros, opciones.operaciones, opciones.rondas,
+                                  opciones.concurrencia, opciones.solo)
+        finally:
+            for ejecutor in (aplicacion.ejecutor_patients, aplicacion.ejecutor_doctors):
+                if ejecutor is not None:
+                    ejecutor.cerrar()
+            for repo in (aplicacion.patient_repository, aplicacion.doctor_repository):
+                if hasattr(repo, "cerrar"):
+                    repo.cerrar()
+
+    resultado = {
+        "formato": FORMATO,
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "entorno": {
+            "backend": aplicacion.BACKEND,
+            "registros": opciones.registros,
+            "operaciones": opciones.operaciones,
+            "rondas": opciones.rondas,
+            "concurrencia": opciones.concurrencia,
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+        },
+        "escenarios": escenarios,
+    }
+    with open(opciones.salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    print(f"# resultados en {opciones.salida}")
+
+    if opciones.base:
+        with open(opciones.base, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(resultado, base, opciones.tolerancia)
+        if regresiones:
+            print(f"# {len(regresiones)} escenario(s) empeoran más de {opciones.tolerancia:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
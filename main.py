@@ -1,38 +1,219 @@
 
 
+import logging
+import os
 import uvicorn
 import threading
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.infraestructure.adapters.database import (
     InMemoryPatientRepository,
-    InMemoryDoctorRepository
+    InMemoryDoctorRepository,
+    InMemoryCitaRepository
+)
+from app.infraestructure.adapters.concurrente import (
+    ConcurrentPatientRepository,
+    ConcurrentDoctorRepository
+)
+from app.infraestructure.adapters.compacto import (
+    CompactPatientRepository,
+    CompactDoctorRepository
+)
+from app.infraestructure.adapters.columnar import (
+    ColumnarPatientRepository,
+    ColumnarDoctorRepository
+)
+from app.infraestructure.adapters.sqlite import (
+    ConexionesPorHilo,
+    SqlitePatientRepository,
+    SqliteDoctorRepository
+)
+from app.infraestructure.adapters.persistente import (
+    PersistentPatientRepository,
+    PersistentDoctorRepository
+)
+from app.infraestructure.adapters.mapeado import (
+    MmapPatientRepository,
+    MmapDoctorRepository
+)
+from app.infraestructure.adapters.ejecutor import (
+    EjecutorAcotado,
+    ExecutorPatientRepository,
+    ExecutorDoctorRepository,
+    HILOS_POR_DEFECTO,
+    PENDIENTES_POR_DEFECTO,
+    TIEMPO_LIMITE_POR_DEFECTO
+)
+from app.infraestructure.adapters.cache_respuestas import CacheLRU, BYTES_POR_DEFECTO
+from app.infraestructure.api.compresion import CompresionMiddleware
+from app.infraestructure.api.metricas import Metricas, MetricasMiddleware
+from app.infraestructure.api.perfilado import PerfiladoMiddleware
+from app.infraestructure.lanzador import Servicio, Supervisor, servir
+from app.application.services.patient_service import AsyncPatientService
+from app.application.services.doctor_service import AsyncDoctorService
+from app.application.services.cita_service import CitaService
+from app.infraestructure.api.controller import (
+    PatientController,
+    DoctorController,
+    CitaController,
+    MANEJADORES_ALMACENAMIENTO,
+    CABECERA_SIGUIENTE_CURSOR,
+    CABECERA_ETAG
 )
-from app.application.services.patient_service import PatientService
-from app.application.services.doctor_service import DoctorService
-from app.infraestructure.api.controller import PatientController, DoctorController
 
 
-# Aplicación de Pacientes
-app_patients = FastAPI(
-    title="Sistema de Gestión Clínico- Unach (Pacientes)",
-    description="API para gestionar pacientes de una clínica el mejor de chiapas ",
-    version="unica"
-)
+# Configuración del almacenamiento: "memoria" (por defecto), "concurrente" (memoria
+# con candados por franjas, segura entre hilos), "compacto", "columnar",
+# "persistente" (memoria con registro de escritura e instantáneas), "mapeado"
+# (lecturas servidas desde una instantánea mapeada con mmap) o "sqlite"
+BACKEND = os.environ.get("CLINICA_BACKEND", "memoria")
+SQLITE_RUTA = os.environ.get("CLINICA_SQLITE_RUTA", "clinica.db")
+DATOS_DIRECTORIO = os.environ.get("CLINICA_DATOS", "datos")
+# Sincronización del registro: "siempre", "grupo" (por defecto), "intervalo" o "nunca"
+FSYNC = os.environ.get("CLINICA_FSYNC", "grupo")
+# Despliegue: "hilos" (por defecto) sirve cada API con su propio servidor
+# uvicorn en un hilo, pacientes en PUERTO_PACIENTES y doctores en
+# PUERTO_DOCTORES; "compartido" sirve app_clinica, con las rutas de las dos,
+# desde un solo servidor y bucle de eventos que escucha en ambos puertos
+MODO = os.environ.get("CLINICA_MODO", "hilos")
+if MODO not in ("hilos", "compartido"):
+    raise ValueError(f"CLINICA_MODO desconocido: {MODO!r} (use 'hilos' o 'compartido')")
+PUERTO_PACIENTES = 8001
+PUERTO_DOCTORES = 8002
+# Procesos por API (o por aplicación compartida); 0 mantiene el modo clásico de un proceso
+WORKERS = int(os.environ.get("CLINICA_WORKERS", "0"))
+# Tope en bytes de la caché de respuestas de doctores (por proceso); 0 la desactiva
+CACHE_BYTES = int(os.environ.get("CLINICA_CACHE_BYTES", str(BYTES_POR_DEFECTO)))
+# Perfilado de peticiones para depurar (desactivado por defecto): con CLINICA_PERFILADO=1
+# se perfilan las que traen la cabecera X-Perfilar y la fracción CLINICA_PERFILADO_MUESTREO
+# del resto; los informes, en /debug/perfiles. CLINICA_PERFILADO_CLAVE exige ese valor
+# en la cabecera, también para consultar los informes
+PERFILADO = os.environ.get("CLINICA_PERFILADO", "") not in ("", "0")
+PERFILADO_MUESTREO = float(os.environ.get("CLINICA_PERFILADO_MUESTREO", "0"))
+PERFILADO_CLAVE = os.environ.get("CLINICA_PERFILADO_CLAVE") or None
+# Los almacenamientos que bloquean (disco) se atienden en hilos aparte, uno
+# por API: CLINICA_EJECUTOR_HILOS hilos, como mucho CLINICA_EJECUTOR_PENDIENTES
+# operaciones en cola (las demás reciben 503) y CLINICA_EJECUTOR_TIEMPO segundos
+# de espera por operación (504); 0 desactiva el límite de tiempo
+EJECUTOR_HILOS = int(os.environ.get("CLINICA_EJECUTOR_HILOS", str(HILOS_POR_DEFECTO)))
+EJECUTOR_PENDIENTES = int(os.environ.get("CLINICA_EJECUTOR_PENDIENTES", str(PENDIENTES_POR_DEFECTO)))
+EJECUTOR_TIEMPO = float(os.environ.get("CLINICA_EJECUTOR_TIEMPO", str(TIEMPO_LIMITE_POR_DEFECTO))) or None
 
-app_patients.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-patient_repository = InMemoryPatientRepository()
-patient_service = PatientService(patient_repository)
+def crear_repositorios():
+    """Crea los repositorios de pacientes y doctores según CLINICA_BACKEND"""
+    if BACKEND == "memoria":
+        return InMemoryPatientRepository(), InMemoryDoctorRepository()
+    if BACKEND == "concurrente":
+        return ConcurrentPatientRepository(), ConcurrentDoctorRepository()
+    if BACKEND == "compacto":
+        return CompactPatientRepository(), CompactDoctorRepository()
+    if BACKEND == "columnar":
+        return ColumnarPatientRepository(), ColumnarDoctorRepository()
+    if BACKEND == "persistente":
+        return (PersistentPatientRepository(os.path.join(DATOS_DIRECTORIO, "pacientes"), FSYNC),
+                PersistentDoctorRepository(os.path.join(DATOS_DIRECTORIO, "doctores"), FSYNC))
+    if BACKEND == "mapeado":
+        return (MmapPatientRepository(os.path.join(DATOS_DIRECTORIO, "mapeado", "pacientes"), FSYNC),
+                MmapDoctorRepository(os.path.join(DATOS_DIRECTORIO, "mapeado", "doctores"), FSYNC))
+    if BACKEND == "sqlite":
+        conexiones = ConexionesPorHilo(SQLITE_RUTA)
+        return (SqlitePatientRepository(SQLITE_RUTA, conexiones),
+                SqliteDoctorRepository(SQLITE_RUTA, conexiones))
+    raise ValueError(
+        f"CLINICA_BACKEND desconocido: {BACKEND!r} "
+        "(use 'memoria', 'concurrente', 'compacto', 'columnar', 'persistente', 'mapeado' o 'sqlite')"
+    )
+
+
+def crear_ejecutor(nombre: str) -> Optional[EjecutorAcotado]:
+    """Hilos para el almacenamiento si hace E/S y admite varios hilos; None para llamarlo directamente"""
+    if BACKEND in ("persistente", "mapeado", "sqlite"):
+        return EjecutorAcotado(EJECUTOR_HILOS, EJECUTOR_PENDIENTES, EJECUTOR_TIEMPO, nombre)
+    return None
+
+
+patient_repository, doctor_repository = crear_repositorios()
+# Las citas solo se guardan en memoria, sea cual sea CLINICA_BACKEND; con
+# CLINICA_WORKERS cada proceso tendría las suyas
+cita_repository = InMemoryCitaRepository()
+
+ejecutor_patients = crear_ejecutor("almacenamiento-pacientes")
+patient_service = AsyncPatientService(ExecutorPatientRepository(patient_repository, ejecutor_patients))
 patient_controller = PatientController(patient_service)
 
+ejecutor_doctors = crear_ejecutor("almacenamiento-doctores")
+doctor_service = AsyncDoctorService(ExecutorDoctorRepository(doctor_repository, ejecutor_doctors),
+                                    CacheLRU(CACHE_BYTES) if CACHE_BYTES > 0 else None)
+doctor_controller = DoctorController(doctor_service)
+
+# Agenda de citas entre pacientes y doctores, servida con la API de doctores.
+# Las citas se consultan en memoria; pacientes y doctores, con los mismos
+# repositorios (y ejecutores) que sus servicios
+cita_service = CitaService(cita_repository, patient_service.patient_repository, doctor_service.doctor_repository)
+cita_controller = CitaController(cita_service)
+
+
+def crear_app(titulo: str, descripcion: str) -> FastAPI:
+    """Aplicación con CORS, compresión, perfilado si está activado y los errores del almacenamiento"""
+    app = FastAPI(title=titulo, description=descripcion, version="unica")
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[CABECERA_SIGUIENTE_CURSOR, CABECERA_ETAG],
+    )
+    app.add_middleware(CompresionMiddleware)
+    if PERFILADO:
+        app.add_middleware(PerfiladoMiddleware, muestreo=PERFILADO_MUESTREO, clave=PERFILADO_CLAVE)
+    for excepcion, manejador in MANEJADORES_ALMACENAMIENTO.items():
+        app.add_exception_handler(excepcion, manejador)
+    return app
+
+
+# Las medidas de los repositorios se leen con su ejecutor, fuera del bucle de eventos
+def indicadores_pacientes(metricas: Metricas) -> None:
+    metricas.registrar_indicadores("repositorio", patient_service.patient_repository.estadisticas,
+                                   coleccion="pacientes")
+    if ejecutor_patients is not None:
+        metricas.registrar_indicadores("ejecutor", ejecutor_patients.estadisticas, coleccion="pacientes")
+
+
+def indicadores_doctores(metricas: Metricas) -> None:
+    metricas.registrar_indicadores("repositorio", doctor_service.doctor_repository.estadisticas,
+                                   coleccion="doctores")
+    if ejecutor_doctors is not None:
+        metricas.registrar_indicadores("ejecutor", ejecutor_doctors.estadisticas, coleccion="doctores")
+    if doctor_service.cache is not None:
+        metricas.registrar_indicadores("cache", doctor_service.cache.estadisticas)
+    metricas.registrar_indicadores("repositorio", cita_service.estadisticas_citas, coleccion="citas")
+
+
+def cerrar_al_apagar(app: FastAPI, ejecutor: Optional[EjecutorAcotado], repositorio) -> None:
+    # Primero se vacía el ejecutor y después se cierra el almacenamiento
+    if ejecutor is not None:
+        app.router.add_event_handler("shutdown", ejecutor.cerrar)
+    if hasattr(repositorio, "cerrar"):
+        app.router.add_event_handler("shutdown", repositorio.cerrar)
+
+
+# Aplicación de Pacientes
+app_patients = crear_app(
+    "Sistema de Gestión Clínico- Unach (Pacientes)",
+    "API para gestionar pacientes de una clínica el mejor de chiapas "
+)
+
+# Métricas en /metrics; el último middleware añadido es el más externo. Con
+# CLINICA_WORKERS cada proceso lleva las suyas y responde el que reciba la consulta
+metricas_patients = Metricas()
+indicadores_pacientes(metricas_patients)
+app_patients.add_middleware(MetricasMiddleware, metricas=metricas_patients)
+
 app_patients.include_router(patient_controller.router)
+cerrar_al_apagar(app_patients, ejecutor_patients, patient_repository)
 
 @app_patients.get("/", tags=["Root"])
 async def read_root_patients():
@@ -40,7 +221,7 @@ async def read_root_patients():
     return {
         "mensaje": "Bienvenido al Sistema de Gestión de Pacientes",
         "versión": "1.0.0",
-        "puerto": 8001,
+        "puerto": PUERTO_PACIENTES,
         "endpoints": {
             "pacientes": "/pacientes",
             "documentación": "/docs"
@@ -57,25 +238,18 @@ async def health_check_patients():
 
 
 # Aplicación de Doctores
-app_doctors = FastAPI(
-    title="Sistema de Gestión Clínico- Unach (Doctores)",
-    description="API para gestionar doctores de una clínica el mejor de chiapas ",
-    version="unica"
-)
-
-app_doctors.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+app_doctors = crear_app(
+    "Sistema de Gestión Clínico- Unach (Doctores)",
+    "API para gestionar doctores de una clínica el mejor de chiapas "
 )
 
-doctor_repository = InMemoryDoctorRepository()
-doctor_service = DoctorService(doctor_repository)
-doctor_controller = DoctorController(doctor_service)
+metricas_doctors = Metricas()
+indicadores_doctores(metricas_doctors)
+app_doctors.add_middleware(MetricasMiddleware, metricas=metricas_doctors)
 
 app_doctors.include_router(doctor_controller.router)
+app_doctors.include_router(cita_controller.router)
+cerrar_al_apagar(app_doctors, ejecutor_doctors, doctor_repository)
 
 @app_doctors.get("/", tags=["Root"])
 async def read_root_doctors():
@@ -83,9 +257,10 @@ async def read_root_doctors():
     return {
         "mensaje": "Bienvenido al Sistema de Gestión de Doctores",
         "versión": "1.0.0",
-        "puerto": 8002,
+        "puerto": PUERTO_DOCTORES,
         "endpoints": {
             "doctores": "/doctores",
+            "citas": "/citas",
             "documentación": "/docs"
         }
     }
@@ -99,13 +274,70 @@ async def health_check_doctors():
     }
 
 
-if __name__ == "__main__":
+# Aplicación compartida (CLINICA_MODO=compartido): las rutas de las dos APIs,
+# que no se solapan (/pacientes, /doctores, /citas), con una sola cadena de
+# middlewares y unas solas métricas. Se sirve en los dos puertos; solo la raíz
+# responde según el puerto por el que llega la petición
+app_clinica = crear_app(
+    "Sistema de Gestión Clínico- Unach",
+    "API para gestionar pacientes, doctores y citas de una clínica el mejor de chiapas "
+)
+
+metricas_clinica = Metricas()
+indicadores_pacientes(metricas_clinica)
+indicadores_doctores(metricas_clinica)
+app_clinica.add_middleware(MetricasMiddleware, metricas=metricas_clinica)
+
+app_clinica.include_router(patient_controller.router)
+app_clinica.include_router(doctor_controller.router)
+app_clinica.include_router(cita_controller.router)
+cerrar_al_apagar(app_clinica, ejecutor_patients, patient_repository)
+cerrar_al_apagar(app_clinica, ejecutor_doctors, doctor_repository)
+
+@app_clinica.get("/", tags=["Root"])
+async def read_root_clinica(request: Request):
+    """Endpoint raíz con información de la API del puerto por el que llega la petición"""
+    _, puerto = request.scope.get("server") or (None, None)
+    if puerto == PUERTO_DOCTORES:
+        return await read_root_doctors()
+    return await read_root_patients()
+
+@app_clinica.get("/health", tags=["Health"])
+async def health_check_clinica():
+    """Verificar estado de la API"""
+    return {
+        "estado": "activo",
+        "servicio": "Sistema de Gestión Clínico"
+    }
+
+
+def ejecutar_con_workers(workers: int):
+    """Cada API en `workers` procesos sobre sockets SO_REUSEPORT, supervisados"""
+    if BACKEND in ("memoria", "concurrente", "compacto", "columnar", "persistente", "mapeado"):
+        raise SystemExit(
+            "CLINICA_WORKERS requiere un almacenamiento compartido entre procesos: "
+            "use CLINICA_BACKEND=sqlite"
+        )
+    logging.getLogger(__name__).warning("Las citas se guardan en memoria: cada worker tendrá las suyas")
+    if MODO == "compartido":
+        servicios = [Servicio("main:app_clinica", PUERTO_PACIENTES, otros_puertos=(PUERTO_DOCTORES,))]
+    else:
+        servicios = [Servicio("main:app_patients", PUERTO_PACIENTES), Servicio("main:app_doctors", PUERTO_DOCTORES)]
+    Supervisor(servicios=servicios, trabajadores_por_servicio=workers).ejecutar()
+
+
+if __name__ == "__main__" and WORKERS > 0:
+    logging.basicConfig(level=logging.INFO)
+    ejecutar_con_workers(WORKERS)
+elif __name__ == "__main__" and MODO == "compartido":
+    servir(app_clinica, [PUERTO_PACIENTES, PUERTO_DOCTORES])
+elif __name__ == "__main__":
     # Ejecutar ambas aplicaciones en paralelo
     def run_patients():
-        uvicorn.run(app_patients, host="0.0.0.0", port=8001, log_level="info")
+        uvicorn.run(app_patients, host="0.0.0.0", port=PUERTO_PACIENTES, log_level="info")
     
     def run_doctors():
-        uvicorn.run(app_doctors, host="0.0.0.0", port=8002, log_level="info")
+        uvicorn.run(app_doctors, host="0.0.0.0", port=PUERTO_DOCTORES, log_level="info")
     
     thread_patients = threading.Thread(target=run_patients, daemon=True)
     thread_doctors = threading.Thread(target=run_doctors, daemon=True)
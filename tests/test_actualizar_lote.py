@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from app.domain.core.models import Doctor, paciente
+from app.application.ports.async_repository import AlmacenamientoSaturado
+from app.application.services.doctor_service import AsyncDoctorService
+from app.application.services.patient_service import AsyncPatientService
+from app.infraestructure.adapters.cache_respuestas import CacheLRU
+from app.infraestructure.adapters.concurrente import ConcurrentDoctorRepository, ConcurrentPatientRepository
+from app.infraestructure.adapters.database import InMemoryDoctorRepository, InMemoryPatientRepository
+from app.infraestructure.adapters.ejecutor import ExecutorDoctorRepository, ExecutorPatientRepository
+from app.infraestructure.adapters.persistente import PersistentDoctorRepository, PersistentPatientRepository
+
+
+# Backends que devuelven el registro guardado en buscar_por_id
+BACKENDS = {
+    "memoria": lambda _: InMemoryPatientRepository(),
+    "concurrente": lambda _: ConcurrentPatientRepository(),
+    "persistente": lambda directorio: PersistentPatientRepository(str(directorio / "pacientes")),
+}
+BACKENDS_DOCTORES = {
+    "memoria": lambda _: InMemoryDoctorRepository(),
+    "concurrente": lambda _: ConcurrentDoctorRepository(),
+    "persistente": lambda directorio: PersistentDoctorRepository(str(directorio / "doctores")),
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def repo(request, tmp_path):
+    repo = BACKENDS[request.param](tmp_path)
+    yield repo
+    if hasattr(repo, "cerrar"):
+        repo.cerrar()
+
+
+@pytest.fixture(params=list(BACKENDS_DOCTORES))
+def repo_doctores(request, tmp_path):
+    repo = BACKENDS_DOCTORES[request.param](tmp_path)
+    yield repo
+    if hasattr(repo, "cerrar"):
+        repo.cerrar()
+
+
+def _saturado(*_):
+    raise AlmacenamientoSaturado("lleno")
+
+
+def test_lote_de_pacientes_fallido_no_cambia_el_registro(repo):
+    guardado = repo.guardar(paciente(nombre="Ana", email="ana@clinica.org"))
+    repo.actualizar_lote = _saturado
+    servicio = AsyncPatientService(ExecutorPatientRepository(repo))
+    with pytest.raises(AlmacenamientoSaturado):
+        asyncio.run(servicio.actualizar_pacientes([{"patient_id": guardado.id, "nombre": "Beatriz"}]))
+    actual = repo.buscar_por_id(guardado.id)
+    assert (actual.nombre, actual.version) == ("Ana", 1)
+    assert repo.buscar_texto("beatriz", 10) == []
+
+
+def test_lote_aplica_sobre_copias_y_acumula_cambios_del_mismo_registro(repo):
+    guardado = repo.guardar(paciente(nombre="Ana", email="ana@clinica.org"))
+    servicio = AsyncPatientService(ExecutorPatientRepository(repo))
+    resultados = asyncio.run(servicio.actualizar_pacientes([
+        {"patient_id": guardado.id, "nombre": "Beatriz"},
+        {"patient_id": "no-existe", "nombre": "Nadie"},
+        {"patient_id": guardado.id, "email": "bea@clinica.org"},
+    ]))
+    assert guardado.nombre == "Ana"
+    assert resultados[1] is None
+    assert resultados[0] is resultados[2]
+    actual = repo.buscar_por_id(guardado.id)
+    assert (actual.nombre, actual.email, actual.version) == ("Beatriz", "bea@clinica.org", 2)
+    assert (resultados[0].nombre, resultados[0].version) == ("Beatriz", 2)
+
+
+def test_lote_de_doctores_fallido_no_cambia_el_registro(repo_doctores):
+    repo = repo_doctores
+    guardado = repo.guardar(Doctor(nombre="Luis", especialidad="Cardiología"))
+    repo.actualizar_lote = _saturado
+    servicio = AsyncDoctorService(ExecutorDoctorRepository(repo), CacheLRU())
+    with pytest.raises(AlmacenamientoSaturado):
+        asyncio.run(servicio.actualizar_doctores([{"doctor_id": guardado.id, "especialidad": "Pediatría"}]))
+    actual = repo.buscar_por_id(guardado.id)
+    assert (actual.especialidad, actual.version) == ("Cardiología", 1)
+    assert [doctor.id for doctor in repo.buscar_por_especialidad("Cardiología")] == [guardado.id]
+    assert repo.buscar_por_especialidad("Pediatría") == []
+
+
+def test_lote_de_doctores_cambia_de_especialidad(repo_doctores):
+    repo = repo_doctores
+    guardado = repo.guardar(Doctor(nombre="Luis", especialidad="Cardiología"))
+    servicio = AsyncDoctorService(ExecutorDoctorRepository(repo), CacheLRU())
+    resultados = asyncio.run(servicio.actualizar_doctores([{"doctor_id": guardado.id, "especialidad": "Pediatría"}]))
+    assert guardado.especialidad == "Cardiología"
+    assert (resultados[0].especialidad, resultados[0].version) == ("Pediatría", 2)
+    assert repo.buscar_por_especialidad("Cardiología") == []
+    assert [doctor.id for doctor in repo.buscar_por_especialidad("Pediatría")] == [guardado.id]
@@ -0,0 +1,102 @@
+from datetime import datetime
+import pytest
+from app.domain.core.models import Cita, CitaSolapada
+from app.infraestructure.adapters.agenda import Agenda
+from app.infraestructure.adapters.database import InMemoryCitaRepository
+
+
+def _hora(hora: int, minuto: int = 0) -> datetime:
+    return datetime(2025, 3, 10, hora, minuto)
+
+
+def _estado(agenda: Agenda) -> tuple:
+    return list(agenda.inicios), list(agenda.fines), list(agenda.ids)
+
+
+def test_citas_seguidas_no_chocan():
+    agenda = Agenda()
+    assert agenda.insertar("b", _hora(10), _hora(11)) is None
+    assert agenda.insertar("a", _hora(9), _hora(10)) is None
+    assert agenda.insertar("c", _hora(11), _hora(12)) is None
+    assert agenda.ids == ["a", "b", "c"]
+    # [inicio, fin): la que termina a las 10 no se cruza con [10, 11)
+    assert list(agenda.cruces(_hora(10), _hora(11))) == ["b"]
+    assert list(agenda.cruces(_hora(9, 59), _hora(11, 1))) == ["a", "b", "c"]
+    assert list(agenda.cruces(_hora(12), _hora(13))) == []
+
+
+@pytest.mark.parametrize("inicio, fin", [
+    (_hora(9, 30), _hora(10, 30)),
+    (_hora(10, 30), _hora(11, 30)),
+    (_hora(10, 15), _hora(10, 45)),
+    (_hora(9), _hora(12)),
+    (_hora(10), _hora(11)),
+])
+def test_un_choque_devuelve_la_otra_cita_y_no_cambia_la_agenda(inicio, fin):
+    agenda = Agenda()
+    agenda.insertar("a", _hora(8), _hora(9))
+    agenda.insertar("b", _hora(10), _hora(11))
+    antes = _estado(agenda)
+    assert agenda.insertar("x", inicio, fin) == "b"
+    assert _estado(agenda) == antes
+
+
+def test_quitar_solo_la_cita_con_ese_inicio():
+    agenda = Agenda()
+    agenda.insertar("a", _hora(9), _hora(10))
+    assert not agenda.quitar("a", _hora(10))
+    assert not agenda.quitar("b", _hora(9))
+    assert agenda.quitar("a", _hora(9))
+    assert len(agenda) == 0
+
+
+@pytest.fixture
+def repo() -> InMemoryCitaRepository:
+    return InMemoryCitaRepository()
+
+
+def _cita(inicio: datetime, fin: datetime, doctor_id: str = "d1", paciente_id: str = "p1") -> Cita:
+    return Cita(doctor_id=doctor_id, paciente_id=paciente_id, inicio=inicio, fin=fin)
+
+
+def test_repositorio_acepta_citas_seguidas_del_mismo_doctor(repo):
+    primera = repo.guardar(_cita(_hora(9), _hora(10)))
+    segunda = repo.guardar(_cita(_hora(10), _hora(11), paciente_id="p2"))
+    assert [cita.id for cita in repo.buscar_por_doctor("d1", _hora(8), _hora(12))] == [primera.id, segunda.id]
+
+
+def test_repositorio_rechaza_el_choque_sin_tocar_nada(repo):
+    existente = repo.guardar(_cita(_hora(9), _hora(10)))
+    cambios = repo.cambios_coleccion()[0]
+    with pytest.raises(CitaSolapada) as error:
+        repo.guardar(_cita(_hora(9, 30), _hora(10, 30), paciente_id="p2"))
+    assert error.value.cita_id == existente.id
+    assert repo.buscar_por_doctor("d1", _hora(0), _hora(23)) == [existente]
+    assert repo.buscar_por_paciente("p2") == []
+    assert repo.cambios_coleccion()[0] == cambios
+    assert repo.estadisticas()["registros"] == 1
+    # Otro doctor sí puede tener esa hora
+    repo.guardar(_cita(_hora(9, 30), _hora(10, 30), doctor_id="d2", paciente_id="p2"))
+
+
+def test_reprogramar_sobre_su_propio_horario(repo):
+    cita = repo.guardar(_cita(_hora(9), _hora(10)))
+    # El mismo horario y uno que se cruza con el anterior: solo choca consigo misma
+    for inicio, fin in ((_hora(9), _hora(10)), (_hora(9, 30), _hora(10, 30))):
+        movida = repo.actualizar(Cita(id=cita.id, doctor_id="d1", paciente_id="p1", inicio=inicio, fin=fin))
+        assert repo.buscar_por_doctor("d1", _hora(0), _hora(23)) == [movida]
+    assert movida.version == 3
+    assert repo.buscar_por_doctor("d1", _hora(9), _hora(9, 30)) == []
+
+
+def test_reprogramar_contra_otra_cita_deja_la_agenda_como_estaba(repo):
+    primera = repo.guardar(_cita(_hora(9), _hora(10)))
+    segunda = repo.guardar(_cita(_hora(10), _hora(11), paciente_id="p2"))
+    with pytest.raises(CitaSolapada) as error:
+        repo.actualizar(Cita(id=primera.id, doctor_id="d1", paciente_id="p1", inicio=_hora(9, 30), fin=_hora(10, 30)))
+    assert error.value.cita_id == segunda.id
+    assert repo.buscar_por_id(primera.id).inicio == _hora(9)
+    assert repo.buscar_por_doctor("d1", _hora(0), _hora(23)) == [primera, segunda]
+    # Su hueco sigue ocupado y el que habría dejado no se liberó
+    with pytest.raises(CitaSolapada):
+        repo.guardar(_cita(_hora(9), _hora(9, 30), paciente_id="p3"))
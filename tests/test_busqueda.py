@@ -0,0 +1,45 @@
+from app.infraestructure.adapters.busqueda import MAX_CANDIDATOS, IndiceTexto
+
+
+def _indice(filas) -> IndiceTexto:
+    indice = IndiceTexto()
+    for clave, (nombre, email) in enumerate(filas):
+        indice.indexar(clave, nombre, email)
+    return indice
+
+
+def test_varios_terminos_no_se_quedan_en_el_tope_de_candidatos():
+    # "ana" es el término más selectivo pero tiene más claves que el tope y
+    # casi ninguna coincide también con "zeta"
+    filas = [("Ana Soto", f"as{i}@clinica.org") for i in range(MAX_CANDIDATOS + 1000)]
+    filas += [("Luis Zeta", f"lz{i}@clinica.org") for i in range(2 * MAX_CANDIDATOS)]
+    filas += [("Ana Zeta", f"az{i}@clinica.org") for i in range(50)]
+    indice = _indice(filas)
+    encontrados = indice.buscar("ana zeta", 100)
+    assert sorted(encontrados) == list(range(len(filas) - 50, len(filas)))
+
+
+def test_varios_terminos_ordena_por_relevancia_tras_el_tope():
+    filas = [("Ana Soto", f"as{i}@clinica.org") for i in range(MAX_CANDIDATOS + 1000)]
+    filas += [("Luis Zeta", f"lz{i}@clinica.org") for i in range(2 * MAX_CANDIDATOS)]
+    filas += [("Anabel Zetana", "anabel@clinica.org"), ("Ana Zeta", "ana.zeta@clinica.org")]
+    indice = _indice(filas)
+    assert indice.buscar_puntuado("ana zeta", 2) == [(16, len(filas) - 1), (8, len(filas) - 2)]
+
+
+def test_un_termino_con_mas_claves_que_el_tope():
+    indice = _indice([("Ana Soto", f"as{i}@clinica.org") for i in range(MAX_CANDIDATOS * 2)])
+    assert len(indice.buscar("ana", 20)) == 20
+
+
+def test_varios_prefijos_sin_coincidencias_exactas():
+    # Ni "an" ni "ze" son tokens: el máximo de cada término es un prefijo del nombre
+    filas = [("Ana Soto", f"as{i}@clinica.org") for i in range(MAX_CANDIDATOS + 1000)]
+    filas += [("Luis Zeta", f"lz{i}@clinica.org") for i in range(2 * MAX_CANDIDATOS)]
+    filas += [("Ana Zeta", f"az{i}@clinica.org") for i in range(30)]
+    filas += [("Ana Soto", "zeta@clinica.org")]
+    indice = _indice(filas)
+    puntuados = indice.buscar_puntuado("an ze", 40)
+    assert sorted(clave for _, clave in puntuados[:30]) == list(range(len(filas) - 31, len(filas) - 1))
+    assert {puntos for puntos, _ in puntuados[:30]} == {8}
+    assert puntuados[30:] == [(5, len(filas) - 1)]
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from datetime import date, datetime, time, timedelta
+import pytest
+from app.domain.core.models import Doctor, paciente
+from app.application.services.cita_service import CitaService
+from app.infraestructure.adapters.database import (
+    InMemoryCitaRepository,
+    InMemoryDoctorRepository,
+    InMemoryPatientRepository
+)
+from app.infraestructure.adapters.ejecutor import EjecutorAcotado, ExecutorDoctorRepository, ExecutorPatientRepository
+
+
+DIA = date(2025, 3, 10)
+MEDIA_HORA = timedelta(minutes=30)
+
+
+def _hora(hora: int, minuto: int = 0, dia: date = DIA) -> datetime:
+    return datetime.combine(dia, time(hora, minuto))
+
+
+def _repositorios():
+    doctores = InMemoryDoctorRepository()
+    doctores.guardar_lote([Doctor(id=f"d{i}", nombre=f"Doctor {i}", especialidad="Cardiología") for i in range(3)])
+    pacientes = InMemoryPatientRepository()
+    pacientes.guardar(paciente(id="p1", nombre="Ana", email="ana@clinica.org"))
+    return pacientes, doctores
+
+
+@pytest.fixture
+def servicio() -> CitaService:
+    pacientes, doctores = _repositorios()
+    return CitaService(InMemoryCitaRepository(), ExecutorPatientRepository(pacientes),
+                       ExecutorDoctorRepository(doctores))
+
+
+def _agendar(servicio: CitaService, doctor_id: str, inicio: datetime, fin: datetime):
+    return asyncio.run(servicio.agendar_cita(doctor_id, "p1", inicio, fin))
+
+
+def _proximos(servicio: CitaService, desde: datetime, cantidad: int, **opciones):
+    return asyncio.run(servicio.proximos_huecos("Cardiología", desde, cantidad, MEDIA_HORA, **opciones))
+
+
+def test_huecos_libres_sin_citas_es_la_jornada(servicio):
+    assert servicio.huecos_libres("d0", DIA) == [(_hora(8), _hora(20))]
+
+
+def test_huecos_libres_con_citas_en_la_apertura_y_el_cierre(servicio):
+    _agendar(servicio, "d0", _hora(8), _hora(9))
+    _agendar(servicio, "d0", _hora(19), _hora(20))
+    assert servicio.huecos_libres("d0", DIA) == [(_hora(9), _hora(19))]
+
+
+def test_huecos_libres_con_citas_que_desbordan_la_jornada(servicio):
+    _agendar(servicio, "d0", _hora(7), _hora(8, 30))
+    _agendar(servicio, "d0", _hora(19, 30), _hora(21))
+    assert servicio.huecos_libres("d0", DIA) == [(_hora(8, 30), _hora(19, 30))]
+
+
+def test_huecos_libres_entre_citas_seguidas_y_por_duracion(servicio):
+    _agendar(servicio, "d0", _hora(10), _hora(11))
+    _agendar(servicio, "d0", _hora(11), _hora(12))
+    _agendar(servicio, "d0", _hora(12, 20), _hora(20))
+    assert servicio.huecos_libres("d0", DIA) == [(_hora(8), _hora(10)), (_hora(12), _hora(12, 20))]
+    assert servicio.huecos_libres("d0", DIA, MEDIA_HORA) == [(_hora(8), _hora(10))]
+
+
+def test_huecos_libres_con_jornada_vacia(servicio):
+    with pytest.raises(ValueError):
+        servicio.huecos_libres("d0", DIA, apertura=time(20), cierre=time(8))
+
+
+def test_proximos_huecos_reparte_por_hora_entre_doctores(servicio):
+    _agendar(servicio, "d0", _hora(8), _hora(9))
+    huecos = _proximos(servicio, _hora(8), 4)
+    assert [(doctor.id, inicio) for doctor, inicio, _ in huecos] == [
+        ("d1", _hora(8)), ("d2", _hora(8)), ("d1", _hora(8, 30)), ("d2", _hora(8, 30))
+    ]
+
+
+@pytest.mark.parametrize("desde, primero", [
+    (_hora(6), _hora(8)),
+    (_hora(19, 30), _hora(19, 30)),
+    (_hora(19, 45), _hora(8, dia=DIA + timedelta(days=1))),
+    (_hora(22), _hora(8, dia=DIA + timedelta(days=1))),
+])
+def test_proximos_huecos_desde_fuera_de_la_jornada(servicio, desde, primero):
+    huecos = _proximos(servicio, desde, 3)
+    assert [(doctor.id, inicio, fin) for doctor, inicio, fin in huecos] == [
+        (f"d{i}", primero, primero + MEDIA_HORA) for i in range(3)
+    ]
+
+
+def test_proximos_huecos_sin_jornada_por_delante(servicio):
+    assert _proximos(servicio, _hora(22), 3, dias=1) == []
+
+
+class _DoctoresLentos(InMemoryDoctorRepository):
+    """Las lecturas esperan a que el bucle de eventos dé una vuelta, como una consulta a disco"""
+
+    def __init__(self, liberar: threading.Event):
+        super().__init__()
+        self.liberar = liberar
+
+    def buscar_por_id(self, doctor_id):
+        assert self.liberar.wait(5), "la lectura bloqueó el bucle de eventos"
+        return super().buscar_por_id(doctor_id)
+
+    def buscar_por_especialidad(self, especialidad):
+        assert self.liberar.wait(5), "la lectura bloqueó el bucle de eventos"
+        return super().buscar_por_especialidad(especialidad)
+
+
+def test_reservar_no_bloquea_el_bucle_con_un_repositorio_lento():
+    pacientes, rapidos = _repositorios()
+    liberar = threading.Event()
+    doctores = _DoctoresLentos(liberar)
+    doctores.guardar_lote(rapidos.buscar_todos())
+    ejecutor = EjecutorAcotado(2)
+    servicio = CitaService(InMemoryCitaRepository(), ExecutorPatientRepository(pacientes, ejecutor),
+                           ExecutorDoctorRepository(doctores, ejecutor))
+
+    async def reservar_y_buscar():
+        reserva = asyncio.create_task(servicio.agendar_cita("d0", "p1", _hora(8), _hora(9)))
+        huecos = asyncio.create_task(servicio.proximos_huecos("Cardiología", _hora(8), 1, MEDIA_HORA))
+        # Si las lecturas corrieran en el bucle, esto no llegaría a ejecutarse
+        await asyncio.sleep(0.05)
+        assert not reserva.done() and not huecos.done()
+        liberar.set()
+        return await reserva, await huecos
+
+    try:
+        cita, huecos = asyncio.run(reservar_y_buscar())
+    finally:
+        ejecutor.cerrar()
+    assert cita.doctor_id == "d0" and cita.version == 1
+    # Las dos corren a la vez: el hueco puede ser el de d0 si se buscó antes de la reserva
+    assert [inicio for _, inicio, _ in huecos] == [_hora(8)]
@@ -0,0 +1,37 @@
+from dataclasses import replace
+from app.domain.core.models import Doctor, paciente
+from app.infraestructure.adapters.columnar import ColumnarDoctorRepository, ColumnarPatientRepository
+
+
+def _tamano_arenas(repo) -> int:
+    return sum(len(columna.arena) for columna in repo.tabla.texto.values())
+
+
+def test_las_actualizaciones_no_hacen_crecer_la_arena_sin_limite():
+    repo = ColumnarPatientRepository()
+    pacientes = repo.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(100)])
+    for vuelta in range(200):
+        repo.actualizar_lote([replace(patient, nombre=f"Paciente {i} v{vuelta}")
+                              for i, patient in enumerate(pacientes)])
+    vivos = sum(len(f"Paciente {i} v199") + len(f"p{i}@clinica.org") for i in range(100))
+    # Sin compactar, la arena guardaría las 200 versiones de cada nombre
+    assert _tamano_arenas(repo) <= 2 * vivos + 64 * 1024 * 2
+    assert [p.nombre for p in repo.buscar_todos()] == [f"Paciente {i} v199" for i in range(100)]
+    assert [p.nombre for p in repo.buscar_texto("v199", 3)]
+
+
+def test_compactar_por_basura_conserva_las_especialidades():
+    repo = ColumnarDoctorRepository()
+    doctores = repo.guardar_lote([Doctor(nombre=f"Doctor {i}", email=f"d{i}@clinica.org", especialidad="Cardiología")
+                                  for i in range(50)])
+    filas = dict(repo.tabla.fila_de)
+    for vuelta in range(400):
+        especialidad = "Pediatría" if vuelta % 2 else "Cardiología"
+        repo.actualizar_lote([replace(doctor, nombre=f"Doctor {i} v{vuelta}", especialidad=especialidad)
+                              for i, doctor in enumerate(doctores)])
+    vivos = sum(len(f"Doctor {i} v399") + len(f"d{i}@clinica.org") for i in range(50))
+    assert _tamano_arenas(repo) <= 2 * vivos + 64 * 1024 * 2
+    assert repo.tabla.fila_de == filas
+    assert len(repo.buscar_por_especialidad("Pediatría")) == 50
+    assert repo.buscar_por_especialidad("Cardiología") == []
+    assert repo.buscar_por_id(doctores[7].id).nombre == "Doctor 7 v399"
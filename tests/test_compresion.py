@@ -0,0 +1,46 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.domain.core.models import Doctor, paciente
+from app.application.services.doctor_service import AsyncDoctorService
+from app.application.services.patient_service import AsyncPatientService
+from app.infraestructure.adapters.cache_respuestas import CacheLRU
+from app.infraestructure.adapters.database import InMemoryDoctorRepository, InMemoryPatientRepository
+from app.infraestructure.adapters.ejecutor import ExecutorDoctorRepository, ExecutorPatientRepository
+from app.infraestructure.api.compresion import CompresionMiddleware
+from app.infraestructure.api.controller import DoctorController, PatientController
+
+
+@pytest.fixture
+def cliente() -> TestClient:
+    pacientes = InMemoryPatientRepository()
+    pacientes.guardar_lote([paciente(nombre=f"Paciente {i}", email=f"p{i}@clinica.org") for i in range(50)])
+    doctores = InMemoryDoctorRepository()
+    doctores.guardar_lote([Doctor(nombre=f"Doctor {i}", especialidad="Cardiología") for i in range(50)])
+    app = FastAPI()
+    app.include_router(PatientController(AsyncPatientService(ExecutorPatientRepository(pacientes))).router)
+    app.include_router(DoctorController(AsyncDoctorService(ExecutorDoctorRepository(doctores), CacheLRU())).router)
+    app.add_middleware(CompresionMiddleware)
+    return TestClient(app)
+
+
+# Pacientes: comprime el middleware; doctores: la forma comprimida sale de la caché
+@pytest.mark.parametrize("ruta", ["/pacientes/", "/doctores/", "/doctores/especialidad/Cardiología"])
+def test_etag_debil_solo_en_la_forma_comprimida(cliente, ruta):
+    for _ in range(2):
+        identidad = cliente.get(ruta, headers={"Accept-Encoding": "identity"})
+        comprimida = cliente.get(ruta, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in identidad.headers
+        assert comprimida.headers["content-encoding"] == "gzip"
+        assert not identidad.headers["etag"].startswith("W/")
+        assert comprimida.headers["etag"] == "W/" + identidad.headers["etag"]
+        assert comprimida.json() == identidad.json()
+
+
+@pytest.mark.parametrize("ruta", ["/pacientes/", "/doctores/"])
+def test_if_none_match_acepta_las_dos_formas(cliente, ruta):
+    identidad = cliente.get(ruta, headers={"Accept-Encoding": "identity"})
+    comprimida = cliente.get(ruta, headers={"Accept-Encoding": "gzip"})
+    for etag in (identidad.headers["etag"], comprimida.headers["etag"]):
+        respuesta = cliente.get(ruta, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert respuesta.status_code == 304
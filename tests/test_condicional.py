@@ -0,0 +1,68 @@
+from email.utils import formatdate
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.application.services.patient_service import AsyncPatientService
+from app.infraestructure.adapters.database import InMemoryPatientRepository
+from app.infraestructure.adapters.ejecutor import ExecutorPatientRepository
+from app.infraestructure.api import controller
+from app.infraestructure.api.controller import PatientController
+
+
+class _Reloj:
+
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch) -> _Reloj:
+    reloj = _Reloj()
+    monkeypatch.setattr(controller, "reloj", reloj)
+    return reloj
+
+
+@pytest.fixture
+def repo() -> InMemoryPatientRepository:
+    return InMemoryPatientRepository()
+
+
+@pytest.fixture
+def cliente(repo) -> TestClient:
+    app = FastAPI()
+    app.include_router(PatientController(AsyncPatientService(ExecutorPatientRepository(repo))).router)
+    return TestClient(app)
+
+
+def _escribir(cliente, repo, modificado: float) -> str:
+    respuesta = cliente.post("/pacientes/", json={"nombre": "Ana", "email": "ana@clinica.org"})
+    repo._cambios.modificado = modificado
+    return respuesta.json()["id"]
+
+
+@pytest.mark.parametrize("ruta", ["/pacientes/", "/pacientes/?limit=5", "/pacientes/{id}"])
+def test_sin_last_modified_en_el_segundo_de_la_ultima_escritura(cliente, repo, reloj, ruta):
+    ruta = ruta.format(id=_escribir(cliente, repo, 1000.2))
+    reloj.ahora = 1000.5
+    respuesta = cliente.get(ruta)
+    assert "last-modified" not in respuesta.headers
+    assert cliente.get(ruta, headers={"If-Modified-Since": formatdate(1000, usegmt=True)}).status_code == 200
+    assert cliente.get(ruta, headers={"If-None-Match": respuesta.headers["etag"]}).status_code == 304
+
+
+def test_otra_escritura_en_el_mismo_segundo_no_da_304(cliente, repo, reloj):
+    _escribir(cliente, repo, 1000.2)
+    reloj.ahora = 1000.5
+    assert "last-modified" not in cliente.get("/pacientes/").headers
+    _escribir(cliente, repo, 1000.8)
+    reloj.ahora = 1001.1
+    respuesta = cliente.get("/pacientes/")
+    assert respuesta.headers["last-modified"] == formatdate(1000, usegmt=True)
+    assert len(respuesta.json()) == 2
+    ultima = {"If-Modified-Since": respuesta.headers["last-modified"]}
+    assert cliente.get("/pacientes/", headers=ultima).status_code == 304
+    _escribir(cliente, repo, 1001.4)
+    assert cliente.get("/pacientes/", headers=ultima).status_code == 200
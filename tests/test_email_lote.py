@@ -0,0 +1,69 @@
+import pytest
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from app.infraestructure.api.controller import EmailLote
+
+
+EMAIL_STR = TypeAdapter(EmailStr)
+EMAIL_LOTE = TypeAdapter(EmailLote)
+
+VALIDOS = [
+    "ana@clinica.org",
+    "Ana.Perez+citas@Clinica.ORG",
+    "  ana@clinica.org  ",
+    "o'brien@clinica.org",
+    "a!#$%&'*+/=?^_`{|}~-@clinica.org",
+    "ana@CLÍNICA.es",
+    "ana@xn--clnica-2va.es",
+    "josé@clinica.org",
+    "josé@clinica.org",
+    "Ana Pérez <ana@clinica.org>",
+    "a" * 64 + "@clinica.org",
+    "a" * 65 + "@clinica.org",
+    "a" * 64 + "@" + "b" * 63 + "." + "c" * 63 + "." + "d" * 57 + ".org",
+    "a" * 64 + "@" + "ñ" * 20 + "." + "c" * 63 + "." + "d" * 63 + ".org",
+]
+
+INVALIDOS = [
+    "",
+    "ana",
+    "ana@",
+    "@clinica.org",
+    "ana@@clinica.org",
+    "ana@clinica",
+    "ana@clinica..org",
+    "ana@-clinica.org",
+    "ana@clinica.org\n",
+    "ana\r@clinica.org",
+    ".ana@clinica.org",
+    "ana.@clinica.org",
+    "an..a@clinica.org",
+    "ana perez@clinica.org",
+    "ana(comentario)@clinica.org",
+    '"ana perez"@clinica.org',
+    "a" * 64 + "@" + "b" * 63 + "." + "c" * 63 + "." + "d" * 58 + ".org",
+    "ana@" + "b" * 64 + ".org",
+    "ana@clinica.org" + "x" * 2048,
+]
+
+
+def _resultado(adaptador, valor):
+    try:
+        return adaptador.validate_python(valor)
+    except ValidationError as e:
+        return [(error["type"], error["msg"]) for error in e.errors()]
+
+
+@pytest.mark.parametrize("valor", VALIDOS + INVALIDOS)
+def test_email_lote_igual_que_email_str(valor):
+    assert _resultado(EMAIL_LOTE, valor) == _resultado(EMAIL_STR, valor)
+
+
+@pytest.mark.parametrize("valor", VALIDOS)
+def test_validos(valor):
+    EMAIL_STR.validate_python(valor)
+
+
+@pytest.mark.parametrize("valor", INVALIDOS)
+def test_invalidos(valor):
+    with pytest.raises(ValidationError):
+        EMAIL_STR.validate_python(valor)
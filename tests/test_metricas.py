@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from app.infraestructure.adapters.database import InMemoryPatientRepository
+from app.infraestructure.adapters.ejecutor import EjecutorAcotado, ExecutorPatientRepository
+from app.infraestructure.api.metricas import Metricas
+from app.domain.core.models import paciente
+
+
+class _PacientesLentos(InMemoryPatientRepository):
+    """Las estadísticas esperan a que el bucle de eventos dé una vuelta, como un count(*) en disco"""
+
+    def __init__(self, liberar: threading.Event):
+        super().__init__()
+        self.liberar = liberar
+
+    def estadisticas(self):
+        assert self.liberar.wait(5), "las estadísticas bloquearon el bucle de eventos"
+        return super().estadisticas()
+
+
+def test_los_indicadores_del_repositorio_se_leen_fuera_del_bucle():
+    liberar = threading.Event()
+    pacientes = _PacientesLentos(liberar)
+    pacientes.guardar(paciente(id="p1", nombre="Ana", email="ana@clinica.org"))
+    ejecutor = EjecutorAcotado(1)
+    metricas = Metricas()
+    metricas.registrar_indicadores("repositorio", ExecutorPatientRepository(pacientes, ejecutor).estadisticas,
+                                   coleccion="pacientes")
+
+    async def consultar():
+        consulta = asyncio.create_task(metricas.exponer())
+        # Si las estadísticas corrieran en el bucle, esto no llegaría a ejecutarse
+        await asyncio.sleep(0.05)
+        assert not consulta.done()
+        liberar.set()
+        return await consulta
+
+    try:
+        texto = asyncio.run(consultar())
+    finally:
+        liberar.set()
+        ejecutor.cerrar()
+    medidas = pacientes.estadisticas()
+    for medida, valor in medidas.items():
+        assert f'clinica_repositorio_{medida}{{coleccion="pacientes"}} {valor}' in texto
+
+
+def test_con_el_ejecutor_saturado_se_sirven_las_ultimas_medidas():
+    pacientes = InMemoryPatientRepository()
+    pacientes.guardar(paciente(id="p1", nombre="Ana", email="ana@clinica.org"))
+    ejecutor = EjecutorAcotado(1, max_pendientes=1)
+    metricas = Metricas()
+    metricas.registrar_indicadores("repositorio", ExecutorPatientRepository(pacientes, ejecutor).estadisticas)
+    ocupado = threading.Event()
+
+    async def consultar_saturado():
+        primera = await metricas.exponer()
+        pacientes.guardar(paciente(id="p2", nombre="Luis", email="luis@clinica.org"))
+        # La única plaza del ejecutor queda ocupada mientras se consulta
+        bloqueo = asyncio.ensure_future(ejecutor.ejecutar(ocupado.wait, 5))
+        await asyncio.sleep(0)
+        segunda = await metricas.exponer()
+        ocupado.set()
+        await bloqueo
+        return primera, segunda
+
+    try:
+        primera, segunda = asyncio.run(consultar_saturado())
+    finally:
+        ocupado.set()
+        ejecutor.cerrar()
+    assert ejecutor.estadisticas()["rechazadas"] == 1
+    indicadores = [linea for linea in primera.splitlines() if linea.startswith("clinica_repositorio_")]
+    assert indicadores
+    assert indicadores == [linea for linea in segunda.splitlines() if linea.startswith("clinica_repositorio_")]
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+from fastapi import FastAPI
+from app.infraestructure.api.perfilado import CABECERA_PERFILAR, PerfiladoMiddleware
+from bench.cliente_asgi import peticion
+
+
+def _crear_app() -> PerfiladoMiddleware:
+    app = FastAPI()
+
+    @app.get("/lenta")
+    async def lenta():
+        datos = [bytes(1000) for _ in range(100)]
+        await asyncio.sleep(0.005)
+        return {"bloques": len(datos)}
+
+    return PerfiladoMiddleware(app)
+
+
+def test_dos_aplicaciones_en_dos_hilos_comparten_tracemalloc():
+    apps = [_crear_app(), _crear_app()]
+    errores = []
+
+    async def pedir(app):
+        for _ in range(50):
+            respuesta = await peticion(app, "GET", "/lenta", cabeceras={CABECERA_PERFILAR: "1"})
+            assert respuesta.status == 200, respuesta.status
+
+    def hilo(app):
+        try:
+            asyncio.run(pedir(app))
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=hilo, args=(app,)) for app in apps]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert errores == []
+    # Las que llegan mientras la otra aplicación perfila se atienden sin perfilar,
+    # pero alguna se ha perfilado
+    assert any(app.perfiles.resumen() for app in apps)